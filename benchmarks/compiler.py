@@ -0,0 +1,313 @@
+"""Throughput and peak memory of the offline compiler, stage by stage.
+
+Runs parse_bracket, parse_stepdetail, replace_variables, createWorkoutStep,
+createWorkoutJson and serialize on running, strength, HIIT and deeply nested
+repeat plans of increasing size (in YAML steps), and templateJson on the same
+plans written as template instances. Prints the scaling table and compares
+each stage's throughput with the stored baselines.
+
+Usage:
+  python benchmarks/compiler.py                       # 10, 1k and 100k steps
+  python benchmarks/compiler.py --sizes 10,1000,100000,1000000
+  python benchmarks/compiler.py --save-baseline       # record this machine's baselines
+  python benchmarks/compiler.py --threshold 0.2       # fail on >20% slowdowns
+
+Exits with status 1 when a stage is slower than its baseline by more than the
+threshold. Baselines are machine specific; record them on the machine (or CI
+runner class) that runs the comparison.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from garmin_planner.main import replace_variables, createWorkoutStep, createWorkoutJson, createWorkoutModel, serialize, compileWorkouts
+from garmin_planner.parser import parse_bracket, parse_stepdetail
+from garmin_planner.constant import SportType
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_SIZES = (10, 1000, 100000)
+DEFAULT_THRESHOLD = 0.25
+MIN_SECONDS = 0.2   # repeat small workloads until a measurement takes this long
+
+# One workout per shape; i varies the numbers so caches see realistic variety
+def running(i):
+    return [
+        {"warmup": "15min @H(z2)"},
+        {"repeat(8)": [
+            {"run": f"{200 + i % 40 * 10}m @P($intervalPace)"},
+            {"recovery": f"{60 + i % 30}sec"},
+        ]},
+        {"cooldown": "10min @H(z1)"},
+    ]
+
+def strength(i):
+    return [
+        {"warmup": [{"cardio": "lap"}]},
+        {"repeat(3)": [
+            {"Goblet Squat": f"{8 + i % 5} reps"},
+            {"Dumbbell Bulgarian Split Squat": "10 reps | each side"},
+            {"Incline Dumbbell Bench Press": "lap | 8 reps"},
+            {"rest": "lap"},
+        ]},
+    ]
+
+def hiit(i):
+    return [
+        {"warmup": "5min"},
+        {"repeatUntilTime(35min)": [
+            {"Burpee": "40sec"},
+            {"Kettlebell Swing": f"{12 + i % 6} reps"},
+            {"rest": f"{15 + i % 10}sec"},
+        ]},
+        {"cooldown": "5min"},
+    ]
+
+def nested(i, depth=6):
+    steps = [{"run": f"{100 + i % 20 * 10}m"}, {"recovery": "60sec"}]
+    for level in range(depth):
+        steps = [{f"repeat({2 + (i + level) % 2})": steps}]
+    return steps
+
+SHAPES = {
+    "running": (running, SportType.RUNNING),
+    "strength": (strength, SportType.STRENGTH),
+    "hiit": (hiit, SportType.HIIT),
+    "nested": (nested, SportType.RUNNING),
+}
+DEFINITIONS = {"intervalPace": "3:50-4:10"}
+
+# The same shapes as templates: what varies with i becomes a parameter
+def runningTemplate():
+    steps = [
+        {"warmup": "15min @H(z2)"},
+        {"repeat(8)": [
+            {"run": "$distance @P($intervalPace)"},
+            {"recovery": "$recovery"},
+        ]},
+        {"cooldown": "10min @H(z1)"},
+    ]
+    return steps, lambda i: {"distance": f"{200 + i % 40 * 10}m", "recovery": f"{60 + i % 30}sec"}
+
+def strengthTemplate():
+    steps = strength(0)
+    steps[1]["repeat(3)"][0] = {"Goblet Squat": "$reps reps"}
+    return steps, lambda i: {"reps": 8 + i % 5}
+
+def hiitTemplate():
+    steps = hiit(0)
+    steps[1]["repeatUntilTime(35min)"][1:] = [{"Kettlebell Swing": "$reps reps"}, {"rest": "$rest"}]
+    return steps, lambda i: {"reps": 12 + i % 6, "rest": f"{15 + i % 10}sec"}
+
+def nestedTemplate(depth=6):
+    steps = [{"run": "$distance"}, {"recovery": "60sec"}]
+    for level in range(depth):
+        steps = [{f"repeat($r{level})": steps}]
+    return steps, lambda i: dict({f"r{level}": 2 + (i + level) % 2 for level in range(depth)}, distance=f"{100 + i % 20 * 10}m")
+
+TEMPLATES = {"running": runningTemplate, "strength": strengthTemplate, "hiit": hiitTemplate, "nested": nestedTemplate}
+
+def countSteps(steps) -> int:
+    total = 0
+    for step in steps:
+        total += 1
+        value = next(iter(step.values()))
+        if isinstance(value, list):
+            total += countSteps(value)
+    return total
+
+def flatten(steps, keys, details):
+    for step in steps:
+        key, value = next(iter(step.items()))
+        keys.append(key)
+        if isinstance(value, list):
+            flatten(value, keys, details)
+        else:
+            details.append(value)
+
+class Workload(object):
+    """Enough workouts of one shape to add up to `size` YAML steps."""
+
+    def __init__(self, shape: str, size: int):
+        build, self.sportType = SHAPES[shape]
+        self.size = size
+        workouts = {}
+        total, i = 0, 0
+        while total < size:
+            steps = build(i)
+            workouts[f"{shape}_{i}"] = steps
+            total += countSteps(steps)
+            i += 1
+        self.plan = {"definitions": DEFINITIONS, "workouts": workouts}
+        self.workouts = replace_variables(workouts, DEFINITIONS)
+        templateSteps, values = TEMPLATES[shape]()
+        self.templates = {shape: {"sport": self.sportType.name, "steps": replace_variables(templateSteps, DEFINITIONS)}}
+        self.instances = {f"{shape}_$n": {"template": shape, "instances": [dict(values(n), n=n) for n in range(i)]}}
+        self.keys, self.details = [], []
+        for steps in self.workouts.values():
+            flatten(steps, self.keys, self.details)
+        self.steps = total
+
+def stages(workload: Workload) -> dict:
+    """Stage name -> (setup, run); setup builds inputs that aren't part of the measurement."""
+    sportType = workload.sportType
+    workouts = workload.workouts
+
+    def compileSteps(_):
+        for steps in workouts.values():
+            stepCount = [0]
+            for step in steps:
+                createWorkoutStep(step, stepCount, sport_type=sportType)
+
+    def compileJson(_):
+        for name, steps in workouts.items():
+            createWorkoutJson(name, steps, sportType)
+
+    def serializeModels(models):
+        for model in models:
+            json.dumps(model, default=serialize)
+
+    def compileTemplates(_):
+        for _ in compileWorkouts(workload.instances, workload.templates):
+            pass
+
+    return {
+        "parse_bracket": (lambda: None, lambda _: [parse_bracket(k) for k in workload.keys]),
+        "parse_stepdetail": (lambda: None, lambda _: [parse_stepdetail(d) for d in workload.details]),
+        "replace_variables": (lambda: None, lambda _: replace_variables(workload.plan, DEFINITIONS)),
+        "createWorkoutStep": (lambda: None, compileSteps),
+        "createWorkoutJson": (lambda: None, compileJson),
+        "serialize": (lambda: [createWorkoutModel(n, s, sportType) for n, s in workouts.items()], serializeModels),
+        "templateJson": (lambda: None, compileTemplates),
+    }
+
+def measureTime(setup, run) -> float:
+    """Best seconds per run, repeating small workloads up to MIN_SECONDS."""
+    data = setup()
+    best = float("inf")
+    spent, runs = 0.0, 0
+    while runs < 3 and (spent < MIN_SECONDS or runs == 0):
+        gc.collect()
+        started = time.perf_counter()
+        run(data)
+        elapsed = time.perf_counter() - started
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+        if spent > 5 * MIN_SECONDS:
+            break
+    # very small workloads: average over a batch for a stable number
+    if best < MIN_SECONDS / 100:
+        number = max(1, int(MIN_SECONDS / max(best, 1e-7)))
+        started = time.perf_counter()
+        for _ in range(number):
+            run(data)
+        best = min(best, (time.perf_counter() - started) / number)
+    del data
+    return best
+
+def measurePeak(setup, run) -> int:
+    data = setup()
+    gc.collect()
+    tracemalloc.start()
+    run(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del data
+    return peak
+
+def runSuite(sizes, shapes=tuple(SHAPES), stageNames=None, memory: bool = True) -> list:
+    results = []
+    for size in sizes:
+        for shape in shapes:
+            workload = Workload(shape, size)
+            for stage, (setup, run) in stages(workload).items():
+                if stageNames and stage not in stageNames:
+                    continue
+                seconds = measureTime(setup, run)
+                results.append({
+                    "stage": stage,
+                    "shape": shape,
+                    "size": size,
+                    "steps": workload.steps,
+                    "seconds": seconds,
+                    "stepsPerSecond": workload.steps / seconds if seconds else float("inf"),
+                    "peakBytes": measurePeak(setup, run) if memory else None,
+                })
+            del workload
+    return results
+
+def resultKey(result: dict) -> str:
+    return f"{result['stage']}/{result['shape']}/{result['size']}"
+
+def compareToBaseline(results: list, baselines: dict, threshold: float) -> list:
+    """Results whose throughput fell more than `threshold` below the baseline."""
+    regressions = []
+    for result in results:
+        baseline = baselines.get(resultKey(result))
+        if baseline and result["stepsPerSecond"] < baseline * (1 - threshold):
+            regressions.append((result, baseline))
+    return regressions
+
+def loadBaselines(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def saveBaselines(path: str, results: list):
+    baselines = loadBaselines(path)
+    baselines.update({resultKey(r): round(r["stepsPerSecond"], 1) for r in results})
+    with open(path, "w") as f:
+        json.dump(dict(sorted(baselines.items())), f, indent=2)
+        f.write("\n")
+
+def printTable(results: list, baselines: dict):
+    print(f"{'stage':<18} {'shape':<9} {'steps':>9} {'time':>10} {'steps/s':>12} {'peak':>10} {'vs base':>8}")
+    for r in results:
+        baseline = baselines.get(resultKey(r))
+        ratio = f"{r['stepsPerSecond'] / baseline:7.2f}x" if baseline else "       -"
+        peak = f"{r['peakBytes'] / 2**20:8.2f}MB" if r["peakBytes"] is not None else "         -"
+        print(f"{r['stage']:<18} {r['shape']:<9} {r['steps']:>9} {r['seconds'] * 1000:>8.2f}ms {r['stepsPerSecond']:>12,.0f} {peak} {ratio}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=str, default=",".join(map(str, DEFAULT_SIZES)), help="Comma separated step counts")
+    parser.add_argument("--shapes", type=str, default=",".join(SHAPES), help="Comma separated plan shapes")
+    parser.add_argument("--stages", type=str, default=None, help="Comma separated stages (default: all)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak memory pass")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH, help="Baselines file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baselines")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed throughput drop (default: 0.25)")
+    parser.add_argument("--json", type=str, default=None, help="Also write the raw results to this file")
+    args = parser.parse_args(argv)
+
+    results = runSuite(
+        [int(s) for s in args.sizes.split(",")],
+        shapes=args.shapes.split(","),
+        stageNames=set(args.stages.split(",")) if args.stages else None,
+        memory=not args.no_memory,
+    )
+    baselines = loadBaselines(args.baseline)
+    printTable(results, baselines)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        saveBaselines(args.baseline, results)
+        print(f"Saved {len(results)} baselines to {args.baseline}")
+        return 0
+
+    regressions = compareToBaseline(results, baselines, args.threshold)
+    for result, baseline in regressions:
+        print(f"REGRESSION {resultKey(result)}: {result['stepsPerSecond']:,.0f} steps/s vs baseline {baseline:,.0f}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Memory footprint of compiled steps: WorkoutStep/RepeatStep dataclasses vs compact records.
+
+Usage: python benchmarks/memory_compact_steps.py [athletes]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from garmin_planner.main import createWorkoutList
+from garmin_planner.model.compactModel import compactSteps
+from garmin_planner.constant import SportType
+
+# One week of strength/running sessions; each athlete gets their own copy,
+# the way the API holds per-athlete plans in memory.
+WEEK = [
+    [{"warmup": [{"cardio": "lap"}]},
+     {"repeat(3)": [{"30-degree Lat Pull-down": "lap | Straight Arm Pull down x 10"},
+                    {"Goblet Squat": "10 reps"},
+                    {"Kettlebell Floor to Shelf": "lap | KB Bottoms Up Press x8 each side"},
+                    {"rest": "lap"}]},
+     {"repeat(3)": [{"Incline Dumbbell Bench Press": "lap | 8 reps"},
+                    {"Dumbbell Bulgarian Split Squat": "10 reps"},
+                    {"rest": "lap"}]}],
+    [{"warmup": "15min @H(z2)"},
+     {"repeat(8)": [{"run": "30sec @P(3:30-4:00)"}, {"recovery": "1200m"}]},
+     {"cooldown": "15min @H(z2)"}],
+]
+
+def countSteps(steps) -> int:
+    return sum(1 + countSteps(s.workoutSteps) if hasattr(s, "workoutSteps") else 1 for s in steps)
+
+def buildPlan(athletes: int, weeks: int = 52) -> list:
+    plan = []
+    for _ in range(athletes * weeks):
+        for workout in WEEK:
+            plan.append(createWorkoutList(workout, [0], sport_type=SportType.STRENGTH))
+    return plan
+
+def measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current - before, peak - before
+
+def main():
+    athletes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    plan, dataclassBytes, _ = measure(lambda: buildPlan(athletes))
+    steps = sum(countSteps(workout) for workout in plan)
+    del plan
+
+    # Build from scratch and drop the dataclasses, so only the compact records are retained
+    compact, compactBytes, compactPeak = measure(lambda: [compactSteps(w) for w in buildPlan(athletes)])
+
+    print(f"steps:        {steps}")
+    print(f"dataclasses:  {dataclassBytes / 2**20:8.1f} MiB  ({dataclassBytes / steps:6.1f} B/step)")
+    print(f"compact:      {compactBytes / 2**20:8.1f} MiB  ({compactBytes / steps:6.1f} B/step, peak while converting {compactPeak / 2**20:.1f} MiB)")
+    print(f"ratio:        {dataclassBytes / compactBytes:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,86 @@
+import atexit
+import collections
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+# Logging goes through a queue: callers (compile loop, API request threads)
+# only enqueue records, and a QueueListener thread does the formatting and
+# writing to stderr. The level comes from GARMIN_LOG_LEVEL (default INFO),
+# so disabled debug calls cost a level check. GARMIN_LOG_DEBUG_SAMPLE=N keeps
+# one in N DEBUG records per call site for high-volume debug events.
+
+LOG_LEVEL_ENV = "GARMIN_LOG_LEVEL"
+DEBUG_SAMPLE_ENV = "GARMIN_LOG_DEBUG_SAMPLE"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+class DebugSampler(logging.Filter):
+    """Pass one in `every` DEBUG records per call site; other levels always pass.
+
+    Handlers may filter from several threads, so the per-site counters are
+    locked, and only the `maxSites` most recently logging sites are tracked.
+    """
+
+    def __init__(self, every: int = 1, maxSites: int = 1024):
+        super().__init__()
+        self.every = max(1, every)
+        self.maxSites = max(1, maxSites)
+        self._lock = threading.Lock()
+        self._seen = collections.OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno != logging.DEBUG:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            seen = self._seen.pop(site, 0)
+            # counted modulo `every`, a forgotten site restarts its cycle
+            self._seen[site] = (seen + 1) % self.every
+            if len(self._seen) > self.maxSites:
+                self._seen.popitem(last=False)
+        return seen == 0
+
+def logLevel(value) -> int:
+    """Level number for a name like "debug" or a number; INFO when unset or unknown."""
+    if value is None or str(value).strip() == "":
+        return logging.INFO
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    return level if isinstance(level, int) else logging.INFO
+
+def _sampleEvery(value) -> int:
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+def queueLogging(stream=None, sampleEvery: int = 1):
+    """(QueueHandler, started QueueListener) writing formatted records to stream (default stderr)."""
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    records = queue.SimpleQueue()
+    queueHandler = logging.handlers.QueueHandler(records)
+    # the caller's side only merges msg % args (and any traceback); the listener applies LOG_FORMAT
+    queueHandler.setFormatter(logging.Formatter('%(message)s'))
+    queueHandler.addFilter(DebugSampler(sampleEvery))
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    return queueHandler, listener
 
 # Configure logging
 def configure_logging():
     logger = logging.getLogger(__name__)
     if not logger.hasHandlers():  # Prevent duplicate handlers
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-        )
-        logger.info('Logger configured')
+        queueHandler, listener = queueLogging(sampleEvery=_sampleEvery(os.environ.get(DEBUG_SAMPLE_ENV)))
+        # flush what is still queued when the process exits
+        atexit.register(listener.stop)
+        logging.basicConfig(level=logLevel(os.environ.get(LOG_LEVEL_ENV)), handlers=[queueHandler])
+        logger.debug('Logger configured')
     return logger
 
 # Create and configure the logger
-logger = configure_logging()
\ No newline at end of file
+logger = configure_logging()
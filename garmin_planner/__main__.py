@@ -1,4 +1,9 @@
-from garmin_planner.main import main
+import sys
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if sys.argv[1:2] == ["push"]:
+        # push only streams a compiled bundle: don't import the compiler
+        from garmin_planner.sync import pushMain as main
+    else:
+        from garmin_planner.main import main
+    main()
@@ -0,0 +1,166 @@
+import datetime
+import mmap
+import os
+import struct
+import tempfile
+
+# Plan bundle: compiled workouts + schedule in one indexed binary file.
+#
+#   header    MAGIC, version, flags, workout count, schedule count
+#   workouts  one WORKOUT_ENTRY per workout (name offset/len, payload offset/len)
+#   schedule  one SCHEDULE_ENTRY per day (date ordinal, name offset/len)
+#   blob      utf-8 names and workout JSON payloads
+#
+# All integers are little-endian and all offsets are absolute, so a reader can
+# mmap the file and slice out a single workout without touching the rest.
+MAGIC = b"GPBL"
+VERSION = 1
+
+FLAG_DELETE_SAME_NAME = 0x1
+FLAG_REMOVE_STALE_SCHEDULE = 0x2
+
+HEADER = struct.Struct("<4sHHII")
+WORKOUT_ENTRY = struct.Struct("<QIQI")
+SCHEDULE_ENTRY = struct.Struct("<IQI")
+
+BUNDLE_EXTENSION = ".gpb"
+
+
+def _encode(value) -> bytes:
+    return value if isinstance(value, (bytes, bytearray)) else str(value).encode("utf-8")
+
+
+def writeBundle(path: str, workouts, schedule=(), deleteSameName: bool = False, removeStaleSchedule: bool = False) -> int:
+    """Write (name, json) workouts and (date, name) schedule entries to `path`.
+
+    The file is written to a temporary sibling and renamed into place, so a
+    reader never sees a half-written bundle. Returns the number of bytes written.
+    """
+    workouts = [(_encode(name), _encode(payload)) for name, payload in workouts]
+    schedule = [(date, _encode(name)) for date, name in schedule]
+
+    blobStart = HEADER.size + WORKOUT_ENTRY.size * len(workouts) + SCHEDULE_ENTRY.size * len(schedule)
+    index = bytearray()
+    blob = bytearray()
+
+    def place(data: bytes) -> int:
+        offset = blobStart + len(blob)
+        blob.extend(data)
+        return offset
+
+    for name, payload in workouts:
+        index += WORKOUT_ENTRY.pack(place(name), len(name), place(payload), len(payload))
+    for date, name in schedule:
+        index += SCHEDULE_ENTRY.pack(date.toordinal(), place(name), len(name))
+
+    flags = (FLAG_DELETE_SAME_NAME if deleteSameName else 0) | (FLAG_REMOVE_STALE_SCHEDULE if removeStaleSchedule else 0)
+    header = HEADER.pack(MAGIC, VERSION, flags, len(workouts), len(schedule))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmpPath = tempfile.mkstemp(dir=directory, prefix=".bundle-", suffix=BUNDLE_EXTENSION)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(index)
+            f.write(blob)
+        os.replace(tmpPath, path)
+    except BaseException:
+        if os.path.exists(tmpPath):
+            os.unlink(tmpPath)
+        raise
+    return len(header) + len(index) + len(blob)
+
+
+class PlanBundle(object):
+    """Read-only, memory-mapped view over a plan bundle.
+
+    Nothing is decoded up front: workouts and schedule entries are sliced out
+    of the mapping as they are iterated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"'{path}' is not a plan bundle (file too small)")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        magic, version, flags, workoutCount, scheduleCount = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a plan bundle (bad magic {magic!r})")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported plan bundle version {version} in '{path}'")
+
+        self.version = version
+        self.flags = flags
+        self._workoutCount = workoutCount
+        self._scheduleCount = scheduleCount
+        self._scheduleStart = HEADER.size + WORKOUT_ENTRY.size * workoutCount
+        self._nameIndex = None
+
+        if self._scheduleStart + SCHEDULE_ENTRY.size * scheduleCount > size:
+            self.close()
+            raise ValueError(f"'{path}' is truncated")
+
+    @property
+    def deleteSameName(self) -> bool:
+        return bool(self.flags & FLAG_DELETE_SAME_NAME)
+
+    @property
+    def removeStaleSchedule(self) -> bool:
+        return bool(self.flags & FLAG_REMOVE_STALE_SCHEDULE)
+
+    def __len__(self):
+        return self._workoutCount
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if not self._file.closed:
+            self._file.close()
+
+    def _slice(self, offset: int, length: int) -> bytes:
+        if offset + length > len(self._map):
+            raise ValueError(f"'{self.path}' is truncated")
+        return self._map[offset:offset + length]
+
+    def _workoutEntry(self, i: int):
+        return WORKOUT_ENTRY.unpack_from(self._map, HEADER.size + WORKOUT_ENTRY.size * i)
+
+    def names(self):
+        for i in range(self._workoutCount):
+            nameOffset, nameLength, _, _ = self._workoutEntry(i)
+            yield self._slice(nameOffset, nameLength).decode("utf-8")
+
+    def workouts(self):
+        """Yield (name, json bytes) for every workout, in compile order."""
+        for i in range(self._workoutCount):
+            nameOffset, nameLength, dataOffset, dataLength = self._workoutEntry(i)
+            yield self._slice(nameOffset, nameLength).decode("utf-8"), self._slice(dataOffset, dataLength)
+
+    def workout(self, name: str) -> bytes:
+        if self._nameIndex is None:
+            self._nameIndex = {n: i for i, n in enumerate(self.names())}
+        _, _, dataOffset, dataLength = self._workoutEntry(self._nameIndex[name])
+        return self._slice(dataOffset, dataLength)
+
+    def schedule(self):
+        """Yield (datetime.date, workoutName) for every schedule entry."""
+        for i in range(self._scheduleCount):
+            ordinal, nameOffset, nameLength = SCHEDULE_ENTRY.unpack_from(
+                self._map, self._scheduleStart + SCHEDULE_ENTRY.size * i)
+            yield datetime.date.fromordinal(ordinal), self._slice(nameOffset, nameLength).decode("utf-8")
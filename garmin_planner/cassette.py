@@ -0,0 +1,160 @@
+import json
+import os
+from collections import defaultdict, deque
+import threading
+import time
+import requests
+from garth.exc import GarthHTTPError
+from typing import Callable, Optional
+
+# Record/replay of Garmin calls.
+#
+# In record mode every Client call is forwarded to Garmin and appended to a
+# JSON lines cassette with its request (method, path, params, body), result
+# or error, and latency. Headers are never stored, so cassettes hold no
+# tokens. In replay mode nothing touches the network: each call is answered
+# by the first unused recorded interaction with the same method, path,
+# params and body (or, failing that, the same method and path), optionally
+# after sleeping its recorded latency, so a captured sync can be re-run
+# offline to benchmark the importer and scheduler. Replayed interactions are
+# indexed by request and by (method, path), so a match costs O(1) however
+# long the cassette is.
+
+RECORD = "record"
+REPLAY = "replay"
+
+class CassetteMiss(LookupError):
+    """A replayed call has no matching recorded interaction left."""
+
+def _body(kwargs: dict) -> Optional[str]:
+    if kwargs.get("json") is not None:
+        return json.dumps(kwargs["json"], sort_keys=True)
+    data = kwargs.get("data")
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data).decode("utf-8")
+    return data
+
+def _params(kwargs: dict) -> Optional[str]:
+    params = kwargs.get("params")
+    return json.dumps(params, sort_keys=True, default=str) if params else None
+
+def _errorResponse(status: int, body) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode("utf-8") if body is not None else b""
+    return response
+
+class Cassette(object):
+    def __init__(self, path: str, mode: str = RECORD, realtime: bool = False,
+                 sleep: Callable[[float], None] = time.sleep):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._file = None
+        self.interactions = []
+        self._used = set()
+        # unused interaction indices, oldest first; used ones are skipped lazily
+        self._exact = defaultdict(deque)    # (method, path, params, body) -> indices
+        self._loose = defaultdict(deque)    # (method, path) -> indices
+        if mode == REPLAY:
+            with open(path) as f:
+                self.interactions = [json.loads(line) for line in f if line.strip()]
+            for index, interaction in enumerate(self.interactions):
+                loose = (interaction["method"], interaction["path"])
+                self._exact[loose + (interaction["params"], interaction["body"])].append(index)
+                self._loose[loose].append(index)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def call(self, method: str, path: str, kwargs: dict, send: Callable[[], object]):
+        request = {"method": method.upper(), "path": path, "params": _params(kwargs), "body": _body(kwargs)}
+        if self.replaying:
+            return self._replay(request)
+        return self._record(request, send)
+
+    def _record(self, request: dict, send: Callable[[], object]):
+        started = time.perf_counter()
+        interaction = dict(request)
+        try:
+            result = send()
+        except GarthHTTPError as e:
+            response = getattr(e.error, "response", None)
+            try:
+                body = response.json() if response is not None and response.content else None
+            except ValueError:
+                body = None
+            interaction.update(error="http", status=getattr(response, "status_code", None), response=body)
+            raise
+        except requests.RequestException as e:
+            interaction.update(error="connection", message=str(e))
+            raise
+        else:
+            interaction.update(status=None, response=result)
+            return result
+        finally:
+            interaction["latency"] = time.perf_counter() - started
+            self._append(interaction)
+
+    def _append(self, interaction: dict):
+        line = json.dumps(interaction) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+            self.interactions.append(interaction)
+
+    def _takeFirst(self, indices: Optional[deque]) -> Optional[int]:
+        while indices:
+            index = indices.popleft()
+            if index not in self._used:
+                self._used.add(index)
+                return index
+        return None
+
+    def _match(self, request: dict) -> dict:
+        loose = (request["method"], request["path"])
+        with self._lock:
+            index = self._takeFirst(self._exact.get(loose + (request["params"], request["body"])))
+            if index is None:
+                index = self._takeFirst(self._loose.get(loose))
+            if index is None:
+                raise CassetteMiss(f"No recorded interaction for {request['method']} {request['path']}")
+            return self.interactions[index]
+
+    def _replay(self, request: dict):
+        interaction = self._match(request)
+        if self.realtime:
+            self._sleep(interaction.get("latency", 0.0))
+        if interaction.get("error") == "http":
+            response = _errorResponse(interaction["status"], interaction.get("response"))
+            raise GarthHTTPError(msg="Error in request",
+                                 error=requests.HTTPError(f"{interaction['status']} (replayed)", response=response))
+        if interaction.get("error") == "connection":
+            raise requests.ConnectionError(interaction.get("message"))
+        return interaction["response"]
+
+    def remaining(self) -> int:
+        """Recorded interactions not replayed yet."""
+        with self._lock:
+            return len(self.interactions) - len(self._used)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,37 +1,144 @@
+import datetime
 import garth
-from garth.exc import GarthException
+from garth.exc import GarthHTTPError
 from garmin_planner.__init__ import logger
+from garmin_planner.cassette import Cassette
+from garmin_planner.coalesce import Coalescer, sharedCoalescer
+from garmin_planner.resilience import Resilience, ResilienceConfig, accountResilience, httpStatus
+from garmin_planner.tokenstore import TokenStore
+from garmin_planner.tracing import defaultHooks, tracedCall
+from garmin_planner.transport import Transport, TransportConfig, sharedTransport
+from typing import Optional, Union
 
 SESSION_DIR = '.garth'
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+WORKOUTS_PAGE_SIZE = 999    # the most the workout list returns per request
+
+class _GarthClient(garth.Client):
+    # garth mounts a new HTTPAdapter whenever it is (re)configured, e.g. on
+    # token load; remount the shared pool every time so it is never replaced.
+    def __init__(self, transport: Transport):
+        self._transport = transport
+        super().__init__()
+
+    def configure(self, /, **kwargs):
+        super().configure(**kwargs)
+        self._transport.mount(self)
 
 class Client(object):
-    def __init__(self, email, password):
+    def __init__(self, email, password, transport: Optional[Union[Transport, TransportConfig]] = None,
+                 tokenStore: Optional[TokenStore] = None,
+                 resilience: Optional[Union[Resilience, ResilienceConfig]] = None,
+                 coalescer: Optional[Coalescer] = None,
+                 hooks: Optional[list] = None,
+                 cassette: Optional[Cassette] = None):
         self._email = email
+        self._account = email.strip().lower()
         self._password = password
+        self.tokenStore = tokenStore or TokenStore(SESSION_DIR)
+
+        # Rate limit and circuit state is per account, shared by its Clients
+        if not isinstance(resilience, Resilience):
+            resilience = accountResilience(email, resilience)
+        self.resilience = resilience
+
+        # Identical concurrent reads for the account share one round-trip
+        self.coalescer = coalescer or sharedCoalescer()
 
-        if not self.login():
+        # Tracing hooks (see garmin_planner.tracing), none means no overhead
+        self.hooks = list(hooks) if hooks is not None else defaultHooks()
+
+        # Record calls to, or replay them from, a cassette (see garmin_planner.cassette)
+        self.cassette = cassette
+
+        # All Clients in a process share one connection pool unless told otherwise
+        if not isinstance(transport, Transport):
+            transport = sharedTransport(transport)
+        self.transport = transport
+        self.garth = _GarthClient(transport)
+
+        # a replayed session never talks to Garmin, so there is nothing to log in to
+        if not (cassette is not None and cassette.replaying) and not self.login():
             raise Exception("Login failed")
-     
-    def getAllWorkouts(self) -> dict:
-        return garth.connectapi(f"""/workout-service/workouts""",
-                                params={"start": 1, "limit": 999, "myWorkoutsOnly": True, "sharedWorkoutsOnly": False, "orderBy": "WORKOUT_NAME", "orderSeq": "ASC", "includeAtp": False})
+
+    def connectapi(self, path: str, method: str = "GET", **kwargs):
+        # garth's request() writes the Authorization header into its (shared,
+        # mutable default) headers dict, so always hand it a fresh one
+        kwargs["headers"] = dict(kwargs.get("headers") or {})
+        try:
+            return self.resilience.call(lambda: self._send(path, method, kwargs),
+                                        idempotent=method.upper() in IDEMPOTENT_METHODS)
+        finally:
+            if method.upper() != "GET":
+                self.coalescer.invalidate(self._account)
+
+    def _send(self, path: str, method: str, kwargs: dict):
+        if not self.hooks:
+            return self._transmit(path, method, kwargs)
+        return tracedCall(self.hooks, lambda **kw: self._transmit(path, method, kw), method, path, kwargs)
+
+    def _transmit(self, path: str, method: str, kwargs: dict):
+        if self.cassette is None:
+            return self.garth.connectapi(path, method=method, **kwargs)
+        return self.cassette.call(method, path, kwargs, lambda: self.garth.connectapi(path, method=method, **kwargs))
+
+    def addHook(self, hook):
+        self.hooks.append(hook)
+
+    def removeHook(self, hook):
+        if hook in self.hooks:
+            self.hooks.remove(hook)
+
+    def _read(self, key: tuple, fn):
+        return self.coalescer.do((self._account,) + key, fn)
+
+    def transportStats(self) -> dict:
+        return self.transport.stats.snapshot()
+
+    def resilienceStats(self) -> dict:
+        return self.resilience.snapshot()
+
+    def coalescingStats(self) -> dict:
+        return self.coalescer.snapshot()
+
+    def getWorkoutsPage(self, start: int = 1, limit: int = WORKOUTS_PAGE_SIZE) -> list:
+        """Workout summaries `start` (counting from 1) to `start + limit - 1`."""
+        return self._read(("getWorkoutsPage", start, limit), lambda: self.connectapi(f"""/workout-service/workouts""",
+                                params={"start": start, "limit": limit, "myWorkoutsOnly": True, "sharedWorkoutsOnly": False, "orderBy": "WORKOUT_NAME", "orderSeq": "ASC", "includeAtp": False})) or []
+
+    def iterWorkouts(self, pageSize: int = WORKOUTS_PAGE_SIZE):
+        """Yield every workout summary, one page at a time until a short page."""
+        start = 1
+        while True:
+            page = self.getWorkoutsPage(start, pageSize)
+            yield from page
+            if len(page) < pageSize:
+                return
+            start += len(page)
+
+    def getAllWorkouts(self) -> list:
+        return list(self.iterWorkouts())
 
     def getWorkout(self, workoutId: str) -> dict:
-        return garth.connectapi(f"""/workout-service/workout/{workoutId}""",
-                                method="GET")
+        return self._read(("getWorkout", str(workoutId)), lambda: self.connectapi(f"""/workout-service/workout/{workoutId}""",
+                                method="GET"))
 
     def deleteWorkout(self, workout: dict) -> bool:
-        res = garth.connectapi(f"""/workout-service/workout/{workout['workoutId']}""",
-                               method="DELETE")
-        if res != None:
-            logger.info(f"""Deleted workoutId: {workout['workoutId']} workoutName: {workout['workoutName']}""")
-            return True
-        else:
-            logger.warn(f"""Could not delete workout. Workout not found with workoutId: {workout['workoutId']} (workoutName: {workout['workoutName']})""")
+        """True once deleted, False when Garmin has no such workout (404)."""
+        # a successful delete is a 204, which garth returns as None
+        try:
+            self.connectapi(f"""/workout-service/workout/{workout['workoutId']}""",
+                            method="DELETE")
+        except GarthHTTPError as e:
+            if httpStatus(e) != 404:
+                raise
+            logger.warning("Could not delete workout. Workout not found with workoutId: %s (workoutName: %s)", workout['workoutId'], workout['workoutName'])
             return False
+        logger.info("Deleted workoutId: %s workoutName: %s", workout['workoutId'], workout['workoutName'])
+        return True
 
     def scheduleWorkout(self, id, dateJson: dict) -> bool:
-        resJson = garth.connectapi(f"""/workout-service/schedule/{id}""",
+        resJson = self.connectapi(f"""/workout-service/schedule/{id}""",
                                method="POST",
                                headers={'Content-Type': 'application/json'},
                                json=dateJson)
@@ -40,18 +147,40 @@ class Client(object):
         return True
 
     def importWorkout(self, workoutJson) -> dict:
-        resJson = garth.connectapi(f"""/workout-service/workout""",
+        resJson = self.connectapi(f"""/workout-service/workout""",
                                method="POST",
                                headers={'Content-Type': 'application/json'},
                                data=workoutJson)
-        logger.info(f"""Imported workout {resJson['workoutName']}""")
+        logger.info("Imported workout %s", resJson['workoutName'])
         return resJson
-    
+
+    def getCalendarMonth(self, year: int, month: int) -> list:
+        """Calendar items of one month (1-12)."""
+        # the calendar service counts months from 0
+        resJson = self._read(("getCalendarMonth", year, month), lambda: self.connectapi(
+                               f"""/calendar-service/year/{year}/month/{month - 1}""", method="GET"))
+        return (resJson or {}).get('calendarItems', [])
+
+    def getCalendar(self, start: datetime.date, end: datetime.date) -> list:
+        """Scheduled workouts from start to end (inclusive), fetched one month per call."""
+        items = {}
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            for item in self.getCalendarMonth(year, month):
+                # month views overlap at their edges, so keep each item once
+                if item.get('itemType') == 'workout' and start.isoformat() <= item.get('date', '') <= end.isoformat():
+                    items[item['id']] = item
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return list(items.values())
+
+    def unscheduleWorkout(self, scheduleId) -> bool:
+        self.connectapi(f"""/workout-service/schedule/{scheduleId}""",
+                        method="DELETE")
+        return True
+
     def login(self) -> bool:
-        try:
-            garth.resume(SESSION_DIR)
-            garth.client.username
-        except (FileNotFoundError, GarthException):
-            garth.login(self._email, self._password)
-            garth.save(SESSION_DIR)
-        return True
\ No newline at end of file
+        self.tokenStore.login(self.garth, self._email, self._password)
+        return True
+
+    def refreshToken(self):
+        self.tokenStore.refresh(self.garth, self._email)
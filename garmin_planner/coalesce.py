@@ -0,0 +1,107 @@
+import copy
+import threading
+import time
+from typing import Callable, Hashable
+
+# Single-flight coalescing for Garmin reads.
+#
+# Concurrent identical reads (same account, method and arguments) share one
+# round-trip: the first caller runs it and everyone arriving meanwhile waits
+# for its result. With a ttl the result is also kept for that many seconds.
+# Callers always get their own copy, so mutating a result is safe: shared
+# results (cached, or joined by followers) are deep-copied, while a lone
+# leader's uncached result is handed over as is.
+# Writes invalidate the account's cached results and bump its generation:
+# a read started before the write is neither cached nor joined afterwards.
+
+class _Flight(object):
+    __slots__ = ("done", "result", "error", "generation", "followers")
+
+    def __init__(self, generation: int):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.generation = generation
+        self.followers = 0
+
+class Coalescer(object):
+    def __init__(self, ttl: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._cache = {}
+        self._generations = {}  # account -> number of invalidations
+        self.requests = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.cacheHits = 0
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        with self._lock:
+            self.requests += 1
+            cached = self._cache.get(key)
+            if cached is not None:
+                expires, result = cached
+                if expires > self._clock():
+                    self.cacheHits += 1
+                    return copy.deepcopy(result)
+                del self._cache[key]
+            generation = self._generations.get(key[0], 0)
+            flight = self._inflight.get(key)
+            # a flight started before the account's last write may return stale data
+            leader = flight is None or flight.generation != generation
+            if leader:
+                flight = self._inflight[key] = _Flight(generation)
+                self.executed += 1
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                current = flight.generation == self._generations.get(key[0], 0)
+                cached = flight.error is None and self.ttl > 0 and current
+                if cached:
+                    self._cache[key] = (self._clock() + self.ttl, flight.result)
+                # no one can join once the flight is out of _inflight
+                shared = cached or flight.followers > 0
+            flight.done.set()
+        return copy.deepcopy(flight.result) if shared else flight.result
+
+    def invalidate(self, account: Hashable):
+        """Drop cached results whose key starts with `account`, and stop in-flight reads from being reused."""
+        with self._lock:
+            self._generations[account] = self._generations.get(account, 0) + 1
+            for key in [k for k in self._cache if k[0] == account]:
+                del self._cache[key]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            saved = self.coalesced + self.cacheHits
+            return {
+                "requests": self.requests,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "cacheHits": self.cacheHits,
+                "coalescingRatio": saved / self.requests if self.requests else 0.0,
+            }
+
+_sharedCoalescer = Coalescer()
+
+def sharedCoalescer() -> Coalescer:
+    """The process-wide (coalesce only, no caching) Coalescer."""
+    return _sharedCoalescer
@@ -0,0 +1,202 @@
+from garmin_planner.constant import ConditionType, TargetType
+from garmin_planner.model.workoutModel import WorkoutModel
+from dataclasses import dataclass, field
+import datetime
+import numpy as np
+
+# Duration/distance estimates for whole plans.
+#
+# Every workout's step tree is flattened once into flat NumPy columns (one row
+# per executable step, one row per time-capped repeat group). All arithmetic
+# then happens on those columns in a handful of vectorized passes, so a plan of
+# many athletes and hundreds of thousands of steps is estimated in one go.
+#
+# Per step, for one execution:
+#   time      duration = value,                 distance = speed * duration
+#   distance  distance = value,                 duration = distance / speed
+#   reps      duration = reps * secondsPerRep,  distance = 0
+#   lap       duration = lapButtonSeconds,      distance = 0
+# speed is the midpoint of the step's @P(...) pace range (m/s), falling back to
+# defaultSpeed. `repeat(n)` multiplies its children by n; `repeatUntilTime(t)`
+# lasts exactly t seconds and covers as many rounds of its children as fit.
+
+_KIND_OTHER = 0
+_KIND_TIME = 1
+_KIND_DISTANCE = 2
+_KIND_REPS = 3
+_KIND_LAP = 4
+
+_KINDS = {
+    ConditionType.TIME: _KIND_TIME,
+    ConditionType.DISTANCE: _KIND_DISTANCE,
+    ConditionType.REPS: _KIND_REPS,
+    ConditionType.LAP_BUTTON: _KIND_LAP,
+}
+
+@dataclass
+class PlanEstimate:
+    durations: np.ndarray   # seconds, one entry per workout in input order
+    distances: np.ndarray   # meters, one entry per workout in input order
+    weekly: dict = field(default_factory=dict)  # week start (Monday) -> (seconds, meters)
+
+class _FlatSteps(object):
+    """Column buffers filled while walking the step trees."""
+
+    def __init__(self):
+        self.leafWorkout = []
+        self.leafGroup = []
+        self.leafMult = []
+        self.leafKind = []
+        self.leafValue = []
+        self.leafSpeed = []
+        self.groupWorkout = []
+        self.groupParent = []
+        self.groupMult = []
+        self.groupCap = []
+        self.groupDepth = []
+
+    def add(self, steps, workout: int, group: int, mult: float, depth: int):
+        for step in steps:
+            children = getattr(step, "workoutSteps", None)
+            if children is None:
+                self.leafWorkout.append(workout)
+                self.leafGroup.append(group)
+                self.leafMult.append(mult)
+                self.leafKind.append(_KINDS.get(step.endCondition, _KIND_OTHER))
+                self.leafValue.append(step.endConditionValue or 0.0)
+                if step.targetType == TargetType.PACE and step.targetValueOne and step.targetValueTwo:
+                    self.leafSpeed.append((step.targetValueOne + step.targetValueTwo) / 2)
+                else:
+                    self.leafSpeed.append(np.nan)
+            elif step.endCondition == ConditionType.TIME:
+                # repeatUntilTime: a capped group; iteration counts restart inside it
+                self.groupWorkout.append(workout)
+                self.groupParent.append(group)
+                self.groupMult.append(mult)
+                self.groupCap.append(float(step.endConditionValue or 0.0))
+                self.groupDepth.append(depth)
+                self.add(children, workout, len(self.groupCap) - 1, 1.0, depth + 1)
+            else:
+                self.add(children, workout, group, mult * (step.numberOfIterations or 1), depth)
+
+def _modelSteps(model: WorkoutModel):
+    for segment in model.workoutSegments:
+        yield from segment.workoutSteps
+
+def estimateWorkouts(workouts, defaultSpeed: float = None, secondsPerRep: float = 0.0, lapButtonSeconds: float = 0.0):
+    """Estimate (durations, distances) arrays for a list of step lists, in one batched pass."""
+    flat = _FlatSteps()
+    count = 0
+    for i, steps in enumerate(workouts):
+        flat.add(steps, i, -1, 1.0, 0)
+        count = i + 1
+
+    kind = np.asarray(flat.leafKind, dtype=np.int8)
+    value = np.asarray(flat.leafValue, dtype=np.float64)
+    speed = np.asarray(flat.leafSpeed, dtype=np.float64)
+    if defaultSpeed:
+        speed = np.where(np.isnan(speed), defaultSpeed, speed)
+    hasSpeed = np.nan_to_num(speed) > 0
+    safeSpeed = np.where(hasSpeed, speed, 1.0)
+
+    isTime = kind == _KIND_TIME
+    isDistance = kind == _KIND_DISTANCE
+    duration = np.select(
+        [isTime, isDistance & hasSpeed, kind == _KIND_REPS, kind == _KIND_LAP],
+        [value, value / safeSpeed, value * secondsPerRep, np.full_like(value, lapButtonSeconds)],
+        0.0)
+    distance = np.select([isDistance, isTime & hasSpeed], [value, value * safeSpeed], 0.0)
+
+    mult = np.asarray(flat.leafMult, dtype=np.float64)
+    duration *= mult
+    distance *= mult
+
+    leafWorkout = np.asarray(flat.leafWorkout, dtype=np.int64)
+    leafGroup = np.asarray(flat.leafGroup, dtype=np.int64)
+    groupCount = len(flat.groupCap)
+
+    if groupCount:
+        groupWorkout = np.asarray(flat.groupWorkout, dtype=np.int64)
+        groupParent = np.asarray(flat.groupParent, dtype=np.int64)
+        groupMult = np.asarray(flat.groupMult, dtype=np.float64)
+        groupCap = np.asarray(flat.groupCap, dtype=np.float64)
+        groupDepth = np.asarray(flat.groupDepth, dtype=np.int64)
+
+        # One round of each capped group: its own steps, plus nested groups added below
+        inGroup = leafGroup >= 0
+        roundDuration = np.bincount(leafGroup[inGroup], weights=duration[inGroup], minlength=groupCount)
+        roundDistance = np.bincount(leafGroup[inGroup], weights=distance[inGroup], minlength=groupCount)
+        groupDuration = np.zeros(groupCount)
+        groupDistance = np.zeros(groupCount)
+
+        # Innermost groups first, so a nested group is final before its parent is scaled
+        for depth in range(int(groupDepth.max()), -1, -1):
+            level = groupDepth == depth
+            rounds = np.divide(groupCap[level], roundDuration[level],
+                               out=np.zeros(int(level.sum())), where=roundDuration[level] > 0)
+            groupDuration[level] = groupCap[level] * groupMult[level]
+            groupDistance[level] = roundDistance[level] * rounds * groupMult[level]
+
+            nested = level & (groupParent >= 0)
+            np.add.at(roundDuration, groupParent[nested], groupDuration[nested])
+            np.add.at(roundDistance, groupParent[nested], groupDistance[nested])
+
+        topLevel = groupParent < 0
+        durations = np.bincount(groupWorkout[topLevel], weights=groupDuration[topLevel], minlength=count)
+        distances = np.bincount(groupWorkout[topLevel], weights=groupDistance[topLevel], minlength=count)
+    else:
+        durations = np.zeros(count)
+        distances = np.zeros(count)
+
+    topLevel = leafGroup < 0
+    durations += np.bincount(leafWorkout[topLevel], weights=duration[topLevel], minlength=count)
+    distances += np.bincount(leafWorkout[topLevel], weights=distance[topLevel], minlength=count)
+    return durations, distances
+
+def weeklyTotals(names: list, durations: np.ndarray, distances: np.ndarray, schedule) -> dict:
+    """Sum estimates per week (keyed by the Monday) over (date, workoutName) schedule entries.
+
+    Entries naming a workout that is not in `names` (e.g. "rest") are skipped.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    ordinals = []
+    workouts = []
+    for date, name in schedule:
+        i = index.get(name)
+        if i is not None:
+            ordinals.append(date.toordinal())
+            workouts.append(i)
+    if not ordinals:
+        return {}
+
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    workouts = np.asarray(workouts, dtype=np.int64)
+    # date.fromordinal(1) is a Monday, so (ordinal - 1) // 7 numbers ISO weeks
+    weeks = (ordinals - 1) // 7
+    firstWeek = int(weeks.min())
+    weeks -= firstWeek
+    weekDuration = np.bincount(weeks, weights=durations[workouts])
+    weekDistance = np.bincount(weeks, weights=distances[workouts])
+    weekCount = np.bincount(weeks)
+    return {
+        datetime.date.fromordinal((firstWeek + week) * 7 + 1): (float(weekDuration[week]), float(weekDistance[week]))
+        for week in np.flatnonzero(weekCount)
+    }
+
+def estimatePlan(models: dict, schedule=(), defaultSpeed: float = None, secondsPerRep: float = 0.0, lapButtonSeconds: float = 0.0) -> PlanEstimate:
+    """Estimate every WorkoutModel in `models` (name -> model) and fill its estimate fields.
+
+    Returns per-workout arrays plus weekly totals over the (date, workoutName) schedule.
+    """
+    names = list(models)
+    durations, distances = estimateWorkouts(
+        [list(_modelSteps(models[name])) for name in names],
+        defaultSpeed=defaultSpeed, secondsPerRep=secondsPerRep, lapButtonSeconds=lapButtonSeconds)
+
+    for i, name in enumerate(names):
+        model = models[name]
+        model.estimatedDurationInSecs = int(round(durations[i])) if durations[i] > 0 else None
+        model.estimatedDistanceInMeters = float(distances[i]) if distances[i] > 0 else None
+        model.avgTrainingSpeed = float(distances[i] / durations[i]) if durations[i] > 0 and distances[i] > 0 else None
+
+    return PlanEstimate(durations=durations, distances=distances, weekly=weeklyTotals(names, durations, distances, schedule))
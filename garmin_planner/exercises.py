@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import threading
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
+
+# Garmin exercise catalog and fuzzy name resolution.
+#
+# exercises.json maps each Garmin strength category to its valid
+# exerciseName values. ExerciseCatalog builds a trigram index over the
+# normalized names (lower case, words separated by single spaces), so
+# resolving a user-written name only touches the entries sharing a trigram
+# with it instead of scanning the whole catalog. The score is the Jaccard
+# similarity of the two trigram sets. Shared trigrams are counted in one
+# numpy pass; an entry sharing k of the query's n trigrams scores at most
+# k/n, so only entries sharing enough to beat the most-shared entry are
+# scored. Results are memoized per catalog, per (name, category), up to
+# _MEMO_SIZE names. GARMIN_EXERCISE_CATALOG points at a replacement file.
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercises.json")
+CATALOG_ENV = "GARMIN_EXERCISE_CATALOG"
+
+# Equipment categories repeat generic names (LUNGE, ROW, PLANK...); a name
+# only resolves into one of them across all categories when it mentions the
+# equipment
+EQUIPMENT_CATEGORIES = {
+    "BANDED_EXERCISES": ("band",),
+    "BATTLE_ROPE": ("rope",),
+    "SANDBAG": ("sandbag",),
+    "SLEDGE_HAMMER": ("sledge", "hammer"),
+    "SUSPENSION": ("suspension", "suspended", "trx"),
+    "TIRE": ("tire", "tyre"),
+}
+
+_MEMO_SIZE = 4096
+_EQUIPMENT_WORD = re.compile("|".join(word for words in EQUIPMENT_CATEGORIES.values() for word in words))
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+def normalize(name: str) -> str:
+    """'30-degree Lat Pull-down' and '_30_DEGREE_LAT_PULLDOWN' both become words separated by spaces."""
+    return _NON_ALNUM.sub(" ", name.lower()).strip()
+
+def trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+@dataclass(frozen=True)
+class ExerciseMatch:
+    category: str
+    exerciseName: str
+    score: float
+
+class ExerciseCatalog(object):
+    def __init__(self, catalog: dict):
+        self.entries = []           # (category, exerciseName)
+        self._grams = []
+        self._names = {}            # category -> set of exerciseName
+        self._indexes = {None: {}}  # category (None: all) -> trigram -> entry ids
+        for category, names in catalog.items():
+            category = category.upper()
+            for exerciseName in names:
+                entry = len(self.entries)
+                grams = trigrams(normalize(exerciseName))
+                self.entries.append((category, exerciseName))
+                self._grams.append(grams)
+                self._names.setdefault(category, set()).add(exerciseName)
+                categoryIndex = self._indexes.setdefault(category, {})
+                for gram in grams:
+                    self._indexes[None].setdefault(gram, []).append(entry)
+                    categoryIndex.setdefault(gram, []).append(entry)
+        for index in self._indexes.values():
+            for gram, entries in index.items():
+                index[gram] = np.array(entries, dtype=np.intp)
+        categories = sorted(self._names)
+        self._categoryCodes = {category: code for code, category in enumerate(categories)}
+        self._entryCategory = np.array([self._categoryCodes[category] for category, _ in self.entries], dtype=np.intp)
+        self._entrySize = np.array([len(grams) for grams in self._grams], dtype=np.intp)
+        self._entryNameLength = np.array([len(name) for _, name in self.entries], dtype=np.intp)
+        self._equipmentCodes = tuple(self._categoryCodes[c] for c in EQUIPMENT_CATEGORIES if c in self._categoryCodes)
+        self._excludedMasks = {}    # excluded category codes -> entry mask
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH) -> "ExerciseCatalog":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def categories(self) -> list:
+        return sorted(self._names)
+
+    def contains(self, category: str, exerciseName: str) -> bool:
+        return exerciseName in self._names.get(category, ())
+
+    def _excludedMask(self, codes: tuple) -> np.ndarray:
+        mask = self._excludedMasks.get(codes)
+        if mask is None:
+            mask = self._excludedMasks[codes] = np.isin(self._entryCategory, codes)
+        return mask
+
+    def _best(self, text: str, category: Optional[str]) -> Optional[ExerciseMatch]:
+        index = self._indexes.get(category)
+        if not index:
+            return None
+        query = trigrams(text)
+        postings = [index[gram] for gram in query if gram in index]
+        if not postings:
+            return None
+        overlaps = np.bincount(np.concatenate(postings), minlength=len(self.entries))
+        if category is None:
+            excluded = self._equipmentCodes
+            if _EQUIPMENT_WORD.search(text) is not None:
+                excluded = tuple(self._categoryCodes[c] for c, words in EQUIPMENT_CATEGORIES.items()
+                                 if c in self._categoryCodes and not any(word in text for word in words))
+            if excluded:
+                overlaps[self._excludedMask(excluded)] = 0
+        top = int(overlaps.argmax())
+        if overlaps[top] == 0:
+            return None
+        # the most-shared entry's score bounds the best from below, and an
+        # entry sharing k trigrams scores at most k / size
+        size = len(query)
+        floor = overlaps[top] / (size + self._entrySize[top] - overlaps[top])
+        candidates = np.flatnonzero(overlaps >= floor * size - 1e-9)
+        shared = overlaps[candidates]
+        scores = shared / (size + self._entrySize[candidates] - shared)
+        bestScore = scores.max()
+        tied = candidates[scores == bestScore]
+        # ties go to the shorter (more generic) name, then to the catalog order
+        best = int(tied[np.lexsort((tied, self._entryNameLength[tied]))[0]])
+        return ExerciseMatch(*self.entries[best], float(bestScore))
+
+    def resolve(self, name: str, category: Optional[str] = None, threshold: float = 0.0) -> Optional[ExerciseMatch]:
+        """Closest catalog entry to `name` (within `category` if given) scoring at least `threshold`."""
+        key = (normalize(name), category)
+        with self._lock:
+            if key in self._memo:
+                match = self._memo[key]
+            else:
+                match = self._best(key[0], category) if key[0] else None
+                if len(self._memo) >= _MEMO_SIZE:
+                    self._memo.clear()
+                self._memo[key] = match
+        if match is None or match.score < threshold:
+            return None
+        return match
+
+_catalog = None
+_catalogLock = threading.Lock()
+
+def defaultCatalog() -> ExerciseCatalog:
+    """Process-wide catalog, loaded on first use."""
+    global _catalog
+    with _catalogLock:
+        if _catalog is None:
+            _catalog = ExerciseCatalog.load(os.environ.get(CATALOG_ENV) or CATALOG_PATH)
+        return _catalog
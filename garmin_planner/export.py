@@ -0,0 +1,120 @@
+import gzip
+import json
+import os
+import queue
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from garmin_planner.__init__ import logger
+from typing import Optional
+
+# Local snapshot of an account's workout library.
+#
+# A snapshot is a gzip-compressed JSON lines file with one
+# {"workoutId", "updatedDate", "workout": <full definition>} record per
+# workout. exportWorkouts lists the summaries page by page, fetches full
+# definitions from a bounded thread pool and writes each record as soon as
+# it arrives. When the previous snapshot is available, workouts whose
+# updatedDate is unchanged are copied from it instead of being fetched again.
+
+SNAPSHOT_EXTENSION = ".jsonl.gz"
+
+@dataclass
+class ExportResult:
+    total: int = 0
+    fetched: int = 0
+    reused: int = 0
+    failed: int = 0
+
+def readSnapshot(path: str):
+    """Yield the records of a snapshot file."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def _previousRecords(path: Optional[str]) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        return {record['workoutId']: record for record in readSnapshot(path)}
+    except (OSError, EOFError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable snapshot '{path}': {e}")
+        return {}
+
+# mode of a new snapshot; reading the umask would mean changing it process-wide
+NEW_SNAPSHOT_MODE = 0o644
+
+def _snapshotMode(path: str) -> int:
+    """Mode for the new snapshot: the replaced file's, else NEW_SNAPSHOT_MODE."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return NEW_SNAPSHOT_MODE
+
+def exportWorkouts(conn, path: str, concurrency: int = 4, previous: Optional[str] = None) -> ExportResult:
+    """Write the account's full workout library to `path`.
+
+    `previous` defaults to `path` itself, so re-exporting to the same file
+    only fetches workouts that changed since the last run.
+    """
+    previousRecords = _previousRecords(previous if previous is not None else path)
+    result = ExportResult()
+    concurrency = max(1, concurrency)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmpPath = tempfile.mkstemp(dir=directory, prefix=".export-", suffix=SNAPSHOT_EXTENSION)
+    os.close(fd)
+    try:
+        with gzip.open(tmpPath, "wt", encoding="utf-8") as out:
+            def write(record):
+                out.write(json.dumps(record) + "\n")
+
+            finished = queue.Queue()
+            pending = 0
+
+            def collect(limit: int):
+                """Write finished fetches, waiting until at most `limit` are still pending."""
+                nonlocal pending
+                while pending:
+                    try:
+                        summary, future = finished.get(block=pending > limit)
+                    except queue.Empty:
+                        return
+                    pending -= 1
+                    try:
+                        workout = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to export workout {summary['workoutId']} ({summary.get('workoutName')}): {e}")
+                        result.failed += 1
+                        # an older copy beats no copy
+                        if summary['workoutId'] in previousRecords:
+                            write(previousRecords[summary['workoutId']])
+                        continue
+                    write({"workoutId": summary['workoutId'], "updatedDate": summary.get('updatedDate'), "workout": workout})
+                    result.fetched += 1
+
+            # summaries arrive page by page; fetches start (and get written)
+            # while later pages are still being listed
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for summary in conn.iterWorkouts():
+                    result.total += 1
+                    record = previousRecords.get(summary['workoutId'])
+                    if record is not None and record.get('updatedDate') == summary.get('updatedDate'):
+                        write(record)
+                        result.reused += 1
+                    else:
+                        future = pool.submit(conn.getWorkout, summary['workoutId'])
+                        future.add_done_callback(lambda future, summary=summary: finished.put((summary, future)))
+                        pending += 1
+                    # keep a bounded backlog of fetches in flight
+                    collect(4 * concurrency)
+                collect(0)
+        os.chmod(tmpPath, _snapshotMode(path))
+        os.replace(tmpPath, path)
+    except BaseException:
+        if os.path.exists(tmpPath):
+            os.unlink(tmpPath)
+        raise
+    return result
@@ -0,0 +1,153 @@
+import re
+import time
+import yaml
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from garmin_planner.__init__ import logger
+from garmin_planner.client import Client
+from garmin_planner.journal import Journal
+from garmin_planner.resilience import ResilienceConfig
+from garmin_planner.transport import TransportConfig, sharedTransport
+from typing import Callable, Optional
+
+# Syncing one compiled plan to many Garmin accounts.
+#
+# The accounts file lists credentials, either as a top-level list or under
+# `accounts:`:
+#
+#   accounts:
+#     - email: alice@example.com
+#       password: ...
+#       name: alice        # optional label for the report and journal file
+#       rate: 2            # optional cap on requests per second
+#
+# fanOut runs sync(client, journal) for every account on a thread pool, so
+# the total time follows the slowest account rather than the sum. Accounts
+# are isolated: each has its own Client (and so its own rate limiter and
+# circuit breaker, see garmin_planner.resilience) and its own journal, and a
+# failed login or sync only fails that account. A finished account drops its
+# journal; a failed one keeps it for a resumed run.
+
+DEFAULT_CONCURRENCY = 16
+
+class AccountsError(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class Account:
+    email: str
+    password: str = field(repr=False)
+    label: str = ""
+    rate: Optional[float] = None
+
+@dataclass
+class AccountResult:
+    label: str
+    ok: bool = False
+    seconds: float = 0.0
+    operations: Counter = field(default_factory=Counter)    # journal op -> count done by this run
+    error: Optional[str] = None
+
+@dataclass
+class FanoutReport:
+    results: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def failed(self) -> list:
+        return [result for result in self.results if not result.ok]
+
+    def summaryTable(self) -> str:
+        ops = sorted({op for result in self.results for op in result.operations})
+        width = max([len("account")] + [len(result.label) for result in self.results])
+        lines = [f"{'account':<{width}} {'status':>6} {'time':>8}" + "".join(f" {op:>8}" for op in ops)]
+        for result in self.results:
+            line = f"{result.label:<{width}} {'ok' if result.ok else 'FAILED':>6} {result.seconds:>7.2f}s"
+            line += "".join(f" {result.operations.get(op, 0):>8}" for op in ops)
+            if result.error:
+                line += f"  {result.error}"
+            lines.append(line)
+        lines.append(f"{len(self.results) - len(self.failed)}/{len(self.results)} accounts synced in {self.seconds:.2f}s")
+        return "\n".join(lines)
+
+def _account(entry, index: int) -> Account:
+    if not isinstance(entry, dict) or not entry.get("email") or "password" not in entry:
+        raise AccountsError(f"Account {index + 1} needs 'email' and 'password'")
+    rate = entry.get("rate")
+    if rate is not None and (isinstance(rate, bool) or not isinstance(rate, (int, float)) or rate <= 0):
+        raise AccountsError(f"Account {index + 1}: 'rate' must be a positive number, got {rate!r}")
+    return Account(str(entry["email"]), str(entry["password"]), str(entry.get("name") or entry["email"]),
+                   float(rate) if rate is not None else None)
+
+def parseAccounts(data) -> list:
+    entries = data.get("accounts") if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        raise AccountsError("The accounts file needs a non-empty list of accounts")
+    accounts = [_account(entry, index) for index, entry in enumerate(entries)]
+    labels = Counter(account.label for account in accounts)
+    duplicates = sorted(label for label, count in labels.items() if count > 1)
+    if duplicates:
+        raise AccountsError(f"Duplicate account names: {', '.join(duplicates)}")
+    return accounts
+
+def loadAccounts(path: str) -> list:
+    with open(path) as f:
+        try:
+            data = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise AccountsError(f"Could not parse '{path}': {e}")
+    return parseAccounts(data)
+
+def accountFileLabel(account: Account) -> str:
+    """The account label, made safe for a file name."""
+    return re.sub(r"[^\w.@-]+", "_", account.label)
+
+def rateLimit(rate: Optional[float], config: Optional[ResilienceConfig] = None) -> Optional[ResilienceConfig]:
+    """ResilienceConfig whose adaptive rate never exceeds `rate` requests per second."""
+    if rate is None:
+        return config
+    config = config or ResilienceConfig()
+    return replace(config, rate=min(config.rate, rate), burst=max(1.0, min(config.burst, rate)),
+                   minRate=min(config.minRate, rate), maxRate=rate)
+
+def accountClient(account: Account, concurrency: int = DEFAULT_CONCURRENCY) -> Client:
+    # enough pooled connections for every account syncing at once
+    transport = sharedTransport(TransportConfig(poolMaxSize=max(TransportConfig().poolMaxSize, concurrency)))
+    return Client(account.email, account.password, transport=transport, resilience=rateLimit(account.rate))
+
+def _syncAccount(account: Account, journal: Journal, sync: Callable[[Client, Journal], None],
+                 clientFor: Callable[[Account], Client]) -> AccountResult:
+    result = AccountResult(account.label)
+    started = time.perf_counter()
+    done = len(journal)
+    try:
+        with journal:
+            sync(clientFor(account), journal)
+        result.ok = True
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+        logger.error(f"Sync of account {account.label} failed, its journal '{journal.path}' is kept: {result.error}")
+    result.seconds = time.perf_counter() - started
+    result.operations = Counter(entry.get("op") for entry in journal.entries[done:])
+    if result.ok:
+        journal.discard()
+        logger.info(f"Synced account {account.label} in {result.seconds:.2f}s")
+    return result
+
+def fanOut(accounts: list, sync: Callable[[Client, Journal], None], journalFor: Callable[[Account], Journal],
+           clientFor: Optional[Callable[[Account], Client]] = None,
+           concurrency: Optional[int] = None) -> FanoutReport:
+    """Run sync(client, journal) for every account concurrently; results keep the accounts' order."""
+    concurrency = max(1, min(concurrency or DEFAULT_CONCURRENCY, len(accounts) or 1))
+    if clientFor is None:
+        clientFor = lambda account: accountClient(account, concurrency)
+    # opened up front: a journal that belongs to another plan stops the run before any account starts
+    journals = [journalFor(account) for account in accounts]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fanout") as pool:
+        futures = [pool.submit(_syncAccount, account, journal, sync, clientFor)
+                   for account, journal in zip(accounts, journals)]
+        results = [future.result() for future in futures]
+    return FanoutReport(results, time.perf_counter() - started)
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+from garmin_planner.__init__ import logger
+from typing import Optional
+
+# Append-only JSON lines journal of completed remote operations.
+#
+# Each line is {"op": ..., "key": ..., ...data}. Lines are flushed and
+# fsynced as they are recorded, so after a crash the journal lists exactly
+# the operations that finished; a torn last line is ignored on load.
+
+class Journal(object):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = {}
+        self.entries = self._load()
+        self._file = None
+
+    def _load(self) -> list:
+        entries = []
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path) as f:
+            for lineNo, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Ignoring unreadable journal line {lineNo} in '{self.path}'")
+                    continue
+                entries.append(entry)
+                self._index[(entry.get("op"), str(entry.get("key")))] = entry
+        return entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, op: str, key) -> Optional[dict]:
+        return self._index.get((op, str(key)))
+
+    def done(self, op: str, key) -> bool:
+        return (op, str(key)) in self._index
+
+    def record(self, op: str, key, **data) -> dict:
+        entry = {"op": op, "key": key, **data}
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.entries.append(entry)
+            self._index[(op, str(key))] = entry
+        return entry
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """Close and delete the journal once its run has finished."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
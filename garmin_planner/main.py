@@ -1,15 +1,34 @@
 from garmin_planner.client import Client
 from garmin_planner.__init__ import logger
 from garmin_planner.model.workoutModel import WorkoutModel, WorkoutSegment, WorkoutStep, RepeatStep
+from garmin_planner.model.compactModel import compactSteps
 from garmin_planner.constant import *
 from garmin_planner.parser import *
+from garmin_planner.bundle import PlanBundle, writeBundle, BUNDLE_EXTENSION
+from garmin_planner.estimator import estimatePlan
+from garmin_planner.journal import Journal
+from garmin_planner.prune import selectWorkouts, deleteWorkouts, PruneResult, DELETE_OP
+from garmin_planner.export import exportWorkouts, ExportResult, SNAPSHOT_EXTENSION
+from garmin_planner.cassette import Cassette
+from garmin_planner.profiling import phase, profiledIter
+from garmin_planner.exercises import defaultCatalog
+from garmin_planner.schedule import compileSchedule, ScheduleError, Schedule
+from garmin_planner.fanout import fanOut, loadAccounts, accountFileLabel, AccountsError, FanoutReport, DEFAULT_CONCURRENCY
+from garmin_planner.sync import (IMPORT_OP, SCHEDULE_OP, RUN_OP, SYNC_JOURNAL_SUFFIX, uploadWorkouts, scheduleEntries,
+                                 syncJournalPath, openSyncJournal, pushBundle, pushPlan, addPushArguments, runPush,
+                                 _resolve_paths, _connect, _addCassetteArguments, _cassetteFromArgs,
+                                 _addProfileArguments, _profiled)
 from enum import Enum as PyEnum
+from functools import lru_cache
 from typing import Optional
 import re
 import json
+import marshal
+import uuid
 import datetime
 import sys
 import argparse
+import threading
 import os
 
 __version__ = "0.1.0"
@@ -28,8 +47,8 @@ def serialize(obj):
     # Handle basic Python types first
     if isinstance(obj, (str, int, float, bool)) or obj is None:
         return obj
-    # Handle lists
-    if isinstance(obj, list):
+    # Handle lists (and the tuples used by the compact step records)
+    if isinstance(obj, (list, tuple)):
         return [serialize(item) for item in obj]
     # Support Python Enums and the library's enum-like classes
     if isinstance(obj, PyEnum):
@@ -49,22 +68,440 @@ def serialize(obj):
         return {k: serialize(v) for k, v in obj.__dict__.items()}
     return str(obj)
 
-def createWorkoutList(steps: list, stepCount: list, inRepeat: bool = False, sport_type: Optional[SportType] = None):
+# Step names with a fixed meaning; any other name is treated as an exercise
+_STRENGTH_STEP_NAMES = ("exercise", "rest", "cardio")
+_RUNNING_STEP_NAMES = ("run", "warmup", "cooldown", "recovery", "repeat")
+
+# Marks an exercise name that matched no category rule, so the step keeps
+# whatever category an earlier key of the same step dict set
+_NO_CATEGORY_MATCH = object()
+
+class _StepKey(object):
+    """One `name: detail` entry of a YAML step, parsed but not yet bound to a sport type."""
+    __slots__ = ("name", "iterations", "detail", "detailDict", "category", "exerciseName", "hasCardioChild", "children")
+
+    def __init__(self, name, iterations, detail):
+        self.name = name
+        self.iterations = iterations
+        self.detail = detail
+        self.detailDict = None
+        self.category = _NO_CATEGORY_MATCH
+        self.exerciseName = None
+        self.hasCardioChild = False
+        self.children = None
+
+    def withChildren(self, children: list) -> "_StepKey":
+        key = _StepKey(self.name, self.iterations, self.detail)
+        key.detailDict = self.detailDict
+        key.category = self.category
+        key.exerciseName = self.exerciseName
+        key.hasCardioChild = self.hasCardioChild
+        key.children = children
+        return key
+
+def _classifyExercise(parsedStep: str, explicitCategory: Optional[str]):
+    """Map a custom exercise name to (category, exerciseName).
+
+    category is _NO_CATEGORY_MATCH when no rule applies. exerciseName is only
+    set when a rule names the exercise explicitly; the generic UPPER_CASE
+    fallback is applied once the final category is known.
+    """
+    category = _NO_CATEGORY_MATCH
+    exerciseName = None
+    name = parsedStep.lower()
+    # Use explicit category if provided in YAML, otherwise try to determine from exercise name
+    if explicitCategory:
+        category = explicitCategory.upper()
+        # For explicit categories, still need to set exerciseName based on exercise name
+        # Special cases for sled and carry categories
+        if category == "SLED":
+            if "sled push" in name:
+                exerciseName = "PUSH"
+            elif "sled" in name and "drag" in name:
+                exerciseName = "BACKWARD_DRAG"
+        elif category == "CARRY":
+            if "farmer" in name and "carry" in name:
+                exerciseName = "FARMERS_CARRY"
+        elif category == "SHOULDER_PRESS":
+            if "push press" in name:
+                exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
+        # For CORE category, we need special handling based on the exercise name
+        elif category == "CORE":
+            if "x abs" in name or "x-abs" in name:
+                category = "SIT_UP"  # X Abs uses SIT_UP category with X_ABS as exerciseName
+                exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
+            else:
+                # For other CORE exercises, use default behavior
+                pass
+    elif "bulgarian split squat" in name:
+        category = "LUNGE"
+    elif "good morning" in name:
+        category = "LEG_CURL"
+    elif "clean and jerk" in name:
+        category = "OLYMPIC_LIFT"
+    elif "wall ball" in name or "wallball" in name:
+        category = "SQUAT"
+    elif "medicine ball slam" in name:
+        category = "PLYO"
+    elif "ski moguls" in name:
+        category = "CARDIO"
+    elif "pike push" in name or "push-up" in name:
+        category = "PUSH_UP"
+    elif "plank" in name:
+        category = "PLANK"
+    elif "burpee" in name:
+        category = "TOTAL_BODY"
+    elif "inverted row" in name or "row" in name:
+        category = "ROW"
+    elif "squat" in name:
+        category = "SQUAT"
+    elif "push press" in name:
+        category = "SHOULDER_PRESS"
+    elif "press" in name:
+        category = "BENCH_PRESS"
+    elif "deadlift" in name:
+        category = "DEADLIFT"
+    elif "pull" in name or "lat" in name:
+        category = "PULL_UP"
+        # For lat pull-down exercises, use underscore prefix and convert PULL_DOWN to PULLDOWN
+        # Convert exercise name to Garmin format (UPPER_CASE with underscores)
+        exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
+        if "lat" in name or "pull-down" in name:
+            exerciseName = "_" + exerciseName.replace("PULL_DOWN", "PULLDOWN")
+    elif "kettlebell" in name:
+        # Check for specific kettlebell exercises
+        if "floor to shelf" in name:
+            category = "DEADLIFT"
+        elif "swing" in name:
+            category = "HIP_SWING"
+        else:
+            category = "SQUAT"  # Default for kettlebell exercises
+    elif "push up" in name or "pushup" in name:
+        category = "PUSH_UP"
+    elif "sled push" in name:
+        category = "SLED"
+        exerciseName = "PUSH"
+    elif "sled" in name and "drag" in name:
+        category = "SLED"
+        exerciseName = "BACKWARD_DRAG"
+    elif "sled" in name or "drag" in name:
+        category = None  # Not supported by Garmin
+    elif "farmer" in name and "carry" in name:
+        category = "CARRY"
+        exerciseName = "FARMERS_CARRY"
+    elif "bar hold" in name or ("hold" in name and "bar" in name):
+        category = "DEADLIFT"  # Bar holds are typically grip/strength work related to deadlifts
+    elif "x abs" in name or "x-abs" in name:
+        category = "SIT_UP"  # X Abs uses SIT_UP category with X_ABS as exerciseName
+        exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
+    elif "ghd back extension" in name or "back extension" in name:
+        category = "CORE"  # GHD back extensions are core exercises
+    elif "carry" in name:
+        category = None  # Not supported by Garmin
+    elif "push" in name:
+        category = None  # Not supported by Garmin
+    # Add more categories as needed
+    return category, exerciseName
+
+def _parseStepDetailWithDefaults(stepDetail) -> dict:
+    parsedStepDetailDict = parse_stepdetail(stepDetail)
+    # Ensure we have endCondition and endConditionValue - add defaults if missing
+    if 'endCondition' not in parsedStepDetailDict or 'endConditionValue' not in parsedStepDetailDict:
+        # Default to REPS with 10 if not parsed
+        if isinstance(stepDetail, str) and 'reps' in stepDetail.lower():
+            # Try to extract reps number
+            reps_match = re.search(r'(\d+)', stepDetail.lower())
+            if reps_match:
+                parsedStepDetailDict['endCondition'] = ConditionType.REPS
+                parsedStepDetailDict['endConditionValue'] = int(reps_match.group(1))
+            else:
+                parsedStepDetailDict['endCondition'] = ConditionType.REPS
+                parsedStepDetailDict['endConditionValue'] = 10
+        elif isinstance(stepDetail, str) and 's' in stepDetail.lower() and not 'reps' in stepDetail.lower():
+            # Try to extract seconds
+            sec_match = re.search(r'(\d+)s', stepDetail.lower())
+            if sec_match:
+                parsedStepDetailDict['endCondition'] = ConditionType.TIME
+                parsedStepDetailDict['endConditionValue'] = int(sec_match.group(1))
+            else:
+                parsedStepDetailDict['endCondition'] = ConditionType.TIME
+                parsedStepDetailDict['endConditionValue'] = 60
+        else:
+            # Default fallback
+            parsedStepDetailDict['endCondition'] = ConditionType.REPS
+            parsedStepDetailDict['endConditionValue'] = 10
+    # Extract distance/reps info for description if not already in description
+    if isinstance(stepDetail, str) and 'description' not in parsedStepDetailDict:
+        # Check if stepDetail contains distance or reps info
+        desc_parts = []
+        if "reps" in stepDetail.lower():
+            # Extract reps number
+            reps_match = re.search(r'(\d+)\s*reps?', stepDetail.lower())
+            if reps_match:
+                desc_parts.append(reps_match.group(1))
+        elif "m" in stepDetail.lower() and "min" not in stepDetail.lower():
+            # Extract distance in meters
+            dist_match = re.search(r'(\d+)\s*m', stepDetail.lower())
+            if dist_match:
+                desc_parts.append(dist_match.group(1) + "m")
+        elif "s" in stepDetail.lower() and "sec" not in stepDetail.lower():
+            # Extract seconds
+            sec_match = re.search(r'(\d+)\s*s(?!\w)', stepDetail.lower())
+            if sec_match:
+                desc_parts.append(sec_match.group(1) + "s")
+
+        # If we have distance/reps info and no description yet, add it
+        if desc_parts and 'description' not in parsedStepDetailDict:
+            # If there's already a description from pipe, append to it
+            if "|" in stepDetail:
+                # Description already handled by parse_stepdetail
+                pass
+            else:
+                parsedStepDetailDict['description'] = " ".join(desc_parts)
+    return parsedStepDetailDict
+
+# Catalog similarity needed to classify a name no rule knows, and to replace
+# a rule's UPPER_CASE guess that is not a valid exerciseName of its category
+_CATALOG_MATCH_SCORE = 0.5
+_CATALOG_RENAME_SCORE = 0.75
+
+def _resolveWithCatalog(parsedStep: str, category, exerciseName: Optional[str]):
+    """Fallback for names the rules leave unclassified or would give a guessed exerciseName."""
+    catalog = defaultCatalog()
+    if category is _NO_CATEGORY_MATCH:
+        match = catalog.resolve(parsedStep, threshold=_CATALOG_MATCH_SCORE)
+        if match is not None:
+            return match.category, match.exerciseName
+    elif category is not None and exerciseName is None and category not in ("SLED", "CARRY"):
+        guess = parsedStep.upper().replace(" ", "_").replace("-", "_")
+        if not catalog.contains(category, guess):
+            match = catalog.resolve(parsedStep, category, threshold=_CATALOG_RENAME_SCORE)
+            if match is not None:
+                return category, match.exerciseName
+    return category, exerciseName
+
+@lru_cache(maxsize=4096)
+def _parseStepName(stepName: str):
+    """parse_bracket plus exercise classification, memoized: plans repeat the same step names."""
+    parsedStep, numIteration, explicitCategory = parse_bracket(stepName)
+    category, exerciseName = _NO_CATEGORY_MATCH, None
+    if parsedStep is not None and parsedStep not in _STRENGTH_STEP_NAMES and parsedStep not in _RUNNING_STEP_NAMES and parsedStep != "repeatuntiltime":
+        category, exerciseName = _resolveWithCatalog(parsedStep, *_classifyExercise(parsedStep, explicitCategory))
+    return parsedStep, numIteration, category, exerciseName
+
+@lru_cache(maxsize=4096)
+def _parseStepDetailCached(stepDetail: str) -> dict:
+    # Callers must copy the result before adding per-step fields
+    return _parseStepDetailWithDefaults(stepDetail)
+
+# Hash-consing of step subtrees. Large plans repeat the same blocks (repeat
+# groups, warmups with children) in hundreds of workouts. The first time a
+# block's content is seen it is built as usual; from the second time on,
+# every occurrence shares one set of built keys, so one-off blocks cost
+# nothing extra. Leaf steps already reuse their parse through the caches
+# above. A shared block finalizes once per (sport
+# type, inRepeat) into a _Finalized numbered from 0, whose children are the
+# children's own _Finalized at an id offset, so nested blocks are shared
+# too. Every occurrence gets fresh step objects with stepId/stepOrder shifted
+# to its position; childStepId does not depend on the position.
+#
+# The table is shared by every compile in the process, including concurrent
+# API requests: blocks and finalized memos are built outside the lock and
+# published under it, first writer wins, so every reader sees one value.
+
+# marshal version 2 writes no back-references, so equal YAML values give
+# equal bytes (keeping 1, 1.0 and True apart, which don't compile the same)
+_CONTENT_KEY_VERSION = 2
+
+class _BuiltStep(list):
+    """The keys of one built step. finalized maps (sport type, inRepeat) to _Finalized once shared."""
+    finalized = None
+
+class _Finalized(object):
+    """A finalized step numbered from 0 and the number of step ids it uses.
+
+    A repeat's step.workoutSteps holds (child _Finalized, id offset) pairs;
+    _materialize turns them into steps.
+    """
+    __slots__ = ("step", "size")
+
+    def __init__(self, step, size: int):
+        self.step = step
+        self.size = size
+
+class _SharedBlock(object):
+    """Per content: seen once yet, and the shared built keys from the second sighting on."""
+    __slots__ = ("seen", "keys", "strength")
+
+    def __init__(self):
+        self.seen = False
+        self.keys = None
+        self.strength = False
+
+_sharedBlocksLock = threading.Lock()
+
+@lru_cache(maxsize=4096)
+def _sharedBlock(content: bytes) -> _SharedBlock:
+    return _SharedBlock()
+
+def _blockFor(step) -> Optional[_SharedBlock]:
+    """The _SharedBlock of a step with nested steps, None for leaves and unkeyable values."""
+    if not isinstance(step, dict):
+        return None
+    for detail in step.values():
+        if isinstance(detail, list):
+            break
+    else:
+        return None
+    try:
+        return _sharedBlock(marshal.dumps(step, _CONTENT_KEY_VERSION))
+    except ValueError:
+        return None
+
+def _buildStepList(steps: list, evidence: list, countsForSport: bool = True) -> list:
+    nodes = []
+    for step in steps:
+        block = _blockFor(step)
+        if block is not None:
+            with _sharedBlocksLock:
+                firstSighting = not block.seen
+                block.seen = True
+        if block is None or firstSighting:
+            nodes.append(_buildStep(step, evidence, countsForSport))
+            continue
+        keys = block.keys
+        if keys is None:
+            blockEvidence = [False]
+            keys = _buildStep(step, blockEvidence)
+            keys.finalized = {}
+            with _sharedBlocksLock:
+                if block.keys is None:
+                    # strength first: readers check keys without the lock
+                    block.strength = blockEvidence[0]
+                    block.keys = keys
+                keys = block.keys
+        if countsForSport and block.strength:
+            evidence[0] = True
+        nodes.append(keys)
+    return nodes
+
+def _buildStep(step: dict, evidence: list, countsForSport: bool = True, buildChildren=None) -> list:
+    """First (and only) walk over a YAML step: parse every key once and note sport-type evidence.
+
+    evidence is a one-element list set to True when the step tree looks like a
+    strength workout. Only top-level steps and `repeat` groups count, which is
+    what sport detection has always looked at. buildChildren(index, steps,
+    evidence, countsForSport) overrides how repeat children are built.
+    """
+    keys = _BuiltStep()
+    built = True
+    for index, stepName in enumerate(step):
+        stepDetail = step[stepName]
+        parsedStep, numIteration, category, exerciseName = _parseStepName(stepName)
+
+        if countsForSport and not evidence[0]:
+            if parsedStep in _STRENGTH_STEP_NAMES:
+                evidence[0] = True
+            elif parsedStep not in _RUNNING_STEP_NAMES:
+                # Unknown step type, likely a strength exercise name
+                # Check if the step detail contains "reps" which is strength-specific
+                if isinstance(stepDetail, str) and "reps" in stepDetail.lower():
+                    evidence[0] = True
+
+        # Keys after a repeat are never compiled, only checked for evidence above
+        if not built:
+            continue
+
+        key = _StepKey(parsedStep, numIteration, stepDetail)
+        key.category = category
+        key.exerciseName = exerciseName
+        keys.append(key)
+        if parsedStep == "repeat" or parsedStep == "repeatuntiltime":
+            # Sport detection never looked inside time-based repeats
+            childrenCountForSport = countsForSport and parsedStep == "repeat"
+            if buildChildren is None:
+                key.children = _buildStepList(stepDetail, evidence, childrenCountForSport)
+            else:
+                key.children = buildChildren(index, stepDetail, evidence, childrenCountForSport)
+            built = False
+            continue
+
+        if parsedStep == "warmup" and isinstance(stepDetail, list):
+            # Check if there's a cardio child
+            for child in stepDetail:
+                for childName in child:
+                    childParsed = _parseStepName(childName)[0]
+                    if childParsed == "cardio" or childParsed == "run":
+                        key.hasCardioChild = True
+                        break
+                if key.hasCardioChild:
+                    break
+
+        if isinstance(stepDetail, str):
+            key.detailDict = _parseStepDetailCached(stepDetail)
+        elif not isinstance(stepDetail, list):
+            key.detailDict = _parseStepDetailWithDefaults(stepDetail)
+    return keys
+
+def _finalizeStepList(nodes: list, stepCount: list, inRepeat: bool = False, sport_type: Optional[SportType] = None):
     workoutSteps = []
-    for _, step in enumerate(steps):
-        workoutStep = createWorkoutStep(step, stepCount, inRepeat=inRepeat, sport_type=sport_type)
+    for node in nodes:
+        if isinstance(node, _BuiltStep) and node.finalized is not None:
+            finalized = _finalizeNode(node, inRepeat, sport_type)
+            workoutStep = _materialize(finalized, stepCount[0])
+            stepCount[0] += finalized.size
+        else:
+            workoutStep = _finalizeStep(node, stepCount, inRepeat=inRepeat, sport_type=sport_type)
         if workoutStep:
             workoutSteps.append(workoutStep)
     return workoutSteps
 
-def createWorkoutStep(step: dict, stepCount: list, inRepeat: bool = False, sport_type: Optional[SportType] = None):
+def _finalizeNode(node: list, inRepeat: bool, sport_type: Optional[SportType]) -> _Finalized:
+    """The _Finalized of a node, memoized on shared nodes; other nodes live on in their shared parent's."""
+    shared = isinstance(node, _BuiltStep) and node.finalized is not None
+    finalized = node.finalized.get((sport_type, inRepeat)) if shared else None
+    if finalized is None:
+        count = [0]
+        workoutStep = _finalizeStep(node, count, inRepeat=inRepeat, sport_type=sport_type, finalizeChildren=_finalizeChildNodes)
+        finalized = _Finalized(workoutStep, count[0])
+        if shared:
+            with _sharedBlocksLock:
+                finalized = node.finalized.setdefault((sport_type, inRepeat), finalized)
+    return finalized
+
+def _finalizeChildNodes(nodes: list, stepCount: list, inRepeat: bool = False, sport_type: Optional[SportType] = None) -> list:
+    children = []
+    for node in nodes:
+        finalized = _finalizeNode(node, inRepeat, sport_type)
+        children.append((finalized, stepCount[0]))
+        stepCount[0] += finalized.size
+    return children
+
+def _materialize(finalized: _Finalized, offset: int):
+    """Fresh step objects (sharing field values) for one occurrence, ids shifted by offset."""
+    step = finalized.step
+    # through __init__, so the copies keep the compact key-sharing instance dicts
+    copy = step.__class__(**step.__dict__)
+    copy.stepId = step.stepId + offset
+    copy.stepOrder = step.stepOrder + offset
+    if isinstance(step, RepeatStep):
+        copy.workoutSteps = [_materialize(child, offset + childOffset) for child, childOffset in step.workoutSteps]
+    return copy
+
+def _finalizeStep(keys: list, stepCount: list, inRepeat: bool = False, sport_type: Optional[SportType] = None, finalizeChildren=None):
+    """Resolve the sport-dependent parts of a built step and number it.
+
+    finalizeChildren(nodes, stepCount, inRepeat, sport_type) builds a repeat's
+    workoutSteps, _finalizeStepList by default.
+    """
+    if finalizeChildren is None:
+        finalizeChildren = _finalizeStepList
     stepType = None
     exerciseName = None
     category = None
-    for stepName in step:
-        stepDetail = step[stepName]
-        parsedStep, numIteration, explicitCategory = parse_bracket(stepName)
-        match parsedStep:
+    for key in keys:
+        stepDetail = key.detail
+        match key.name:
             case "run":
                 # For HIIT workouts, use RUN_INDOOR category for run steps
                 if sport_type == SportType.HIIT:
@@ -81,19 +518,11 @@ def createWorkoutStep(step: dict, stepCount: list, inRepeat: bool = False, sport
                 if sport_type == SportType.HIIT:
                     category = "CARDIO"
                     exerciseName = ""
-                # Check if warmup has nested cardio or other exercises
-                if isinstance(stepDetail, list):
-                    # Check if there's a cardio child
-                    for child in stepDetail:
-                        for childName in child:
-                            childParsed, _, _ = parse_bracket(childName)
-                            if childParsed == "cardio" or childParsed == "run":
-                                # For HIIT workouts, warmup/cooldown use CARDIO category
-                                # The actual run steps inside repeats use RUN_INDOOR
-                                if category is None:
-                                    category = "CARDIO"
-                                    exerciseName = ""  # Empty exercise name for cardio warmup
-                                break
+                # A nested cardio/run child makes this a cardio warmup; the actual
+                # run steps inside HIIT repeats use RUN_INDOOR instead
+                if key.hasCardioChild and category is None:
+                    category = "CARDIO"
+                    exerciseName = ""  # Empty exercise name for cardio warmup
             case "cooldown":
                 stepType = StepType.COOLDOWN
                 # For HIIT workouts, warmup/cooldown use CARDIO category
@@ -117,12 +546,11 @@ def createWorkoutStep(step: dict, stepCount: list, inRepeat: bool = False, sport
                     category = "CARDIO"
                 # We don't set exerciseName for cardio as it's just a category
             case "repeat":
-                stepType = StepType.REPEAT
                 stepCount[0] += 1
                 order = stepCount[0]
-                workoutSteps = createWorkoutList(stepDetail, stepCount, inRepeat=True, sport_type=sport_type)
+                workoutSteps = finalizeChildren(key.children, stepCount, inRepeat=True, sport_type=sport_type)
                 # numIteration might be None if parse_bracket didn't find it
-                iterations = int(numIteration) if numIteration else 1
+                iterations = int(key.iterations) if key.iterations else 1
                 return RepeatStep(
                     stepId=order,
                     stepOrder=order,
@@ -130,12 +558,11 @@ def createWorkoutStep(step: dict, stepCount: list, inRepeat: bool = False, sport
                     numberOfIterations=iterations
                 )
             case "repeatuntiltime":
-                stepType = StepType.REPEAT
                 stepCount[0] += 1
                 order = stepCount[0]
                 # numIteration contains the time in seconds
-                time_seconds = float(numIteration) if numIteration else 600.0
-                workoutSteps = createWorkoutList(stepDetail, stepCount, inRepeat=True, sport_type=sport_type)
+                time_seconds = float(key.iterations) if key.iterations else 600.0
+                workoutSteps = finalizeChildren(key.children, stepCount, inRepeat=True, sport_type=sport_type)
                 return RepeatStep(
                     stepId=order,
                     stepOrder=order,
@@ -148,113 +575,25 @@ def createWorkoutStep(step: dict, stepCount: list, inRepeat: bool = False, sport
                 # For unmatched names, treat as exercise for strength workouts
                 # This allows custom exercise names like "Goblet Squat"
                 stepType = StepType.INTERVAL  # Strength exercises use INTERVAL type
-                # Use explicit category if provided in YAML, otherwise try to determine from exercise name
-                if explicitCategory:
-                    category = explicitCategory.upper()
-                    # For explicit categories, still need to set exerciseName based on exercise name
-                    # Special cases for sled and carry categories
-                    if category == "SLED":
-                        if "sled push" in parsedStep.lower():
-                            exerciseName = "PUSH"
-                        elif "sled" in parsedStep.lower() and "drag" in parsedStep.lower():
-                            exerciseName = "BACKWARD_DRAG"
-                    elif category == "CARRY":
-                        if "farmer" in parsedStep.lower() and "carry" in parsedStep.lower():
-                            exerciseName = "FARMERS_CARRY"
-                    elif category == "SHOULDER_PRESS":
-                        if "push press" in parsedStep.lower():
-                            exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
-                    # For CORE category, we need special handling based on the exercise name
-                    elif category == "CORE":
-                        if "x abs" in parsedStep.lower() or "x-abs" in parsedStep.lower():
-                            category = "SIT_UP"  # X Abs uses SIT_UP category with X_ABS as exerciseName
-                            exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
-                        else:
-                            # For other CORE exercises, use default behavior
-                            pass
-                elif "bulgarian split squat" in parsedStep.lower():
-                    category = "LUNGE"
-                elif "good morning" in parsedStep.lower():
-                    category = "LEG_CURL"
-                elif "clean and jerk" in parsedStep.lower():
-                    category = "OLYMPIC_LIFT"
-                elif "wall ball" in parsedStep.lower() or "wallball" in parsedStep.lower():
-                    category = "SQUAT"
-                elif "medicine ball slam" in parsedStep.lower():
-                    category = "PLYO"
-                elif "ski moguls" in parsedStep.lower():
-                    category = "CARDIO"
-                elif "pike push" in parsedStep.lower() or "push-up" in parsedStep.lower():
-                    category = "PUSH_UP"
-                elif "plank" in parsedStep.lower():
-                    category = "PLANK"
-                elif "burpee" in parsedStep.lower():
-                    category = "TOTAL_BODY"
-                elif "inverted row" in parsedStep.lower() or "row" in parsedStep.lower():
-                    category = "ROW"
-                elif "squat" in parsedStep.lower():
-                    category = "SQUAT"
-                elif "push press" in parsedStep.lower():
-                    category = "SHOULDER_PRESS"
-                elif "press" in parsedStep.lower():
-                    category = "BENCH_PRESS"
-                elif "deadlift" in parsedStep.lower():
-                    category = "DEADLIFT"
-                elif "pull" in parsedStep.lower() or "lat" in parsedStep.lower():
-                    category = "PULL_UP"
-                    # For lat pull-down exercises, use underscore prefix and convert PULL_DOWN to PULLDOWN
-                    # Convert exercise name to Garmin format (UPPER_CASE with underscores)
-                    exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
-                    if "lat" in parsedStep.lower() or "pull-down" in parsedStep.lower():
-                        exerciseName = "_" + exerciseName.replace("PULL_DOWN", "PULLDOWN")
-                elif "kettlebell" in parsedStep.lower():
-                    # Check for specific kettlebell exercises
-                    if "floor to shelf" in parsedStep.lower():
-                        category = "DEADLIFT"
-                    elif "swing" in parsedStep.lower():
-                        category = "HIP_SWING"
-                    else:
-                        category = "SQUAT"  # Default for kettlebell exercises
-                elif "push up" in parsedStep.lower() or "pushup" in parsedStep.lower():
-                    category = "PUSH_UP"
-                elif "sled push" in parsedStep.lower():
-                    category = "SLED"
-                    exerciseName = "PUSH"
-                elif "sled" in parsedStep.lower() and "drag" in parsedStep.lower():
-                    category = "SLED"
-                    exerciseName = "BACKWARD_DRAG"
-                elif "sled" in parsedStep.lower() or "drag" in parsedStep.lower():
-                    category = None  # Not supported by Garmin
-                elif "farmer" in parsedStep.lower() and "carry" in parsedStep.lower():
-                    category = "CARRY"
-                    exerciseName = "FARMERS_CARRY"
-                elif "bar hold" in parsedStep.lower() or ("hold" in parsedStep.lower() and "bar" in parsedStep.lower()):
-                    category = "DEADLIFT"  # Bar holds are typically grip/strength work related to deadlifts
-                elif "x abs" in parsedStep.lower() or "x-abs" in parsedStep.lower():
-                    category = "SIT_UP"  # X Abs uses SIT_UP category with X_ABS as exerciseName
-                    exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
-                elif "ghd back extension" in parsedStep.lower() or "back extension" in parsedStep.lower():
-                    category = "CORE"  # GHD back extensions are core exercises
-                elif "carry" in parsedStep.lower():
-                    category = None  # Not supported by Garmin
-                elif "push" in parsedStep.lower():
-                    category = None  # Not supported by Garmin
-                
+                if key.category is not _NO_CATEGORY_MATCH:
+                    category = key.category
+                if key.exerciseName is not None:
+                    exerciseName = key.exerciseName
+
                 # Only set exerciseName if we have a category (category is our way of mapping)
                 # Don't set exerciseName for unmapped exercises to avoid sending invalid data
                 # Some categories like SLED and CARRY don't need exerciseName
                 # Only set it if not explicitly provided by category matching above
                 if category is not None and exerciseName is None:
                     # Special case: sled push needs exerciseName="PUSH"
-                    if category == "SLED" and "sled push" in parsedStep.lower():
+                    if category == "SLED" and "sled push" in key.name.lower():
                         exerciseName = "PUSH"
                     # Categories that don't use exerciseName should leave it as None
                     elif category not in ["SLED", "CARRY"]:
                         # Convert exercise name to Garmin format (UPPER_CASE with underscores)
-                        exerciseName = parsedStep.upper().replace(" ", "_").replace("-", "_")
-                
-                # Add more categories as needed
-                logger.debug(f"Treating '{parsedStep}' as exercise with name '{exerciseName}', category '{category}'")
+                        exerciseName = key.name.upper().replace(" ", "_").replace("-", "_")
+
+                logger.debug("Treating '%s' as exercise with name '%s', category '%s'", key.name, exerciseName, category)
 
         # Handle stepDetail - could be a string or a list
         if isinstance(stepDetail, list):
@@ -274,61 +613,9 @@ def createWorkoutStep(step: dict, stepCount: list, inRepeat: bool = False, sport
                     if exerciseName is not None:
                         parsedStepDetailDict['exerciseName'] = exerciseName
         else:
-            parsedStepDetailDict = parse_stepdetail(stepDetail)
-            # Ensure we have endCondition and endConditionValue - add defaults if missing
-            if 'endCondition' not in parsedStepDetailDict or 'endConditionValue' not in parsedStepDetailDict:
-                # Default to REPS with 10 if not parsed
-                if isinstance(stepDetail, str) and 'reps' in stepDetail.lower():
-                    # Try to extract reps number
-                    reps_match = re.search(r'(\d+)', stepDetail.lower())
-                    if reps_match:
-                        parsedStepDetailDict['endCondition'] = ConditionType.REPS
-                        parsedStepDetailDict['endConditionValue'] = int(reps_match.group(1))
-                    else:
-                        parsedStepDetailDict['endCondition'] = ConditionType.REPS
-                        parsedStepDetailDict['endConditionValue'] = 10
-                elif isinstance(stepDetail, str) and 's' in stepDetail.lower() and not 'reps' in stepDetail.lower():
-                    # Try to extract seconds
-                    sec_match = re.search(r'(\d+)s', stepDetail.lower())
-                    if sec_match:
-                        parsedStepDetailDict['endCondition'] = ConditionType.TIME
-                        parsedStepDetailDict['endConditionValue'] = int(sec_match.group(1))
-                    else:
-                        parsedStepDetailDict['endCondition'] = ConditionType.TIME
-                        parsedStepDetailDict['endConditionValue'] = 60
-                else:
-                    # Default fallback
-                    parsedStepDetailDict['endCondition'] = ConditionType.REPS
-                    parsedStepDetailDict['endConditionValue'] = 10
-            # Extract distance/reps info for description if not already in description
-            if isinstance(stepDetail, str) and 'description' not in parsedStepDetailDict:
-                # Check if stepDetail contains distance or reps info
-                desc_parts = []
-                if "reps" in stepDetail.lower():
-                    # Extract reps number
-                    reps_match = re.search(r'(\d+)\s*reps?', stepDetail.lower())
-                    if reps_match:
-                        desc_parts.append(reps_match.group(1))
-                elif "m" in stepDetail.lower() and "min" not in stepDetail.lower():
-                    # Extract distance in meters
-                    dist_match = re.search(r'(\d+)\s*m', stepDetail.lower())
-                    if dist_match:
-                        desc_parts.append(dist_match.group(1) + "m")
-                elif "s" in stepDetail.lower() and "sec" not in stepDetail.lower():
-                    # Extract seconds
-                    sec_match = re.search(r'(\d+)\s*s(?!\w)', stepDetail.lower())
-                    if sec_match:
-                        desc_parts.append(sec_match.group(1) + "s")
-                
-                # If we have distance/reps info and no description yet, add it
-                if desc_parts and 'description' not in parsedStepDetailDict:
-                    # If there's already a description from pipe, append to it
-                    if "|" in stepDetail:
-                        # Description already handled by parse_stepdetail
-                        pass
-                    else:
-                        parsedStepDetailDict['description'] = " ".join(desc_parts)
-        
+            # Parsed once while building; copied because the fields below are per occurrence
+            parsedStepDetailDict = dict(key.detailDict)
+
         # Add exercise metadata if this is an exercise
         if exerciseName is not None:
             parsedStepDetailDict['exerciseName'] = exerciseName
@@ -342,37 +629,28 @@ def createWorkoutStep(step: dict, stepCount: list, inRepeat: bool = False, sport
         order = stepCount[0]
     return WorkoutStep(stepId=order, stepOrder=order, stepType=stepType, **parsedStepDetailDict)
 
-def createWorkoutJson(workoutName: str, steps: list, sport_type: Optional[SportType] = None):
+def createWorkoutList(steps: list, stepCount: list, inRepeat: bool = False, sport_type: Optional[SportType] = None):
+    return _finalizeStepList(_buildStepList(steps, [False]), stepCount, inRepeat=inRepeat, sport_type=sport_type)
+
+def createWorkoutStep(step: dict, stepCount: list, inRepeat: bool = False, sport_type: Optional[SportType] = None):
+    return _finalizeStep(_buildStep(step, [False]), stepCount, inRepeat=inRepeat, sport_type=sport_type)
+
+def createWorkoutModel(workoutName: str, steps: list, sport_type: Optional[SportType] = None) -> WorkoutModel:
+    # One walk over the YAML builds the step tree and collects sport-type evidence;
+    # sport-dependent choices are then made while finalizing that tree
+    evidence = [False]
+    stepTree = _buildStepList(steps, evidence)
+    return _modelFromStepTree(workoutName, stepTree, evidence, sport_type)
+
+def _modelFromStepTree(workoutName: str, stepTree: list, evidence: list, sport_type: Optional[SportType] = None,
+                       finalizeSteps=None) -> WorkoutModel:
     stepCount = [0]
-    
+
     # If sport type not specified, detect it based on step names
     if sport_type is None:
-        sport_type = SportType.RUNNING  # default
-        
-        # Detect sport type based on step names
-        def has_strength_steps(steps):
-            for step in steps:
-                for stepName in step:
-                    parsedStep, _, _ = parse_bracket(stepName)
-                    if parsedStep in ["exercise", "rest", "cardio"]:
-                        return True
-                    # Check if we have any common strength indicators
-                    # Custom exercise names are treated as strength if not running steps
-                    if parsedStep == "repeat":
-                        if has_strength_steps(step[stepName]):
-                            return True
-                    elif parsedStep not in ["run", "warmup", "cooldown", "recovery", "repeat"]:
-                        # Unknown step type, likely a strength exercise name
-                        # Check if the step detail contains "reps" which is strength-specific
-                        stepDetail = step[stepName]
-                        if isinstance(stepDetail, str) and "reps" in stepDetail.lower():
-                            return True
-            return False
-        
-        if has_strength_steps(steps):
-            sport_type = SportType.STRENGTH
-
-    workoutSteps = createWorkoutList(steps, stepCount, sport_type=sport_type)
+        sport_type = SportType.STRENGTH if evidence[0] else SportType.RUNNING
+
+    workoutSteps = (finalizeSteps or _finalizeStepList)(stepTree, stepCount, sport_type=sport_type)
 
     # Set subSportType for HIIT workouts
     sub_sport_type = None
@@ -397,42 +675,449 @@ def createWorkoutJson(workoutName: str, steps: list, sport_type: Optional[SportT
         estimateType=None
     )
 
-    return json.dumps(workout_model, default=serialize)
+    return workout_model
 
-def importWorkouts(workouts: dict, toDeletePrevious: bool, conn: Client):
-    allWorkouts = []
-    if toDeletePrevious:
-        allWorkouts = conn.getAllWorkouts()
+def createWorkoutJson(workoutName: str, steps: list, sport_type: Optional[SportType] = None):
+    return json.dumps(createWorkoutModel(workoutName, steps, sport_type), default=serialize)
 
-    for name in workouts:
-        if toDeletePrevious and (name in [wo['workoutName'] for wo in allWorkouts]):
-            filtered = [wo for wo in allWorkouts if wo['workoutName'] == name]
-            for toDelete in filtered:
-                conn.deleteWorkout(toDelete)
+# Template parameters use the same `$name` syntax as definitions
+_PARAM_PATTERN = re.compile(r'\$(\w+)')
 
-        workout_data = workouts[name]
-        sport_type = None
-        
-        # Support both old format (list of steps) and new format (dict with steps and optional sport)
-        if isinstance(workout_data, dict):
-            steps = workout_data.get('steps', [])
-            sport_str = workout_data.get('sport', None)
-            if sport_str:
-                sport_str_upper = sport_str.upper()
-                if sport_str_upper == 'HIIT':
-                    sport_type = SportType.HIIT
-                elif sport_str_upper == 'STRENGTH' or sport_str_upper == 'STRENGTH_TRAINING':
-                    sport_type = SportType.STRENGTH
-                elif sport_str_upper == 'RUNNING' or sport_str_upper == 'RUN':
-                    sport_type = SportType.RUNNING
+def _hasParams(data) -> bool:
+    if isinstance(data, str):
+        return _PARAM_PATTERN.search(data) is not None
+    elif isinstance(data, dict):
+        return any(_hasParams(k) or _hasParams(v) for k, v in data.items())
+    elif isinstance(data, list):
+        return any(_hasParams(item) for item in data)
+    return False
+
+_REPEAT_NAME = re.compile(r'^\s*(repeat(?:untiltime)?)\s*(?:\(|$)', re.IGNORECASE)
+
+def _repeatKind(stepName) -> Optional[str]:
+    """"repeat" or "repeatuntiltime" from the name's keyword alone: its value may still be a $param."""
+    match = _REPEAT_NAME.match(stepName) if isinstance(stepName, str) else None
+    return match.group(1).lower() if match else None
+
+def _isRepeatName(stepName) -> bool:
+    return _repeatKind(stepName) is not None
+
+def _substituteParams(data, values: dict):
+    """replace_variables for template parameters, which also appear in step names (dict keys)."""
+    if isinstance(data, str):
+        return replace_variables(data, values)
+    elif isinstance(data, dict):
+        return {_substituteParams(k, values): _substituteParams(v, values) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [_substituteParams(item, values) for item in data]
+    return data
+
+def _templateValues(values: dict) -> dict:
+    return {str(k): str(v) for k, v in (values or {}).items()}
+
+def _paramNames(data, names: set) -> set:
+    if isinstance(data, str):
+        names.update(_PARAM_PATTERN.findall(data))
+    elif isinstance(data, dict):
+        for k, v in data.items():
+            _paramNames(k, names)
+            _paramNames(v, names)
+    elif isinstance(data, list):
+        for item in data:
+            _paramNames(item, names)
+    return names
+
+# entries kept per slot (built keys) and per rendered template (step JSON) before starting over
+_TEMPLATE_MEMO_SIZE = 4096
+# whole workouts (less the name) kept per template
+_SPLICED_MEMO_SIZE = 1024
+
+class _TemplateSlot(object):
+    """A template step whose own name or detail references parameters; rebuilt per instance.
+
+    memo maps the values of the slot's own parameters to its built keys and
+    whether they look like strength.
+    """
+    __slots__ = ("step", "countsForSport", "children", "params", "memo")
+
+    def __init__(self, step: dict, countsForSport: bool):
+        self.step = step
+        self.countsForSport = countsForSport
+        self.children = {}  # key index -> skeleton of that key's repeat children
+        self.params = tuple(sorted(_paramNames(step, set())))
+        self.memo = {}
+
+class _TemplateGroup(object):
+    """A parameter-free step with parameters somewhere inside its repeat children."""
+    __slots__ = ("keys",)
+
+    def __init__(self, keys: list):
+        self.keys = keys
+
+def _isDynamic(nodes: list) -> bool:
+    return any(isinstance(node, (_TemplateSlot, _TemplateGroup)) for node in nodes)
+
+class _Hole(object):
+    """Stands in for a slot's step while rendering; serializes to a sentinel string."""
+    __slots__ = ("index", "start", "inRepeat", "size", "sentinel")
+
+    def __init__(self, index: int, start: int, inRepeat: bool, size: int, sentinel: str):
+        self.index = index
+        self.start = start
+        self.inRepeat = inRepeat
+        self.size = size
+        self.sentinel = sentinel
+
+    def to_dict(self):
+        return self.sentinel
+
+class _RenderedTemplate(object):
+    """Workout JSON of one template and sport type, cut at the workout name and at every slot's step.
+
+    chunks[i] is the static text before holes[i] (None for the workout name,
+    else the slot's _Hole), chunks[-1] the text after the last hole. texts
+    memoizes the JSON of a slot's step per (hole index, slot values).
+    """
+    __slots__ = ("sport_type", "chunks", "holes", "texts")
+
+    def __init__(self, sport_type: SportType, chunks: list, holes: list):
+        self.sport_type = sport_type
+        self.chunks = chunks
+        self.holes = holes
+        self.texts = {}
+
+class WorkoutTemplate(object):
+    """A parameterized workout, compiled once into a step skeleton.
+
+    Steps that don't mention a `$param` are parsed once and shared by every
+    instance; only the steps that do are re-parsed with the instance's values.
+    """
+
+    def __init__(self, name: str, steps: list, sport_type: Optional[SportType] = None):
+        self.name = name
+        self.sport_type = sport_type
+        self._evidence = [False]
+        self.skeleton = self._build(steps, True)
+        # slots outside other slots, in step order; each is a hole in the rendered JSON
+        self._slots = self._topSlots(self.skeleton, [])
+        self._params = tuple(sorted({param for slot in self._slots for param in slot.params}))
+        self._rendered = {}  # sport type -> _RenderedTemplate, None when it can't be spliced
+        self._spliced = {}   # values of _params -> JSON before and after the workout name
+
+    def _topSlots(self, nodes: list, slots: list) -> list:
+        for node in nodes:
+            if isinstance(node, _TemplateSlot):
+                slots.append(node)
+            elif isinstance(node, _TemplateGroup):
+                for key in node.keys:
+                    if key.children is not None and _isDynamic(key.children):
+                        self._topSlots(key.children, slots)
+        return slots
+
+    def _stepHasParams(self, step: dict) -> bool:
+        for stepName in step:
+            if _hasParams(stepName):
+                return True
+            # repeat children are templated step by step, everything else as a whole
+            if not (_isRepeatName(stepName) and isinstance(step[stepName], list)) and _hasParams(step[stepName]):
+                return True
+        return False
+
+    def _build(self, steps: list, countsForSport: bool) -> list:
+        nodes = []
+        for step in steps:
+            if isinstance(step, dict) and self._stepHasParams(step):
+                slot = _TemplateSlot(step, countsForSport)
+                for index, stepName in enumerate(step):
+                    if _isRepeatName(stepName) and isinstance(step[stepName], list):
+                        childrenCountForSport = countsForSport and _repeatKind(stepName) == "repeat"
+                        slot.children[index] = self._build(step[stepName], childrenCountForSport)
+                nodes.append(slot)
+                continue
+
+            dynamic = [False]
+            def buildChildren(index, children, evidence, childrenCountForSport):
+                skeleton = self._build(children, childrenCountForSport)
+                dynamic[0] = dynamic[0] or _isDynamic(skeleton)
+                return skeleton
+            keys = _buildStep(step, self._evidence, countsForSport, buildChildren)
+            nodes.append(_TemplateGroup(keys) if dynamic[0] else keys)
+        return nodes
+
+    def _instantiateList(self, nodes: list, values: dict, evidence: list, built: Optional[dict] = None) -> list:
+        """The instance's step tree; built maps slots to already built keys."""
+        stepTree = []
+        for node in nodes:
+            if isinstance(node, _TemplateSlot):
+                if built is not None and node in built:
+                    stepTree.append(built[node])
+                else:
+                    stepTree.append(self._instantiateSlot(node, values, evidence))
+            elif isinstance(node, _TemplateGroup):
+                keys = []
+                for key in node.keys:
+                    if key.children is not None and _isDynamic(key.children):
+                        key = key.withChildren(self._instantiateList(key.children, values, evidence, built))
+                    keys.append(key)
+                stepTree.append(keys)
+            else:
+                # Parameter-free: shared as is, finalizing never mutates the built keys
+                stepTree.append(node)
+        return stepTree
+
+    def _instantiateSlot(self, slot: _TemplateSlot, values: dict, evidence: list) -> list:
+        step = {}
+        for index, stepName in enumerate(slot.step):
+            stepDetail = slot.step[stepName]
+            if index not in slot.children:
+                stepDetail = _substituteParams(stepDetail, values)
+            step[replace_variables(stepName, values)] = stepDetail
+
+        def buildChildren(index, children, childEvidence, childrenCountForSport):
+            skeleton = slot.children.get(index)
+            if skeleton is None:
+                return _buildStepList(_substituteParams(children, values), childEvidence, childrenCountForSport)
+            return self._instantiateList(skeleton, values, childEvidence)
+        return _buildStep(step, evidence, slot.countsForSport, buildChildren)
+
+    def instantiate(self, workoutName: str, values: dict) -> WorkoutModel:
+        values = _templateValues(values)
+        evidence = [self._evidence[0]]
+        stepTree = self._instantiateList(self.skeleton, values, evidence)
+        return _modelFromStepTree(workoutName, stepTree, evidence, self.sport_type)
+
+    def _slotKeys(self, slot: _TemplateSlot, slotValues: tuple, values: dict) -> tuple:
+        entry = slot.memo.get(slotValues)
+        if entry is None:
+            evidence = [False]
+            entry = (self._instantiateSlot(slot, values, evidence), evidence[0])
+            if len(slot.memo) >= _TEMPLATE_MEMO_SIZE:
+                slot.memo.clear()
+            slot.memo[slotValues] = entry
+        return entry
+
+    def _render(self, sport_type: SportType, built: dict) -> Optional[_RenderedTemplate]:
+        """Render the workout JSON once with sentinels for the name and every slot's step, then cut it there."""
+        token = uuid.uuid4().hex
+        index = {id(built[slot]): i for i, slot in enumerate(self._slots)}
+        holes = []
+        dropped = [False]
+
+        def finalizeList(nodes: list, stepCount: list, inRepeat: bool = False, sport_type: Optional[SportType] = None):
+            workoutSteps = []
+            for node in nodes:
+                i = index.get(id(node))
+                if i is not None:
+                    start = stepCount[0]
+                    if not _finalizeStep(node, stepCount, inRepeat=inRepeat, sport_type=sport_type):
+                        dropped[0] = True
+                    hole = _Hole(i, start, inRepeat, stepCount[0] - start, f"{token}:{i}")
+                    holes.append(hole)
+                    workoutSteps.append(hole)
+                elif isinstance(node, _BuiltStep) and node.finalized is not None:
+                    workoutSteps.extend(_finalizeStepList([node], stepCount, inRepeat, sport_type))
                 else:
-                    logger.warning(f"Unknown sport type '{sport_str}' for workout '{name}', using auto-detection")
+                    workoutStep = _finalizeStep(node, stepCount, inRepeat=inRepeat, sport_type=sport_type, finalizeChildren=finalizeList)
+                    if workoutStep:
+                        workoutSteps.append(workoutStep)
+            return workoutSteps
+
+        stepTree = self._instantiateList(self.skeleton, {}, [False], built)
+        # errors in the instance's own steps propagate, as they would from instantiate()
+        model = _modelFromStepTree(token, stepTree, [False], sport_type, finalizeList)
+        if dropped[0]:
+            return None
+        text = json.dumps(model, default=serialize)
+
+        # cut at the sentinels, in the order they appear in the text
+        cuts = [(text.find(json.dumps(token)), None)]
+        cuts += [(text.find(json.dumps(hole.sentinel)), hole) for hole in holes]
+        if any(text.count(json.dumps(hole.sentinel if hole else token)) != 1 for _, hole in cuts):
+            return None
+        cuts.sort(key=lambda cut: cut[0])
+        chunks, position = [], 0
+        for offset, hole in cuts:
+            chunks.append(text[position:offset])
+            position = offset + len(json.dumps(hole.sentinel if hole else token))
+        chunks.append(text[position:])
+        return _RenderedTemplate(sport_type, chunks, [hole for _, hole in cuts])
+
+    def instantiateJson(self, workoutName: str, values: dict) -> str:
+        """json.dumps(self.instantiate(...), default=serialize), spliced from the rendered template.
+
+        The template is rendered once per sport type. An instance only builds
+        the slots whose values it hasn't seen yet and serializes only their
+        steps; everything else is copied from the rendered JSON. Instances
+        with the same values apart from the name only splice in the name.
+        """
+        values = _templateValues(values)
+        combination = tuple(values.get(param) for param in self._params)
+        spliced = self._spliced.get(combination)
+        if spliced is None:
+            spliced = self._splice(values)
+            if spliced is None:
+                return json.dumps(self.instantiate(workoutName, values), default=serialize)
+            if len(self._spliced) >= _SPLICED_MEMO_SIZE:
+                self._spliced.clear()
+            self._spliced[combination] = spliced
+        head, tail = spliced
+        return head + json.dumps(workoutName) + tail
+
+    def _splice(self, values: dict) -> Optional[tuple]:
+        """The instance's JSON before and after the workout name, None when it can't be spliced."""
+        built = {}
+        strength = self._evidence[0]
+        slotValues = []
+        for slot in self._slots:
+            key = tuple(values.get(param) for param in slot.params)
+            built[slot], slotStrength = self._slotKeys(slot, key, values)
+            strength = strength or slotStrength
+            slotValues.append(key)
+
+        sport_type = self.sport_type or (SportType.STRENGTH if strength else SportType.RUNNING)
+        if sport_type not in self._rendered:
+            self._rendered[sport_type] = self._render(sport_type, built)
+        rendered = self._rendered[sport_type]
+        if rendered is None:
+            return None
+
+        parts, head = [], None
+        for chunk, hole in zip(rendered.chunks, rendered.holes):
+            parts.append(chunk)
+            if hole is None:
+                head, parts = "".join(parts), []
+                continue
+            memoKey = (hole.index, slotValues[hole.index])
+            stepText = rendered.texts.get(memoKey)
+            if stepText is None:
+                stepCount = [hole.start]
+                step = _finalizeStep(built[self._slots[hole.index]], stepCount, inRepeat=hole.inRepeat, sport_type=sport_type)
+                if not step or stepCount[0] - hole.start != hole.size:
+                    # these values change the number of steps, so the rest of the ids move too
+                    return None
+                stepText = json.dumps(step, default=serialize)
+                if len(rendered.texts) >= _TEMPLATE_MEMO_SIZE:
+                    rendered.texts.clear()
+                rendered.texts[memoKey] = stepText
+            parts.append(stepText)
+        parts.append(rendered.chunks[-1])
+        return head, "".join(parts)
+
+def compileTemplate(name: str, template_data) -> WorkoutTemplate:
+    sport_type = None
+    if isinstance(template_data, dict):
+        steps = template_data.get('steps', [])
+        sport_str = template_data.get('sport', None)
+        if sport_str:
+            sport_type = _sportTypeFromString(sport_str, name)
+    else:
+        steps = template_data
+    return WorkoutTemplate(name, steps, sport_type)
+
+def _sportTypeFromString(sport_str: str, name: str) -> Optional[SportType]:
+    sport_str_upper = sport_str.upper()
+    if sport_str_upper == 'HIIT':
+        return SportType.HIIT
+    elif sport_str_upper == 'STRENGTH' or sport_str_upper == 'STRENGTH_TRAINING':
+        return SportType.STRENGTH
+    elif sport_str_upper == 'RUNNING' or sport_str_upper == 'RUN':
+        return SportType.RUNNING
+    logger.warning(f"Unknown sport type '{sport_str}' for workout '{name}', using auto-detection")
+    return None
+
+def compileWorkoutModel(name: str, workout_data) -> WorkoutModel:
+    sport_type = None
+
+    # Support both old format (list of steps) and new format (dict with steps and optional sport)
+    if isinstance(workout_data, dict):
+        steps = workout_data.get('steps', [])
+        sport_str = workout_data.get('sport', None)
+        if sport_str:
+            sport_type = _sportTypeFromString(sport_str, name)
+    else:
+        # Old format: just a list of steps
+        steps = workout_data
+
+    return createWorkoutModel(name, steps, sport_type)
+
+def compileWorkout(name: str, workout_data) -> str:
+    return json.dumps(compileWorkoutModel(name, workout_data), default=serialize)
+
+def compileWorkoutModels(workouts: dict, templates: Optional[dict] = None):
+    """Lazily yield (name, WorkoutModel) for every workout in the plan.
+
+    A workout of the form `{template: name, instances: [{param: value}, ...]}`
+    yields one workout per instance, named by substituting the instance's
+    values into the workout key (e.g. `interval_week$n`). Each template is
+    compiled once, the first time it is used.
+    """
+    for name, template, data in _planEntries(workouts, templates):
+        if template is None:
+            yield name, compileWorkoutModel(name, data)
+        else:
+            yield name, template.instantiate(name, data)
+
+def _planEntries(workouts: dict, templates: Optional[dict] = None):
+    """Yield (name, None, workout data) for plain workouts and (name, WorkoutTemplate, values) per instance."""
+    compiledTemplates = {}
+    for name in workouts:
+        workout_data = workouts[name]
+        if not (isinstance(workout_data, dict) and 'template' in workout_data):
+            yield name, None, workout_data
+            continue
+
+        templateName = workout_data['template']
+        if templateName not in compiledTemplates:
+            if not templates or templateName not in templates:
+                logger.error(f"Template '{templateName}' used by workout '{name}' is not defined. Skipping.")
+                continue
+            compiledTemplates[templateName] = compileTemplate(templateName, templates[templateName])
+        template = compiledTemplates[templateName]
+
+        for values in workout_data.get('instances', []):
+            yield replace_variables(name, _templateValues(values)), template, values
+
+def planWorkoutNames(workouts: dict):
+    """Yield the names compileWorkoutModels would produce, without compiling."""
+    for name, workout_data in workouts.items():
+        if isinstance(workout_data, dict) and 'template' in workout_data:
+            for values in workout_data.get('instances', []):
+                yield replace_variables(name, _templateValues(values))
+        else:
+            yield name
+
+def compileWorkouts(workouts: dict, templates: Optional[dict] = None):
+    """Lazily yield (name, workout json) for every workout in the plan.
+
+    Template instances are spliced from the template's rendered JSON
+    (WorkoutTemplate.instantiateJson) instead of being built and serialized.
+    """
+    for name, template, data in _planEntries(workouts, templates):
+        if template is None:
+            yield name, compileWorkout(name, data)
         else:
-            # Old format: just a list of steps
-            steps = workout_data
-        
-        jsonData = createWorkoutJson(name, steps, sport_type)
-        conn.importWorkout(jsonData)
+            yield name, template.instantiateJson(name, data)
+
+def _compactModel(model: WorkoutModel) -> WorkoutModel:
+    for segment in model.workoutSegments:
+        segment.workoutSteps = compactSteps(segment.workoutSteps)
+    return model
+
+def compileEstimatedWorkouts(workouts: dict, schedule=(), templates: Optional[dict] = None, **estimateOptions):
+    """Compile every workout with duration/distance estimates filled in.
+
+    Unlike compileWorkouts this compiles the whole plan up front, since the
+    estimates are computed for all workouts in one batch. Returns the list of
+    (name, workout json) pairs and the PlanEstimate (incl. weekly totals).
+    The held models keep their steps as compact records (see compactModel).
+    """
+    models = {name: _compactModel(model) for name, model in compileWorkoutModels(workouts, templates)}
+    estimate = estimatePlan(models, schedule, **estimateOptions)
+    return [(name, json.dumps(models[name], default=serialize)) for name in models], estimate
+
+def importWorkouts(workouts: dict, toDeletePrevious: bool, conn: Client, templates: Optional[dict] = None,
+                   journal: Optional[Journal] = None):
+    uploadWorkouts(profiledIter("compile", compileWorkouts(workouts, templates)), toDeletePrevious, conn, journal)
 
 def _ensure_date(d):
     """Accept datetime.date, datetime.datetime, or 'YYYY-MM-DD' string."""
@@ -449,90 +1134,33 @@ def _ensure_date(d):
     logger.error(f"Unsupported date type for '{d}' ({type(d)})")
     return None
 
-def scheduleWorkouts(startfrom, workouts: dict, conn: Client):
+def expandSchedule(start_date: datetime.date, workouts: list):
+    """Place workouts on consecutive days from start_date, yielding (date, workoutName)."""
+    currentDate = start_date
+    for workoutName in workouts:
+        yield currentDate, workoutName
+        currentDate += datetime.timedelta(days=1)
+
+def scheduleWorkouts(startfrom, workouts: dict, conn: Client, journal: Optional[Journal] = None, removeStale: bool = False):
     start_date = _ensure_date(startfrom)
     if not start_date:
         logger.error(f"Invalid date {startfrom} format, example of proper date: {DATE_FORMAT}")
         return False
 
-    allWorkouts = conn.getAllWorkouts()
-    workoutMap = {value['workoutName']: value['workoutId'] for _, value in enumerate(allWorkouts)}
-    logger.debug(f"Workouts on garmin: {workoutMap}")
-
-    toScheduleDate = start_date
-
-    for toScheduleWorkout in workouts:
-        currentDate = toScheduleDate
-        toScheduleDate += datetime.timedelta(days=1)
-        if toScheduleWorkout not in workoutMap:
-            logger.warning(f"Workout '{toScheduleWorkout}' not found in Garmin account. Skipping.")
-            continue
-
-        workoutId = workoutMap[toScheduleWorkout]
-        dateJson = {"date": currentDate.strftime(DATE_FORMAT)}
-        success = conn.scheduleWorkout(workoutId, dateJson)
-        if success:
-            logger.info(f"Scheduled workout {toScheduleWorkout} on date {currentDate}")
-        else:
-            logger.error("Something went wrong during scheduling")
-
-def _resolve_paths(arg_file_name: str):
-    """
-    Resolve:
-      - project_root (repo root)
-      - file_path: absolute or project-relative YAML passed on CLI
-      - secrets_path: from env or common locations
-    """
-    current_dir = os.path.dirname(os.path.abspath(__file__))  # .../garmin_planner/garmin_planner
-    project_root = os.path.dirname(current_dir)               # .../garmin_planner
-
-    # Resolve the schedule file (allow absolute or project-relative)
-    file_path = arg_file_name if os.path.isabs(arg_file_name) else os.path.join(project_root, arg_file_name)
-
-    # Secrets lookup order: ENV -> project root -> package dir
-    secrets_path = os.environ.get("GARMIN_SECRETS", "")
-    if not (secrets_path and os.path.exists(secrets_path)):
-        candidates = [
-            os.path.join(project_root, "secrets.yaml"),
-            os.path.join(current_dir,  "secrets.yaml"),
-        ]
-        secrets_path = next((p for p in candidates if os.path.exists(p)), "")
-
-    return current_dir, project_root, file_path, secrets_path
-
-def main():
-    logger.info(f"Running Garmin Planner {__version__}")
-    argparser = argparse.ArgumentParser(description="Garmin Planner")
-    argparser.add_argument('file_name', type=str, help='Input YAML file name (absolute or project-relative)')
-    args = argparser.parse_args()
-    file_name = args.file_name
-
-    current_dir, project_root, file_path, secrets_path = _resolve_paths(file_name)
+    scheduleEntries(expandSchedule(start_date, workouts), conn, journal, removeStale)
 
+def loadPlan(file_path: str):
+    """Parse a plan YAML and substitute definitions. Returns (data, settings)."""
     if not os.path.exists(file_path):
         logger.error(f"The file '{file_path}' does not exist.")
         sys.exit("Exited program due to yaml file not found")
 
-    logger.info(f"Current working directory: {os.getcwd()}")
-
     # default settings
-    settings = {"deleteSameNameWorkout": False}
-
-    # preprocess secrets yaml file and get email and password
-    secrets = parseYaml(secrets_path) if secrets_path else None
-    if not secrets:
-        logger.error(f"Failed to parse secrets.yaml (looked at: {secrets_path or 'ENV var GARMIN_SECRETS not set'})")
-        sys.exit("Exiting: secrets.yaml not found or invalid.")
-    if ("email" not in secrets) or ("password" not in secrets):
-        logger.error("Missing 'email' or 'password' in secrets.yaml")
-        sys.exit("Exiting: 'email' or 'password' not found.")
-
-    email = secrets['email']
-    password = secrets['password']
-    garminCon = Client(email, password)
+    settings = {"deleteSameNameWorkout": False, "removeStaleSchedule": False}
 
     # parse input yaml file
-    data = parseYaml(file_path)
+    with phase("load"):
+        data = parseYaml(file_path)
     if not isinstance(data, dict):
         logger.error(f"YAML '{file_path}' did not parse to a dictionary.")
         sys.exit(1)
@@ -541,30 +1169,239 @@ def main():
     if "settings" in data and isinstance(data["settings"], dict):
         if "deleteSameNameWorkout" in data['settings']:
             settings['deleteSameNameWorkout'] = bool(data['settings']['deleteSameNameWorkout'])
+        if "removeStaleSchedule" in data['settings']:
+            settings['removeStaleSchedule'] = bool(data['settings']['removeStaleSchedule'])
 
     # replace definitions
     if "definitions" in data and isinstance(data["definitions"], dict):
         definitionsDict = data['definitions']
-        data = replace_variables(data, definitionsDict)
+        with phase("definitions"):
+            data = replace_variables(data, definitionsDict)
+
+    return data, settings
 
+def _planWorkouts(data: dict) -> dict:
     if "workouts" in data and isinstance(data["workouts"], dict):
-        workouts = data['workouts']
+        return data['workouts']
+    return {}
+
+def _planTemplates(data: dict) -> dict:
+    if "templates" in data and isinstance(data["templates"], dict):
+        return data['templates']
+    return {}
+
+def _planScheduleRules(data: dict) -> Optional[Schedule]:
+    if "schedulePlan" not in data or not isinstance(data["schedulePlan"], dict):
+        return None
+    schedulePlan = data['schedulePlan']
+    if not (schedulePlan.get('workouts') or schedulePlan.get('rules')):
+        logger.warning("schedulePlan provided but missing 'workouts' or 'rules'.")
+        return None
+    try:
+        return compileSchedule(schedulePlan)
+    except ScheduleError as e:
+        logger.error(f"Invalid schedulePlan: {e}")
+        return None
+
+def _planSchedule(data: dict):
+    """Return the plan's schedule as lazily expanded (date, workoutName) pairs, or None if there is none."""
+    schedule = _planScheduleRules(data)
+    return schedule.entries() if schedule is not None else None
+
+def _syncPlan(data: dict, settings: dict, conn: Client, journal: Journal):
+    workouts = _planWorkouts(data)
+    if workouts:
         importWorkouts(
             workouts=workouts,
             toDeletePrevious=settings['deleteSameNameWorkout'],
-            conn=garminCon
+            conn=conn,
+            templates=_planTemplates(data),
+            journal=journal
         )
 
-    if "schedulePlan" in data and isinstance(data["schedulePlan"], dict):
-        schedulePlan = data['schedulePlan']
-        startDate = schedulePlan.get('start_from')
-        workouts = schedulePlan.get('workouts', [])
-        if startDate and workouts:
-            scheduleWorkouts(startDate, workouts, garminCon)
-        else:
-            logger.warning("schedulePlan provided but missing 'start_from' or 'workouts'.")
+    schedule = _planSchedule(data)
+    if schedule is not None:
+        with phase("schedule"):
+            scheduleEntries(schedule, conn, journal, settings['removeStaleSchedule'])
+
+def runPlan(file_name: str, resume: bool = False, cassette: Optional[Cassette] = None):
+    current_dir, project_root, file_path, secrets_path = _resolve_paths(file_name)
+    data, settings = loadPlan(file_path)
+    logger.info(f"Current working directory: {os.getcwd()}")
+
+    with phase("login"):
+        garminCon = _connect(secrets_path, cassette)
+
+    journal = openSyncJournal(file_path, resume)
+    with journal:
+        _syncPlan(data, settings, garminCon, journal)
+    # only a finished sync drops its journal, a crash leaves it for --resume
+    journal.discard()
 
     logger.info("Finished processing yaml file")
 
+def compilePlan(file_name: str, output: Optional[str] = None, estimate: bool = False, defaultPace: Optional[str] = None) -> str:
+    """Compile a plan YAML into a bundle file without touching the network."""
+    current_dir, project_root, file_path, secrets_path = _resolve_paths(file_name)
+    data, settings = loadPlan(file_path)
+
+    if output is None:
+        output = os.path.splitext(os.path.basename(file_path))[0] + BUNDLE_EXTENSION
+
+    schedule = list(_planSchedule(data) or [])
+    with phase("compile"):
+        if estimate:
+            defaultSpeed = PACE_CONST / parse_time_to_minutes(defaultPace) if defaultPace else None
+            workouts, planEstimate = compileEstimatedWorkouts(_planWorkouts(data), schedule, _planTemplates(data), defaultSpeed=defaultSpeed)
+        else:
+            workouts = list(compileWorkouts(_planWorkouts(data), _planTemplates(data)))
+    if estimate:
+        for weekStart, (seconds, meters) in planEstimate.weekly.items():
+            logger.info(f"Week of {weekStart}: {seconds / 3600:.1f} h, {meters / 1000:.1f} km")
+    size = writeBundle(output, workouts, schedule, deleteSameName=settings['deleteSameNameWorkout'],
+                       removeStaleSchedule=settings['removeStaleSchedule'])
+    logger.info(f"Compiled {len(workouts)} workouts and {len(schedule)} schedule entries into '{output}' ({size} bytes)")
+    return output
+
+def accountJournalPath(source_path: str, account) -> str:
+    return os.path.splitext(os.path.basename(source_path))[0] + f".{accountFileLabel(account)}" + SYNC_JOURNAL_SUFFIX
+
+def fanoutPlan(file_name: str, accounts_path: str, concurrency: Optional[int] = None, resume: bool = False,
+               clientFor=None) -> FanoutReport:
+    """Compile a plan once and sync it to every account in `accounts_path` concurrently."""
+    current_dir, project_root, file_path, secrets_path = _resolve_paths(file_name)
+    data, settings = loadPlan(file_path)
+    try:
+        accounts = loadAccounts(accounts_path)
+    except (OSError, AccountsError) as e:
+        logger.error(f"Invalid accounts file '{accounts_path}': {e}")
+        sys.exit("Exiting: accounts file not found or invalid.")
+
+    # every account uploads the same JSON strings and expands the same schedule rules
+    with phase("compile"):
+        workouts = list(compileWorkouts(_planWorkouts(data), _planTemplates(data)))
+    schedule = _planScheduleRules(data)
+
+    def sync(conn: Client, journal: Journal):
+        uploadWorkouts(workouts, settings['deleteSameNameWorkout'], conn, journal)
+        if schedule is not None:
+            scheduleEntries(schedule.entries(), conn, journal, settings['removeStaleSchedule'])
+
+    report = fanOut(accounts, sync, lambda account: openSyncJournal(file_path, resume, accountJournalPath(file_path, account)),
+                    clientFor=clientFor, concurrency=concurrency)
+    logger.info(f"Synced {len(workouts)} workouts to {len(accounts) - len(report.failed)} of {len(accounts)} accounts in {report.seconds:.2f}s")
+    return report
+
+PRUNE_JOURNAL = "prune.journal"
+
+def _olderThanDate(value: str) -> datetime.date:
+    """`--older-than` accepts a number of days or a YYYY-MM-DD date."""
+    if value.isdigit():
+        return datetime.date.today() - datetime.timedelta(days=int(value))
+    date = _ensure_date(value)
+    if not date:
+        sys.exit(f"Exiting: invalid --older-than '{value}'")
+    return date
+
+def prunePlan(match: Optional[str] = None, olderThan: Optional[str] = None, notIn: Optional[str] = None,
+              dryRun: bool = False, concurrency: int = 4, journalPath: str = PRUNE_JOURNAL) -> PruneResult:
+    """Delete remote workouts selected by name regex, age and/or absence from a plan."""
+    if not (match or olderThan or notIn):
+        logger.error("Refusing to prune without --match, --older-than or --not-in")
+        sys.exit("Exiting: no prune criteria given")
+
+    keep = None
+    if notIn:
+        current_dir, project_root, file_path, secrets_path = _resolve_paths(notIn)
+        data, settings = loadPlan(file_path)
+        keep = set(planWorkoutNames(_planWorkouts(data)))
+    else:
+        current_dir, project_root, file_path, secrets_path = _resolve_paths(".")
+
+    garminCon = _connect(secrets_path)
+    selected = selectWorkouts(garminCon.getAllWorkouts(), pattern=match,
+                              olderThan=_olderThanDate(olderThan) if olderThan else None, keep=keep)
+
+    if dryRun:
+        for workout in selected:
+            logger.info(f"Would delete workoutId: {workout['workoutId']} workoutName: {workout['workoutName']}")
+        logger.info(f"Dry run: {len(selected)} workouts selected")
+        return PruneResult(selected=len(selected))
+
+    journal = Journal(journalPath)
+    if len(journal):
+        logger.info(f"Resuming prune, {len(journal)} deletes already journaled in '{journalPath}'")
+    with journal:
+        result = deleteWorkouts(garminCon, selected, journal, concurrency)
+    if not result.failed:
+        journal.discard()
+    logger.info(f"Pruned {result.deleted} workouts ({result.missing} already gone, {result.skipped} done earlier, {len(result.failed)} failed)")
+    return result
+
+def exportLibrary(output: str = "workouts" + SNAPSHOT_EXTENSION, concurrency: int = 4) -> ExportResult:
+    """Snapshot every workout on the account to a gzip JSONL file, refetching only changed ones."""
+    current_dir, project_root, file_path, secrets_path = _resolve_paths(".")
+    garminCon = _connect(secrets_path)
+    result = exportWorkouts(garminCon, output, concurrency)
+    logger.info(f"Exported {result.total} workouts to '{output}' ({result.fetched} fetched, {result.reused} unchanged, {result.failed} failed)")
+    return result
+
+def main(argv: Optional[list] = None):
+    logger.info(f"Running Garmin Planner {__version__}")
+    argv = sys.argv[1:] if argv is None else argv
+
+    # `garmin_planner plan.yaml` keeps compiling and syncing in one go; the
+    # compile/push subcommands split that into an offline and an online stage.
+    if argv and argv[0] in ("compile", "push", "fanout", "prune", "export"):
+        argparser = argparse.ArgumentParser(description="Garmin Planner")
+        subparsers = argparser.add_subparsers(dest="command", required=True)
+        compileParser = subparsers.add_parser("compile", help="Compile a plan YAML into a bundle file (offline)")
+        compileParser.add_argument('file_name', type=str, help='Input YAML file name (absolute or project-relative)')
+        compileParser.add_argument('-o', '--output', type=str, default=None, help=f'Output bundle path (default: <yaml name>{BUNDLE_EXTENSION})')
+        compileParser.add_argument('--estimate', action='store_true', help='Fill estimated duration/distance for each workout and log weekly totals')
+        compileParser.add_argument('--default-pace', type=str, default=None, help='Pace (min:sec per km) assumed for steps without a @P target, e.g. 6:00')
+        _addProfileArguments(compileParser)
+        addPushArguments(subparsers.add_parser("push", help="Upload and schedule a compiled bundle"))
+        fanoutParser = subparsers.add_parser("fanout", help="Compile a plan once and sync it to many accounts")
+        fanoutParser.add_argument('file_name', type=str, help='Input YAML file name (absolute or project-relative)')
+        fanoutParser.add_argument('--accounts', type=str, required=True, help='YAML list of account email/password (optional name, rate)')
+        fanoutParser.add_argument('--concurrency', type=int, default=None, help=f'Accounts synced at once (default: all, at most {DEFAULT_CONCURRENCY})')
+        fanoutParser.add_argument('--resume', action='store_true', help="Continue interrupted accounts from their journals")
+        pruneParser = subparsers.add_parser("prune", help="Bulk delete remote workouts")
+        pruneParser.add_argument('--match', type=str, default=None, help='Regex searched in workout names')
+        pruneParser.add_argument('--older-than', type=str, default=None, help='Days, or a YYYY-MM-DD date, since the last update')
+        pruneParser.add_argument('--not-in', type=str, default=None, help='Plan YAML whose workouts are kept')
+        pruneParser.add_argument('--dry-run', action='store_true', help='Only list the workouts that would be deleted')
+        pruneParser.add_argument('--concurrency', type=int, default=4, help='Concurrent delete calls (default: 4)')
+        pruneParser.add_argument('--journal', type=str, default=PRUNE_JOURNAL, help=f'Progress journal used to resume (default: {PRUNE_JOURNAL})')
+        exportParser = subparsers.add_parser("export", help="Snapshot the account's workout library")
+        exportParser.add_argument('-o', '--output', type=str, default="workouts" + SNAPSHOT_EXTENSION, help=f'Snapshot file (default: workouts{SNAPSHOT_EXTENSION})')
+        exportParser.add_argument('--concurrency', type=int, default=4, help='Concurrent workout fetches (default: 4)')
+        args = argparser.parse_args(argv)
+
+        if args.command == "compile":
+            _profiled(args, lambda: compilePlan(args.file_name, args.output, estimate=args.estimate, defaultPace=args.default_pace))
+        elif args.command == "push":
+            runPush(args)
+        elif args.command == "fanout":
+            report = fanoutPlan(args.file_name, args.accounts, concurrency=args.concurrency, resume=args.resume)
+            print(report.summaryTable())
+            if report.failed:
+                sys.exit(f"Exiting: {len(report.failed)} accounts failed, rerun with --resume to continue them")
+        elif args.command == "prune":
+            prunePlan(args.match, args.older_than, args.not_in, dryRun=args.dry_run,
+                      concurrency=args.concurrency, journalPath=args.journal)
+        else:
+            exportLibrary(args.output, args.concurrency)
+        return
+
+    argparser = argparse.ArgumentParser(description="Garmin Planner")
+    argparser.add_argument('file_name', type=str, help='Input YAML file name (absolute or project-relative)')
+    argparser.add_argument('--resume', action='store_true', help='Continue an interrupted sync from its journal')
+    _addCassetteArguments(argparser)
+    _addProfileArguments(argparser)
+    args = argparser.parse_args(argv)
+    _profiled(args, lambda: runPlan(args.file_name, resume=args.resume, cassette=_cassetteFromArgs(args)))
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,170 @@
+from garmin_planner.constant import DistanceUnit, StepType, ConditionType, TargetType
+from garmin_planner.model.workoutModel import WorkoutStep, RepeatStep
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+import sys
+
+# Compact, immutable step records for holding very large plans in memory.
+#
+# WorkoutStep/RepeatStep carry a per-instance __dict__ with ~20 mostly-None
+# fields. These records use __slots__ instead, share interned strings for the
+# highly repetitive category/exerciseName/description values, and serialize
+# straight to the same JSON as the dataclasses. The dataclasses stay the
+# public model; toDataclass() gives a compatibility view of any record.
+# compileEstimatedWorkouts, which holds a whole compiled plan at once for
+# estimation, keeps its steps in this form.
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _enumValue(value):
+    return value.value if value is not None else None
+
+@dataclass(frozen=True, slots=True)
+class CompactStep:
+    stepId: int
+    stepOrder: int
+    stepType: StepType
+    endCondition: ConditionType
+    endConditionValue: Union[int, float]
+    preferredEndConditionUnit: Optional[DistanceUnit] = None
+    targetType: Optional[TargetType] = None
+    targetValueOne: Optional[float] = None
+    targetValueTwo: Optional[float] = None
+    zoneNumber: Optional[int] = None
+    targetValueUnit: Optional[str] = None
+    stepAudioNote: Optional[str] = None
+    childStepId: Optional[int] = None
+    category: Optional[str] = None
+    exerciseName: Optional[str] = None
+    description: Optional[str] = None
+
+    @classmethod
+    def fromDataclass(cls, step: WorkoutStep) -> "CompactStep":
+        return cls(
+            stepId=step.stepId,
+            stepOrder=step.stepOrder,
+            stepType=step.stepType,
+            endCondition=step.endCondition,
+            endConditionValue=step.endConditionValue,
+            preferredEndConditionUnit=step.preferredEndConditionUnit,
+            targetType=step.targetType,
+            targetValueOne=step.targetValueOne,
+            targetValueTwo=step.targetValueTwo,
+            zoneNumber=step.zoneNumber,
+            targetValueUnit=_intern(step.targetValueUnit),
+            stepAudioNote=step.stepAudioNote,
+            childStepId=step.childStepId,
+            category=_intern(step.category),
+            exerciseName=_intern(step.exerciseName),
+            description=_intern(step.description),
+        )
+
+    def toDataclass(self) -> WorkoutStep:
+        return WorkoutStep(
+            stepId=self.stepId,
+            stepOrder=self.stepOrder,
+            stepType=self.stepType,
+            endCondition=self.endCondition,
+            endConditionValue=self.endConditionValue,
+            preferredEndConditionUnit=self.preferredEndConditionUnit,
+            targetType=self.targetType,
+            targetValueOne=self.targetValueOne,
+            targetValueTwo=self.targetValueTwo,
+            zoneNumber=self.zoneNumber,
+            targetValueUnit=self.targetValueUnit,
+            stepAudioNote=self.stepAudioNote,
+            childStepId=self.childStepId,
+            category=self.category,
+            exerciseName=self.exerciseName,
+            description=self.description,
+        )
+
+    def to_dict(self) -> dict:
+        # Same keys, in the same order, as serializing the WorkoutStep dataclass
+        return {
+            "stepId": self.stepId,
+            "stepOrder": self.stepOrder,
+            "stepType": _enumValue(self.stepType),
+            "endCondition": _enumValue(self.endCondition),
+            "endConditionValue": self.endConditionValue,
+            "preferredEndConditionUnit": _enumValue(self.preferredEndConditionUnit),
+            "type": "ExecutableStepDTO",
+            "targetType": _enumValue(self.targetType),
+            "targetValueOne": self.targetValueOne,
+            "targetValueTwo": self.targetValueTwo,
+            "zoneNumber": self.zoneNumber,
+            "targetValueUnit": self.targetValueUnit,
+            "stepAudioNote": self.stepAudioNote,
+            "childStepId": self.childStepId,
+            "category": self.category,
+            "exerciseName": self.exerciseName,
+            "description": self.description,
+        }
+
+@dataclass(frozen=True, slots=True)
+class CompactRepeat:
+    stepId: int
+    stepOrder: int
+    workoutSteps: Tuple[Union[CompactStep, "CompactRepeat"], ...]
+    numberOfIterations: Optional[int] = None
+    smartRepeat: bool = False
+    childStepId: int = 1
+    skipLastRestStep: bool = False
+    endCondition: ConditionType = ConditionType.ITERATION_ENDS
+    endConditionValue: Optional[Union[int, float]] = None
+
+    @classmethod
+    def fromDataclass(cls, step: RepeatStep) -> "CompactRepeat":
+        return cls(
+            stepId=step.stepId,
+            stepOrder=step.stepOrder,
+            workoutSteps=compactSteps(step.workoutSteps),
+            numberOfIterations=step.numberOfIterations,
+            smartRepeat=step.smartRepeat,
+            childStepId=step.childStepId,
+            skipLastRestStep=step.skipLastRestStep,
+            endCondition=step.endCondition,
+            endConditionValue=step.endConditionValue,
+        )
+
+    def toDataclass(self) -> RepeatStep:
+        return RepeatStep(
+            stepId=self.stepId,
+            stepOrder=self.stepOrder,
+            workoutSteps=expandSteps(self.workoutSteps),
+            numberOfIterations=self.numberOfIterations,
+            smartRepeat=self.smartRepeat,
+            childStepId=self.childStepId,
+            skipLastRestStep=self.skipLastRestStep,
+            endCondition=self.endCondition,
+            endConditionValue=self.endConditionValue,
+        )
+
+    def to_dict(self) -> dict:
+        # Same keys, in the same order, as serializing the RepeatStep dataclass
+        return {
+            "stepId": self.stepId,
+            "stepOrder": self.stepOrder,
+            "workoutSteps": [step.to_dict() for step in self.workoutSteps],
+            "numberOfIterations": self.numberOfIterations,
+            "stepType": StepType.REPEAT.value,
+            "smartRepeat": self.smartRepeat,
+            "childStepId": self.childStepId,
+            "type": "RepeatGroupDTO",
+            "skipLastRestStep": self.skipLastRestStep,
+            "endCondition": _enumValue(self.endCondition),
+            "endConditionValue": self.endConditionValue,
+        }
+
+def compactStep(step: Union[WorkoutStep, RepeatStep]) -> Union[CompactStep, CompactRepeat]:
+    if isinstance(step, RepeatStep):
+        return CompactRepeat.fromDataclass(step)
+    return CompactStep.fromDataclass(step)
+
+def compactSteps(steps) -> tuple:
+    return tuple(compactStep(step) for step in steps)
+
+def expandSteps(steps) -> list:
+    """Dataclass view of compact records, e.g. for code that mutates steps."""
+    return [step.toDataclass() for step in steps]
@@ -0,0 +1,245 @@
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Callable, Optional
+from garmin_planner.tracing import TraceHook, CallTrace, addDefaultHook, removeDefaultHook
+
+# Per-phase profiling of a CLI run (`--profile`).
+#
+# The sync code marks its phases with `with phase("compile"):` or wraps a
+# lazy iterator in profiledIter("compile", it). While no Profiler is
+# running, phase() hands back one shared no-op context and profiledIter
+# returns the iterator untouched, so the markers cost nothing.
+#
+# A running Profiler keeps a stack of open phases per thread. Time is exclusive: when
+# "compile" is entered from inside "import" (compilation is lazy and
+# interleaved with uploads), the clock stops for "import" until "compile"
+# exits. Garmin calls are counted, with their bytes, against the innermost
+# open phase through a tracing hook. With cpu=True every phase gets its own
+# cProfile.Profile, and with memory=True tracemalloc reports the peak and
+# net allocation of each phase. Time outside any phase is reported as
+# "other"; for a thread other than the one that started the Profiler, only
+# the time inside its own phases is counted.
+
+OTHER = "other"
+TOP_FUNCTIONS = 10
+
+class PhaseStats(object):
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.entries = 0
+        self.calls = 0
+        self.errors = 0
+        self.requestBytes = 0
+        self.responseBytes = 0
+        self.peakBytes = 0
+        self.allocatedBytes = 0
+        self.profile = None
+
+    def asDict(self, memory: bool) -> dict:
+        data = {
+            "seconds": self.seconds,
+            "entries": self.entries,
+            "calls": self.calls,
+            "errors": self.errors,
+            "requestBytes": self.requestBytes,
+            "responseBytes": self.responseBytes,
+        }
+        if memory:
+            data.update(peakBytes=self.peakBytes, allocatedBytes=self.allocatedBytes)
+        if self.profile is not None:
+            data["topFunctions"] = _topFunctions(self.profile)
+        return data
+
+def _topFunctions(profile: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> list:
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {"function": f"{os.path.basename(filename)}:{line}({name})", "calls": nc, "totalTime": tt, "cumulativeTime": ct}
+        for (filename, line, name), (cc, nc, tt, ct, callers) in rows
+    ]
+
+class Profiler(TraceHook):
+    def __init__(self, cpu: bool = False, memory: bool = False, clock: Callable[[], float] = time.perf_counter):
+        self.cpu = cpu
+        self.memory = memory
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self.phases = {}
+        self.started = None
+        self.total = 0.0
+        self._ownsTracemalloc = False
+        self._owner = None
+
+    def _thread(self) -> threading.local:
+        """This thread's open phases and the start of its current segment."""
+        local = self._local
+        if not hasattr(local, "stack"):
+            local.stack = []
+            local.segmentStart = None
+            local.segmentMemory = 0
+        return local
+
+    def _stats(self, name: str) -> PhaseStats:
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats(name)
+            if self.cpu:
+                stats.profile = cProfile.Profile()
+        return stats
+
+    def _current(self) -> PhaseStats:
+        stack = self._thread().stack
+        return self._stats(stack[-1] if stack else OTHER)
+
+    def _closeSegment(self):
+        local = self._thread()
+        if local.segmentStart is None:
+            # a thread entering its first phase has no open segment yet
+            return
+        current = self._current()
+        current.seconds += self._clock() - local.segmentStart
+        if current.profile is not None:
+            current.profile.disable()
+        if self.memory:
+            size, peak = tracemalloc.get_traced_memory()
+            current.peakBytes = max(current.peakBytes, peak - local.segmentMemory)
+            current.allocatedBytes += size - local.segmentMemory
+        local.segmentStart = None
+
+    def _openSegment(self):
+        local = self._thread()
+        if not local.stack and local is not self._owner:
+            # outside its phases a worker thread's time is not "other"
+            return
+        current = self._current()
+        if self.memory:
+            tracemalloc.reset_peak()
+            local.segmentMemory = tracemalloc.get_traced_memory()[0]
+        if current.profile is not None:
+            current.profile.enable()
+        local.segmentStart = self._clock()
+
+    def start(self) -> "Profiler":
+        global _active
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._ownsTracemalloc = True
+        addDefaultHook(self)
+        self.started = self._clock()
+        self._owner = self._thread()
+        self._openSegment()
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        with self._lock:
+            stack = self._thread().stack
+            while stack:
+                self._closeSegment()
+                stack.pop()
+                self._openSegment()
+            self._closeSegment()
+        removeDefaultHook(self)
+        if self._ownsTracemalloc:
+            tracemalloc.stop()
+            self._ownsTracemalloc = False
+        self.total = self._clock() - self.started
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        with self._lock:
+            self._closeSegment()
+            self._thread().stack.append(name)
+            self._stats(name).entries += 1
+            self._openSegment()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._closeSegment()
+                self._thread().stack.pop()
+                self._openSegment()
+
+    def iterate(self, name: str, iterable):
+        """Yield from iterable, timing each step of it as phase `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def after(self, trace: CallTrace):
+        with self._lock:
+            current = self._current()
+            current.calls += 1
+            current.errors += trace.error is not None
+            current.requestBytes += trace.requestBytes
+            current.responseBytes += trace.responseBytes
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "total": self.total,
+                "cpu": self.cpu,
+                "memory": self.memory,
+                "phases": {name: stats.asDict(self.memory) for name, stats in sorted(self.phases.items(), key=lambda item: item[0] == OTHER)
+                           if stats.entries or stats.seconds},
+            }
+
+    def summaryTable(self) -> str:
+        snapshot = self.snapshot()
+        lines = [f"{'phase':<12} {'time':>10} {'share':>6} {'calls':>6} {'sent':>10} {'received':>10}" + (f" {'peak':>10}" if self.memory else "")]
+        for name, data in snapshot["phases"].items():
+            share = data["seconds"] / snapshot["total"] * 100 if snapshot["total"] else 0.0
+            line = (f"{name:<12} {data['seconds'] * 1000:>8.1f}ms {share:>5.1f}% {data['calls']:>6}"
+                    f" {data['requestBytes']:>10,} {data['responseBytes']:>10,}")
+            if self.memory:
+                line += f" {data['peakBytes'] / 2**20:>8.2f}MB"
+            lines.append(line)
+        lines.append(f"{'total':<12} {snapshot['total'] * 1000:>8.1f}ms")
+        return "\n".join(lines)
+
+    def writeJson(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def dumpProfiles(self, prefix: str) -> list:
+        """Write each phase's cProfile stats to `<prefix>.<phase>.prof`."""
+        paths = []
+        for name, stats in self.phases.items():
+            if stats.profile is not None and stats.entries:
+                path = f"{prefix}.{name}.prof"
+                stats.profile.dump_stats(path)
+                paths.append(path)
+        return paths
+
+_active: Optional[Profiler] = None
+_NO_PHASE = contextlib.nullcontext()
+
+def activeProfiler() -> Optional[Profiler]:
+    return _active
+
+def phase(name: str):
+    if _active is None:
+        return _NO_PHASE
+    return _active.phase(name)
+
+def profiledIter(name: str, iterable):
+    if _active is None:
+        return iterable
+    return _active.iterate(name, iterable)
@@ -0,0 +1,94 @@
+import datetime
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from garmin_planner.__init__ import logger
+from garmin_planner.journal import Journal
+from garmin_planner.resilience import httpStatus
+from typing import Iterable, Optional
+
+# Bulk deletion of remote workouts.
+#
+# selectWorkouts picks workouts from Client.getAllWorkouts() by name pattern,
+# age and/or "not in this plan"; deleteWorkouts removes them with a few
+# concurrent calls (the Client's per-account rate limiter still paces them)
+# and journals every finished delete so an interrupted purge can resume.
+
+DELETE_OP = "delete"
+
+@dataclass
+class PruneResult:
+    selected: int = 0
+    deleted: int = 0
+    missing: int = 0        # already gone on Garmin
+    skipped: int = 0        # already deleted by an earlier, interrupted run
+    failed: list = field(default_factory=list)
+
+def workoutDate(workout: dict) -> Optional[datetime.date]:
+    """Last update (or creation) date of a remote workout."""
+    value = workout.get('updatedDate') or workout.get('createdDate')
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+def selectWorkouts(workouts: Iterable[dict], pattern: Optional[str] = None, olderThan: Optional[datetime.date] = None,
+                   keep: Optional[Iterable[str]] = None) -> list:
+    """Workouts matching every given criterion.
+
+    pattern is a regex searched in the name, olderThan keeps workouts last
+    updated before that date, keep is a set of names to spare (prune).
+    """
+    regex = re.compile(pattern) if pattern else None
+    keep = set(keep) if keep is not None else None
+    selected = []
+    for workout in workouts:
+        name = workout.get('workoutName', '')
+        if regex is not None and not regex.search(name):
+            continue
+        if olderThan is not None:
+            date = workoutDate(workout)
+            if date is None or date >= olderThan:
+                continue
+        if keep is not None and name in keep:
+            continue
+        selected.append(workout)
+    return selected
+
+def deleteWorkouts(conn, workouts: list, journal: Optional[Journal] = None, concurrency: int = 4) -> PruneResult:
+    result = PruneResult(selected=len(workouts))
+    pending = []
+    for workout in workouts:
+        if journal is not None and journal.done(DELETE_OP, workout['workoutId']):
+            result.skipped += 1
+        else:
+            pending.append(workout)
+
+    def delete(workout):
+        # a call that returns is a 2xx delete (None for a 204), a 404 means already gone
+        try:
+            found = conn.deleteWorkout(workout) is not False
+        except Exception as e:
+            if httpStatus(e) != 404:
+                raise
+            found = False
+        if journal is not None:
+            journal.record(DELETE_OP, workout['workoutId'], workoutName=workout.get('workoutName'), found=found)
+        return found
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [(workout, pool.submit(delete, workout)) for workout in pending]
+        for workout, future in futures:
+            try:
+                found = future.result()
+            except Exception as e:
+                logger.error(f"Failed to delete workout {workout['workoutId']} ({workout.get('workoutName')}): {e}")
+                result.failed.append(workout)
+                continue
+            if found:
+                result.deleted += 1
+            else:
+                result.missing += 1
+    return result
@@ -0,0 +1,249 @@
+import email.utils
+import random
+import threading
+import time
+import requests
+from dataclasses import dataclass
+from garth.exc import GarthHTTPError
+from garmin_planner.__init__ import logger
+from typing import Callable, Optional
+
+# Outbound protection for Garmin Connect calls.
+#
+# Every Client call for an account goes through that account's Resilience:
+#   - an adaptive token bucket (AIMD: the rate creeps up on success, halves
+#     on a 429, and honours Retry-After by pausing the bucket),
+#   - a circuit breaker that fails fast after repeated 5xx / connection
+#     errors and lets a single probe through once the reset timeout passes,
+#   - retries with full-jitter exponential backoff for idempotent calls
+#     (429s are retried for any method, Garmin did not process the request).
+# Clock, sleep and random are injectable so all of it runs under a fake clock.
+
+class CircuitOpenError(Exception):
+    """Raised without calling Garmin while an account's circuit is open."""
+
+@dataclass(frozen=True)
+class ResilienceConfig:
+    rate: float = 4.0               # initial requests per second
+    burst: float = 4.0              # bucket capacity
+    minRate: float = 0.2
+    maxRate: float = 10.0
+    rateIncrease: float = 0.1       # additive increase per successful call
+    rateDecrease: float = 0.5       # multiplicative decrease per 429
+    failureThreshold: int = 5       # consecutive failures that open the circuit
+    resetTimeout: float = 30.0      # seconds open before a probe is allowed
+    maxRetries: int = 3
+    backoffBase: float = 0.5
+    backoffMax: float = 30.0
+
+class AdaptiveTokenBucket(object):
+    def __init__(self, config: ResilienceConfig, clock: Callable[[], float]):
+        self.config = config
+        self.rate = config.rate
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = config.burst
+        self._updated = clock()
+        self._blockedUntil = 0.0
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.config.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token; returns how long the caller has to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blockedUntil - now)
+
+    def onSuccess(self):
+        with self._lock:
+            self.rate = min(self.config.maxRate, self.rate + self.config.rateIncrease)
+
+    def onThrottle(self, retryAfter: Optional[float] = None):
+        with self._lock:
+            now = self._clock()
+            self.rate = max(self.config.minRate, self.rate * self.config.rateDecrease)
+            self._tokens = min(self._tokens, 0.0)
+            if retryAfter:
+                self._blockedUntil = max(self._blockedUntil, now + retryAfter)
+                # no tokens accumulate while Garmin asked us to stay away
+                self._updated = max(self._updated, self._blockedUntil)
+
+class CircuitBreaker(object):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, config: ResilienceConfig, clock: Callable[[], float]):
+        self.config = config
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self._openedAt = 0.0
+        self._probing = False
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self._clock() - self._openedAt >= self.config.resetTimeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError("Garmin Connect circuit is open, not sending request")
+
+    def onSuccess(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def onFailure(self) -> bool:
+        """Count a failure; returns True when this one opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.config.failureThreshold):
+                self.state = self.OPEN
+                self._openedAt = self._clock()
+                self._probing = False
+                return True
+            return False
+
+def _response(error: Exception) -> Optional[requests.Response]:
+    if isinstance(error, GarthHTTPError):
+        error = error.error
+    return getattr(error, "response", None) if isinstance(error, requests.HTTPError) else None
+
+def httpStatus(error: Exception) -> Optional[int]:
+    """HTTP status of a failed Garmin call, None when it never got a response."""
+    response = _response(error)
+    return response.status_code if response is not None else None
+
+def _retryAfter(response: Optional[requests.Response]) -> Optional[float]:
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+THROTTLED = "throttled"
+UNAVAILABLE = "unavailable"
+
+def classifyError(error: Exception) -> Optional[str]:
+    """THROTTLED for 429, UNAVAILABLE for 5xx/connection trouble, None otherwise."""
+    response = _response(error)
+    if response is not None:
+        if response.status_code == 429:
+            return THROTTLED
+        if response.status_code >= 500:
+            return UNAVAILABLE
+        return None
+    # urllib3 gives up on 5xx with a RetryError, connection problems surface as is
+    if isinstance(error, (requests.exceptions.RetryError, requests.ConnectionError, requests.Timeout)):
+        return UNAVAILABLE
+    return None
+
+class Resilience(object):
+    """Rate limiting, circuit breaking and retries for one account."""
+
+    def __init__(self, config: Optional[ResilienceConfig] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep, rand: Callable[[], float] = random.random):
+        self.config = config or ResilienceConfig()
+        self._clock = clock
+        self._sleep = sleep
+        self._random = rand
+        self.bucket = AdaptiveTokenBucket(self.config, clock)
+        self.breaker = CircuitBreaker(self.config, clock)
+        self._statsLock = threading.Lock()
+        self.counters = dict.fromkeys(
+            ("calls", "succeeded", "failed", "retries", "throttled", "unavailable", "circuitOpened", "rejected"), 0)
+        self.waitedSeconds = 0.0
+
+    def _count(self, name: str, n: int = 1):
+        with self._statsLock:
+            self.counters[name] += n
+
+    def _wait(self, seconds: float):
+        if seconds > 0:
+            with self._statsLock:
+                self.waitedSeconds += seconds
+            self._sleep(seconds)
+
+    def backoff(self, attempt: int) -> float:
+        return self._random() * min(self.config.backoffMax, self.config.backoffBase * (2 ** attempt))
+
+    def call(self, fn: Callable[[], object], idempotent: bool = True):
+        self._count("calls")
+        attempt = 0
+        while True:
+            try:
+                self.breaker.allow()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            self._wait(self.bucket.reserve())
+            try:
+                result = fn()
+            except Exception as e:
+                kind = classifyError(e)
+                retryAfter = None
+                if kind == THROTTLED:
+                    self._count("throttled")
+                    retryAfter = _retryAfter(_response(e))
+                    self.bucket.onThrottle(retryAfter)
+                elif kind == UNAVAILABLE:
+                    self._count("unavailable")
+                    if self.breaker.onFailure():
+                        self._count("circuitOpened")
+                        logger.warning("Garmin Connect keeps failing, opening circuit")
+                else:
+                    # Garmin answered (e.g. 404), the service itself is fine
+                    self.breaker.onSuccess()
+
+                if kind is None or attempt >= self.config.maxRetries or not (idempotent or kind == THROTTLED):
+                    self._count("failed")
+                    raise
+                delay = max(retryAfter or 0.0, self.backoff(attempt))
+                logger.debug("Retrying Garmin call in %.2fs after %s", delay, e)
+                self._count("retries")
+                self._wait(delay)
+                attempt += 1
+            else:
+                self.bucket.onSuccess()
+                self.breaker.onSuccess()
+                self._count("succeeded")
+                return result
+
+    def snapshot(self) -> dict:
+        with self._statsLock:
+            stats = dict(self.counters)
+            stats["waitedSeconds"] = self.waitedSeconds
+        stats["rate"] = self.bucket.rate
+        stats["circuit"] = self.breaker.state
+        return stats
+
+_accountResilience = {}
+_accountResilienceLock = threading.Lock()
+
+def accountResilience(email: str, config: Optional[ResilienceConfig] = None) -> Resilience:
+    """The process-wide Resilience for an account, shared by all its Clients."""
+    key = (email.strip().lower(), config or ResilienceConfig())
+    with _accountResilienceLock:
+        resilience = _accountResilience.get(key)
+        if resilience is None:
+            resilience = _accountResilience[key] = Resilience(key[1])
+        return resilience
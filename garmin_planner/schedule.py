@@ -0,0 +1,274 @@
+import abc
+import bisect
+import datetime
+import heapq
+from operator import itemgetter
+from typing import Optional
+from garmin_planner.constant import DATE_FORMAT
+
+# Schedule rules for `schedulePlan`.
+#
+# Besides `workouts` (one workout per consecutive day from start_from), a
+# schedulePlan can list `rules`:
+#
+#   schedulePlan:
+#     start_from: 2025-01-06
+#     except: [2025-04-21]                  # no workouts on these days, any rule
+#     rules:
+#       - weekly: {mon: easy_run, wed: intervals, sat: [long_run, core]}
+#         until: 2025-03-30
+#       - weekly:                            # multi-week cycle: build, build, deload
+#           - {tue: intervals, sat: long_run}
+#           - {tue: tempo, sat: long_run}
+#           - {sat: easy_run}
+#         from: 2025-03-31
+#         repeat: 4                          # times through the cycle
+#       - days: [easy_run, rest, tempo]      # consecutive days; rest (or null) is a day off
+#         from: 2025-07-01
+#         repeat: 10
+#         except: [{from: 2025-07-05, until: 2025-07-06}]
+#
+# `from` defaults to start_from and `until` is inclusive. Weekly rules follow
+# calendar weeks (Monday to Sunday), counted from the week holding `from`,
+# and need `until` or `repeat`. An excluded day drops that day's workouts; it
+# doesn't shift the rest of the cycle.
+#
+# A Schedule is compiled once and expanded lazily: entries() merges the
+# rules' generators in date order, so only one pending entry per rule is held
+# however long the plan. entries(start) expands the same compiled rules for
+# another start date, e.g. for many athletes on the same program.
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+REST = "rest"
+_ONE_DAY = datetime.timedelta(days=1)
+_ONE_WEEK = datetime.timedelta(days=7)
+
+class ScheduleError(ValueError):
+    pass
+
+def _date(value, field: str) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.strptime(value, DATE_FORMAT).date()
+        except ValueError:
+            pass
+    raise ScheduleError(f"Invalid date {value!r} for '{field}', expected format {DATE_FORMAT}")
+
+def _count(value, field: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ScheduleError(f"'{field}' must be a positive whole number, got {value!r}")
+    return value
+
+def _dayWorkouts(value) -> tuple:
+    """Workout names of one day: a name, a list of names, or rest/null for none."""
+    if value is None:
+        return ()
+    if isinstance(value, list):
+        return tuple(name for item in value for name in _dayWorkouts(item))
+    if not isinstance(value, str):
+        raise ScheduleError(f"Expected a workout name, got {value!r}")
+    if value.strip().lower() == REST:
+        return ()
+    return (value,)
+
+class DateSet(object):
+    """Excluded days: single dates and inclusive {from, until} ranges."""
+
+    def __init__(self, values=()):
+        self._dates = set()
+        self._ranges = []
+        for value in values or ():
+            if isinstance(value, dict):
+                start, end = _date(value.get("from"), "except.from"), _date(value.get("until"), "except.until")
+                if end < start:
+                    raise ScheduleError(f"Exclusion ends ({end}) before it starts ({start})")
+                self._ranges.append((start, end))
+            else:
+                self._dates.add(_date(value, "except"))
+        self._index()
+
+    def _index(self):
+        self._ranges.sort()
+        self._starts = [start for start, _ in self._ranges]
+        # latest end among the ranges starting at or before each one, so overlapping ranges bisect correctly
+        self._reach = []
+        for _, end in self._ranges:
+            self._reach.append(max(end, self._reach[-1]) if self._reach else end)
+
+    def __bool__(self) -> bool:
+        return bool(self._dates or self._ranges)
+
+    def __contains__(self, date: datetime.date) -> bool:
+        if date in self._dates:
+            return True
+        index = bisect.bisect_right(self._starts, date)
+        return index > 0 and self._reach[index - 1] >= date
+
+    def union(self, other: "DateSet") -> "DateSet":
+        merged = DateSet()
+        merged._dates = self._dates | other._dates
+        merged._ranges = self._ranges + other._ranges
+        merged._index()
+        return merged
+
+class ScheduleRule(abc.ABC):
+    """Common `from` / `until` / `repeat` / `except` handling of a rule."""
+
+    def __init__(self, start: Optional[datetime.date], until: Optional[datetime.date], repeat: Optional[int], excluded: Optional[DateSet]):
+        self.start = start
+        self.until = until
+        self.repeat = repeat
+        self.excluded = excluded or DateSet()
+
+    @abc.abstractmethod
+    def _days(self, start: datetime.date):
+        """Yield (date, workout names) in date order; subclasses define the pattern."""
+
+    def entries(self, start: Optional[datetime.date] = None, excluded: Optional[DateSet] = None):
+        """Yield (date, workoutName) from the rule's own `from`, else from start."""
+        start = self.start or start
+        if start is None:
+            raise ScheduleError("Rule has no 'from' date and the schedule has no start_from")
+        if excluded:
+            excluded = self.excluded.union(excluded) if self.excluded else excluded
+        else:
+            excluded = self.excluded
+        until = self.until
+        for date, names in self._days(start):
+            if until is not None and date > until:
+                return
+            if excluded and date in excluded:
+                continue
+            for name in names:
+                yield date, name
+
+    @abc.abstractmethod
+    def workoutNames(self) -> set:
+        """Names of every workout the rule can schedule."""
+
+class DayCycle(ScheduleRule):
+    """Consecutive days from `from`, cycling through `days` `repeat` times (once by default)."""
+
+    def __init__(self, days: list, start=None, until=None, repeat=None, excluded=None, verbatim: bool = False):
+        super().__init__(start, until, repeat, excluded)
+        # verbatim: every item is one workout name, as in the original `workouts` list
+        self.days = [(day,) for day in days] if verbatim else [_dayWorkouts(day) for day in days]
+
+    def _days(self, start: datetime.date):
+        # with `until` and no `repeat`, cycle until the end date
+        cycles = self.repeat or (None if self.until is not None else 1)
+        date = start
+        cycle = 0
+        while self.days and (cycles is None or cycle < cycles):
+            for names in self.days:
+                yield date, names
+                date += _ONE_DAY
+            cycle += 1
+
+    def workoutNames(self) -> set:
+        return {name for names in self.days for name in names}
+
+class WeeklyRule(ScheduleRule):
+    """Weekday patterns per calendar week, cycling through `weeks` (one pattern per week)."""
+
+    def __init__(self, weeks: list, start=None, until=None, repeat=None, excluded=None):
+        super().__init__(start, until, repeat, excluded)
+        if until is None and repeat is None:
+            raise ScheduleError("A weekly rule needs 'until' or 'repeat'")
+        if not weeks:
+            raise ScheduleError("A weekly rule needs at least one week")
+        self.weeks = [self._pattern(week) for week in weeks]
+
+    @staticmethod
+    def _pattern(week) -> list:
+        if not isinstance(week, dict):
+            raise ScheduleError(f"A week is a mapping of weekdays to workouts, got {week!r}")
+        pattern = []
+        for day, value in week.items():
+            key = str(day).strip().lower()[:3]
+            if key not in WEEKDAYS:
+                raise ScheduleError(f"Unknown weekday {day!r}, expected one of {', '.join(WEEKDAYS)}")
+            names = _dayWorkouts(value)
+            if names:
+                pattern.append((WEEKDAYS.index(key), names))
+        pattern.sort(key=itemgetter(0))
+        return pattern
+
+    def _days(self, start: datetime.date):
+        monday = start - datetime.timedelta(days=start.weekday())
+        weeks = len(self.weeks) * self.repeat if self.repeat else None
+        index = 0
+        while weeks is None or index < weeks:
+            for weekday, names in self.weeks[index % len(self.weeks)]:
+                date = monday + datetime.timedelta(days=weekday)
+                if date >= start:
+                    yield date, names
+            monday += _ONE_WEEK
+            index += 1
+            if self.until is not None and monday > self.until:
+                return
+
+    def workoutNames(self) -> set:
+        return {name for week in self.weeks for _, names in week for name in names}
+
+class Schedule(object):
+    def __init__(self, rules: list, start: Optional[datetime.date] = None, excluded: Optional[DateSet] = None):
+        self.rules = rules
+        self.start = start
+        self.excluded = excluded or DateSet()
+
+    def entries(self, start: Optional[datetime.date] = None):
+        """Lazily yield (date, workoutName) in date order; rules on the same day keep their order."""
+        start = start or self.start
+        streams = [rule.entries(start, self.excluded) for rule in self.rules]
+        if len(streams) == 1:
+            return streams[0]
+        return heapq.merge(*streams, key=itemgetter(0))
+
+    def __iter__(self):
+        return self.entries()
+
+    def workoutNames(self) -> set:
+        return set().union(*(rule.workoutNames() for rule in self.rules))
+
+_RULE_FIELDS = {"from", "until", "repeat", "except"}
+
+def compileRule(rule: dict) -> ScheduleRule:
+    if not isinstance(rule, dict):
+        raise ScheduleError(f"A schedule rule is a mapping, got {rule!r}")
+    kinds = [kind for kind in ("weekly", "days") if kind in rule]
+    unknown = set(rule) - _RULE_FIELDS - {"weekly", "days"}
+    if len(kinds) != 1 or unknown:
+        raise ScheduleError(f"A schedule rule needs exactly one of 'weekly' or 'days' (and from/until/repeat/except), got {sorted(rule)}")
+    options = dict(
+        start=_date(rule["from"], "from") if rule.get("from") is not None else None,
+        until=_date(rule["until"], "until") if rule.get("until") is not None else None,
+        repeat=_count(rule["repeat"], "repeat") if rule.get("repeat") is not None else None,
+        excluded=DateSet(rule.get("except")),
+    )
+    if kinds[0] == "weekly":
+        weeks = rule["weekly"]
+        return WeeklyRule(weeks if isinstance(weeks, list) else [weeks], **options)
+    days = rule["days"]
+    if not isinstance(days, list):
+        raise ScheduleError(f"'days' is a list of day entries, got {days!r}")
+    return DayCycle(days, **options)
+
+def compileSchedule(schedulePlan: dict) -> Schedule:
+    """Compile a schedulePlan (`start_from`, `workouts`, `rules`, `except`) into a Schedule."""
+    start = schedulePlan.get("start_from")
+    start = _date(start, "start_from") if start is not None else None
+    rules = []
+    workouts = schedulePlan.get("workouts")
+    if workouts:
+        # the original format: every item is a workout name, one per day
+        rules.append(DayCycle(workouts, verbatim=True))
+    for rule in schedulePlan.get("rules") or ():
+        rules.append(compileRule(rule))
+    if start is None and any(rule.start is None for rule in rules):
+        raise ScheduleError("schedulePlan needs 'start_from' for rules without 'from'")
+    return Schedule(rules, start, DateSet(schedulePlan.get("except")))
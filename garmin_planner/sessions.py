@@ -0,0 +1,140 @@
+import hashlib
+import threading
+import time
+from garmin_planner.__init__ import logger
+from garmin_planner.client import Client
+from typing import Callable, Optional
+
+# Long-lived Client sessions for the API process.
+#
+# SessionCache keeps one logged-in Client per account so requests stop paying
+# for a login (or a token check) each time. TokenRefresher is a daemon thread
+# that watches every cached session's OAuth2 expiry and refreshes it a margin
+# before it runs out, so in steady state no request ever hits an expired
+# token. Refreshes go through the token store, so they are shared with the
+# other workers using the same account.
+
+DEFAULT_REFRESH_MARGIN = 600    # seconds before expiry to refresh
+DEFAULT_REFRESH_INTERVAL = 60   # seconds between expiry checks
+
+class SessionCache(object):
+    def __init__(self, clientFactory: Callable[[str, str], Client] = Client):
+        self._clientFactory = clientFactory
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def _key(self, email: str, password: str) -> tuple:
+        return (email.strip().lower(), hashlib.sha256(password.encode("utf-8")).hexdigest())
+
+    def get(self, email: str, password: str) -> Client:
+        """The cached Client for this account, logging in on first use."""
+        key = self._key(email, password)
+        with self._lock:
+            client = self._sessions.get(key)
+        if client is not None:
+            return client
+
+        client = self._clientFactory(email, password)
+        with self._lock:
+            # keep the first one if two requests raced to log in
+            return self._sessions.setdefault(key, client)
+
+    def evict(self, email: str, password: str):
+        with self._lock:
+            self._sessions.pop(self._key(email, password), None)
+
+    def clients(self) -> list:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+def _expiresAt(client: Client) -> Optional[float]:
+    token = getattr(client.garth, "oauth2_token", None)
+    return getattr(token, "expires_at", None)
+
+class TokenRefresher(object):
+    """Refreshes cached sessions' OAuth2 tokens ahead of expiry."""
+
+    def __init__(self, sessions: SessionCache, margin: float = DEFAULT_REFRESH_MARGIN,
+                 interval: float = DEFAULT_REFRESH_INTERVAL, clock: Callable[[], float] = time.time):
+        self.sessions = sessions
+        self.margin = margin
+        self.interval = interval
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+        self._statsLock = threading.Lock()
+        self.refreshes = 0
+        self.failures = 0
+        self.lastLatency = None
+        self.maxLatency = 0.0
+        self._totalLatency = 0.0
+        self.lastError = None
+
+    def _record(self, latency: float, error: Optional[Exception]):
+        with self._statsLock:
+            if error is None:
+                self.refreshes += 1
+                self.lastLatency = latency
+                self.maxLatency = max(self.maxLatency, latency)
+                self._totalLatency += latency
+            else:
+                self.failures += 1
+                self.lastError = str(error)
+
+    def runOnce(self) -> int:
+        """Refresh every session due within the margin; returns how many were refreshed."""
+        refreshed = 0
+        for client in self.sessions.clients():
+            expiresAt = _expiresAt(client)
+            if expiresAt is None or expiresAt - self.margin > self._clock():
+                continue
+            started = time.perf_counter()
+            try:
+                client.refreshToken()
+            except Exception as e:
+                # keep the session, it will be retried on the next pass
+                logger.warning(f"Token refresh failed: {e}")
+                self._record(time.perf_counter() - started, e)
+                continue
+            self._record(time.perf_counter() - started, None)
+            refreshed += 1
+        return refreshed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.runOnce()
+            except Exception as e:
+                logger.error(f"Token refresher pass failed: {e}")
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="garmin-token-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def snapshot(self) -> dict:
+        expiries = [e for e in (_expiresAt(c) for c in self.sessions.clients()) if e is not None]
+        with self._statsLock:
+            return {
+                "sessions": len(self.sessions),
+                "running": self._thread is not None and self._thread.is_alive(),
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "lastLatency": self.lastLatency,
+                "maxLatency": self.maxLatency,
+                "avgLatency": self._totalLatency / self.refreshes if self.refreshes else None,
+                "lastError": self.lastError,
+                "nextExpiry": min(expiries) if expiries else None,
+            }
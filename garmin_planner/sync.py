@@ -0,0 +1,296 @@
+from garmin_planner.client import Client
+from garmin_planner.__init__ import logger
+from garmin_planner.constant import DATE_FORMAT
+from garmin_planner.parser import parseYaml
+from garmin_planner.bundle import PlanBundle
+from garmin_planner.journal import Journal
+from garmin_planner.prune import DELETE_OP
+from garmin_planner.cassette import Cassette, RECORD, REPLAY
+from garmin_planner.profiling import Profiler, phase, profiledIter
+from typing import Optional
+import datetime
+import sys
+import argparse
+import os
+
+# The online half of a sync: uploading compiled workouts, scheduling them,
+# logging in and journaling progress, plus the `push` entry point.
+#
+# main.py compiles plans and builds on these. A push only streams an
+# already compiled bundle, so this module never imports the compiler and
+# `python -m garmin_planner push` starts without loading it.
+
+# Sync journal operations (DELETE_OP comes from prune)
+IMPORT_OP = "import"
+SCHEDULE_OP = "schedule"
+RUN_OP = "run"
+SYNC_JOURNAL_SUFFIX = ".sync.journal"
+PROFILE_OUTPUT = "profile.json"
+
+def uploadWorkouts(compiled, toDeletePrevious: bool, conn: Client, journal: Optional[Journal] = None):
+    """Upload (name, workout json) pairs, optionally deleting same-name workouts first.
+
+    With a journal, workouts it already records as imported are skipped and
+    every delete/import is recorded as it completes.
+    """
+    allWorkouts = []
+    if toDeletePrevious:
+        with phase("delete"):
+            allWorkouts = conn.getAllWorkouts()
+
+    for name, jsonData in compiled:
+        if journal is not None and journal.done(IMPORT_OP, name):
+            logger.info("Skipping workout %s, already imported by this sync", name)
+            continue
+
+        if toDeletePrevious and (name in [wo['workoutName'] for wo in allWorkouts]):
+            filtered = [wo for wo in allWorkouts if wo['workoutName'] == name]
+            with phase("delete"):
+                for toDelete in filtered:
+                    if journal is not None and journal.done(DELETE_OP, toDelete['workoutId']):
+                        continue
+                    found = conn.deleteWorkout(toDelete)
+                    if journal is not None:
+                        journal.record(DELETE_OP, toDelete['workoutId'], workoutName=name, found=found)
+
+        with phase("import"):
+            resJson = conn.importWorkout(jsonData)
+            if journal is not None:
+                journal.record(IMPORT_OP, name, workoutId=resJson.get('workoutId'))
+
+def _scheduledCalendar(start: datetime.date, end: datetime.date, conn: Client, seen: set) -> dict:
+    """Map (date string, workoutId) to the ids of its calendar entries from start to end, skipping ids in seen."""
+    try:
+        items = conn.getCalendar(start, end)
+    except Exception as e:
+        logger.warning(f"Could not read the Garmin calendar, scheduling every entry: {e}")
+        return {}
+
+    scheduled = {}
+    for item in items:
+        if item['id'] in seen:
+            continue
+        seen.add(item['id'])
+        scheduled.setdefault((item['date'], item['workoutId']), []).append(item['id'])
+    return scheduled
+
+def _monthEnd(date: datetime.date) -> datetime.date:
+    following = datetime.date(date.year + 1, 1, 1) if date.month == 12 else datetime.date(date.year, date.month + 1, 1)
+    return following - datetime.timedelta(days=1)
+
+def _calendarWindows(entries):
+    """Split date-ordered entries by month into (start, end, entries) whose ranges tile first..last date.
+
+    A month's range runs to the month's end, so stale entries between two
+    scheduled months are still seen; the last range ends at the last entry.
+    """
+    window, start, end = [], None, None
+    for entry in entries:
+        date = entry[0]
+        if window and not (start <= date <= end):
+            yield start, end, window
+            window, start = [], (end + datetime.timedelta(days=1) if date > end else date)
+        if not window:
+            start = date if start is None else min(start, date)
+            end = _monthEnd(date)
+        window.append(entry)
+    if window:
+        yield start, max(date for date, _ in window), window
+
+def scheduleEntries(entries, conn: Client, journal: Optional[Journal] = None, removeStale: bool = False):
+    """Schedule (date, workoutName) pairs on workouts that already exist on Garmin Connect.
+
+    Entries already on the calendar are left alone. With removeStale, other
+    calendar entries of the same workouts inside the plan's date range are
+    unscheduled. Entries are consumed a month at a time, so a lazily
+    expanded schedule is never held in full.
+    """
+    allWorkouts = conn.getAllWorkouts()
+    workoutMap = {value['workoutName']: value['workoutId'] for _, value in enumerate(allWorkouts)}
+    logger.debug("Workouts on garmin: %s", workoutMap)
+
+    occurrences = {}
+    seen = set()
+    stale = []
+    planWorkoutIds = set()
+    for start, end, window in _calendarWindows(entries):
+        scheduled = _scheduledCalendar(start, end, conn, seen)
+        _scheduleWindow(window, scheduled, workoutMap, occurrences, conn, journal)
+        if removeStale:
+            planWorkoutIds.update(workoutMap[name] for _, name in window if name in workoutMap)
+            stale.extend(scheduled.items())
+
+    # a workout's stale entries can sit in months before its first plan entry
+    for (date, workoutId), scheduleIds in stale:
+        if workoutId not in planWorkoutIds:
+            continue
+        for scheduleId in scheduleIds:
+            conn.unscheduleWorkout(scheduleId)
+            logger.info("Unscheduled stale workoutId: %s on date %s", workoutId, date)
+
+def _scheduleWindow(entries: list, scheduled: dict, workoutMap: dict, occurrences: dict, conn: Client, journal: Optional[Journal]):
+    for currentDate, toScheduleWorkout in entries:
+        # the same workout can legitimately be scheduled twice on one day
+        occurrence = occurrences[(currentDate, toScheduleWorkout)] = occurrences.get((currentDate, toScheduleWorkout), 0) + 1
+        journalKey = f"{currentDate.strftime(DATE_FORMAT)}/{toScheduleWorkout}/{occurrence}"
+
+        # claim the matching calendar entry first, even for entries the journal
+        # records, so removeStale never sees it as stale
+        workoutId = workoutMap.get(toScheduleWorkout)
+        existing = scheduled.get((currentDate.strftime(DATE_FORMAT), workoutId)) if workoutId is not None else None
+        if existing:
+            existing.pop()
+            logger.debug("Workout %s already scheduled on date %s", toScheduleWorkout, currentDate)
+            continue
+        if journal is not None and journal.done(SCHEDULE_OP, journalKey):
+            continue
+
+        if workoutId is None:
+            logger.warning(f"Workout '{toScheduleWorkout}' not found in Garmin account. Skipping.")
+            continue
+
+        dateJson = {"date": currentDate.strftime(DATE_FORMAT)}
+        success = conn.scheduleWorkout(workoutId, dateJson)
+        if success:
+            logger.info("Scheduled workout %s on date %s", toScheduleWorkout, currentDate)
+            if journal is not None:
+                journal.record(SCHEDULE_OP, journalKey, workoutId=workoutId)
+        else:
+            logger.error("Something went wrong during scheduling")
+
+def _resolve_paths(arg_file_name: str):
+    """
+    Resolve:
+      - project_root (repo root)
+      - file_path: absolute or project-relative YAML passed on CLI
+      - secrets_path: from env or common locations
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))  # .../garmin_planner/garmin_planner
+    project_root = os.path.dirname(current_dir)               # .../garmin_planner
+
+    # Resolve the schedule file (allow absolute or project-relative)
+    file_path = arg_file_name if os.path.isabs(arg_file_name) else os.path.join(project_root, arg_file_name)
+
+    # Secrets lookup order: ENV -> project root -> package dir
+    secrets_path = os.environ.get("GARMIN_SECRETS", "")
+    if not (secrets_path and os.path.exists(secrets_path)):
+        candidates = [
+            os.path.join(project_root, "secrets.yaml"),
+            os.path.join(current_dir,  "secrets.yaml"),
+        ]
+        secrets_path = next((p for p in candidates if os.path.exists(p)), "")
+
+    return current_dir, project_root, file_path, secrets_path
+
+def _connect(secrets_path: str, cassette: Optional[Cassette] = None) -> Client:
+    if cassette is not None and cassette.replaying:
+        return Client("replay@cassette", "", cassette=cassette)
+
+    # preprocess secrets yaml file and get email and password
+    secrets = parseYaml(secrets_path) if secrets_path else None
+    if not secrets:
+        logger.error(f"Failed to parse secrets.yaml (looked at: {secrets_path or 'ENV var GARMIN_SECRETS not set'})")
+        sys.exit("Exiting: secrets.yaml not found or invalid.")
+    if ("email" not in secrets) or ("password" not in secrets):
+        logger.error("Missing 'email' or 'password' in secrets.yaml")
+        sys.exit("Exiting: 'email' or 'password' not found.")
+
+    return Client(secrets['email'], secrets['password'], cassette=cassette)
+
+def syncJournalPath(source_path: str) -> str:
+    return os.path.splitext(os.path.basename(source_path))[0] + SYNC_JOURNAL_SUFFIX
+
+def openSyncJournal(source_path: str, resume: bool = False, path: Optional[str] = None) -> Journal:
+    """Journal for syncing `source_path`: continue the unfinished one on resume, else start fresh."""
+    path = path or syncJournalPath(source_path)
+    source = os.path.abspath(source_path)
+    if os.path.exists(path) and not resume:
+        logger.warning(f"Discarding journal of an unfinished sync '{path}' (use --resume to continue it)")
+        os.remove(path)
+
+    journal = Journal(path)
+    run = journal.get(RUN_OP, "source")
+    if run is None:
+        if resume:
+            logger.info(f"No unfinished sync journal '{path}', starting from the beginning")
+        journal.record(RUN_OP, "source", path=source)
+    elif run.get('path') != source:
+        logger.error(f"Journal '{path}' belongs to '{run.get('path')}', not '{source}'")
+        sys.exit("Exiting: sync journal does not match this plan")
+    else:
+        logger.info(f"Resuming sync, {len(journal) - 1} operations already done")
+    return journal
+
+def pushBundle(bundle: PlanBundle, conn: Client, journal: Optional[Journal] = None):
+    uploadWorkouts(profiledIter("load", bundle.workouts()), bundle.deleteSameName, conn, journal)
+    with phase("schedule"):
+        scheduleEntries(bundle.schedule(), conn, journal, bundle.removeStaleSchedule)
+
+def pushPlan(bundle_path: str, resume: bool = False, cassette: Optional[Cassette] = None):
+    current_dir, project_root, file_path, secrets_path = _resolve_paths(bundle_path)
+    if not os.path.exists(file_path):
+        logger.error(f"The bundle '{file_path}' does not exist.")
+        sys.exit("Exited program due to bundle file not found")
+
+    with PlanBundle(file_path) as bundle:
+        with phase("login"):
+            garminCon = _connect(secrets_path, cassette)
+        journal = openSyncJournal(file_path, resume)
+        with journal:
+            pushBundle(bundle, garminCon, journal)
+        journal.discard()
+
+    logger.info(f"Finished pushing bundle '{file_path}'")
+
+def addPushArguments(parser: argparse.ArgumentParser):
+    parser.add_argument('bundle', type=str, help='Bundle file produced by `compile`')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted push from its journal')
+    _addCassetteArguments(parser)
+    _addProfileArguments(parser)
+
+def runPush(args):
+    _profiled(args, lambda: pushPlan(args.bundle, resume=args.resume, cassette=_cassetteFromArgs(args)))
+
+def pushMain(argv: Optional[list] = None):
+    """`garmin_planner push ...` without importing the compiler (see __main__)."""
+    argv = sys.argv[1:] if argv is None else argv
+    argparser = argparse.ArgumentParser(prog="garmin_planner push", description="Upload and schedule a compiled bundle")
+    addPushArguments(argparser)
+    runPush(argparser.parse_args(argv[1:] if argv[:1] == ["push"] else argv))
+
+
+def _addCassetteArguments(parser: argparse.ArgumentParser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', type=str, default=None, metavar='CASSETTE', help='Record every Garmin call to a cassette file')
+    group.add_argument('--replay', type=str, default=None, metavar='CASSETTE', help='Answer Garmin calls from a recorded cassette (offline)')
+    parser.add_argument('--realtime', action='store_true', help='When replaying, wait the recorded latency of each call')
+
+def _cassetteFromArgs(args) -> Optional[Cassette]:
+    if args.record:
+        return Cassette(args.record, RECORD)
+    if args.replay:
+        if not os.path.exists(args.replay):
+            sys.exit(f"Exiting: cassette '{args.replay}' not found")
+        return Cassette(args.replay, REPLAY, realtime=args.realtime)
+    return None
+
+def _addProfileArguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--profile', action='store_true', help='Time each phase and count Garmin calls per phase')
+    parser.add_argument('--profile-output', type=str, default=PROFILE_OUTPUT, metavar='JSON', help=f'Profile JSON file (default: {PROFILE_OUTPUT})')
+    parser.add_argument('--profile-cpu', action='store_true', help='With --profile, also cProfile each phase into <JSON name>.<phase>.prof')
+    parser.add_argument('--profile-memory', action='store_true', help='With --profile, also track peak memory per phase')
+
+def _profiled(args, run):
+    """Run `run()`, under a phase Profiler when --profile was given."""
+    if not getattr(args, 'profile', None):
+        return run()
+    profiler = Profiler(cpu=args.profile_cpu, memory=args.profile_memory).start()
+    try:
+        return run()
+    finally:
+        profiler.stop()
+        print(profiler.summaryTable())
+        profiler.writeJson(args.profile_output)
+        logger.info(f"Wrote phase profile to '{args.profile_output}'")
+        for path in profiler.dumpProfiles(os.path.splitext(args.profile_output)[0]):
+            logger.info(f"Wrote cProfile stats to '{path}'")
@@ -0,0 +1,227 @@
+import argparse
+import datetime
+import random
+import sys
+import yaml
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Synthetic plan generator for scale and stress tests.
+#
+# generatePlan builds a plan dict in the same shape as the sample YAML files
+# (settings, definitions, workouts, schedulePlan) from a seed, so the same
+# config always gives the same plan. EXERCISES holds names that reach every
+# branch of the custom exercise classification, including explicit
+# [category: ...] names, unsupported exercises and names matching no rule.
+
+EXERCISES = (
+    # explicit categories and their special cases
+    "Sled Push [category: SLED]",
+    "Heavy Sled Drag [category: SLED]",
+    "Farmer Carry [category: CARRY]",
+    "Dumbbell Push Press [category: SHOULDER_PRESS]",
+    "X Abs [category: CORE]",
+    "Hollow Body Hold [category: CORE]",
+    "Burpee [category: TOTAL_BODY]",
+    # name based rules, in the order they are checked
+    "Dumbbell Bulgarian Split Squat",
+    "Good Morning",
+    "Clean and Jerk",
+    "Wall Ball",
+    "Medicine Ball Slam",
+    "Ski Moguls",
+    "Pike Push-up",
+    "Side Plank",
+    "Burpee Broad Jump",
+    "Inverted Row",
+    "Goblet Squat",
+    "Barbell Push Press",
+    "Incline Dumbbell Bench Press",
+    "Romanian Deadlift",
+    "30-degree Lat Pull-down",
+    "Kettlebell Floor to Shelf",
+    "Kettlebell Swing",
+    "Kettlebell Halo",
+    "Hand Release Push up",
+    "Sled Push",
+    "Sled Drag",
+    "Rope Drag",
+    "Farmers Carry",
+    "Bar Hold",
+    "X-Abs",
+    "GHD Back Extension",
+    "Sandbag Carry",
+    "Prowler Push",
+    # no rule matches
+    "Tuck Jump",
+)
+
+SPORTS = ("running", "strength", "hiit")
+
+@dataclass
+class GeneratorConfig:
+    workouts: int = 10
+    stepsPerWorkout: int = 8            # YAML step entries per workout, repeats and their children included
+    repeatDepth: int = 1                # maximum nesting of repeat blocks
+    repeatProbability: float = 0.3      # chance a step opens a repeat block (while depth allows)
+    vocabulary: tuple = EXERCISES
+    sportWeights: dict = field(default_factory=lambda: {"running": 0.5, "strength": 0.3, "hiit": 0.2})
+    definitions: int = 5                # number of pace definitions
+    definitionsDensity: float = 0.3     # share of paced running steps that use a definition
+    scheduleDays: int = 0               # schedulePlan length (0: one day per workout)
+    restProbability: float = 0.15       # share of schedule days that are rest
+    startDate: datetime.date = datetime.date(2025, 1, 6)
+    seed: int = 0
+
+def _pace(rng: random.Random) -> str:
+    fast = rng.randint(200, 400)
+    slow = fast + rng.randint(10, 40)
+    return f"{fast // 60}:{fast % 60:02d}-{slow // 60}:{slow % 60:02d}"
+
+class _Generator(object):
+    def __init__(self, config: GeneratorConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.definitionNames = [f"Pace{i}" for i in range(config.definitions)]
+
+    def definitions(self) -> dict:
+        return {name: _pace(self.rng) for name in self.definitionNames}
+
+    def _target(self) -> str:
+        rng = self.rng
+        roll = rng.random()
+        if roll < 0.5:
+            if self.definitionNames and rng.random() < self.config.definitionsDensity:
+                return f" @P(${rng.choice(self.definitionNames)})"
+            return f" @P({_pace(rng)})"
+        if roll < 0.7:
+            return f" @H(z{rng.randint(1, 5)})"
+        return ""
+
+    def _runningLeaf(self) -> dict:
+        rng = self.rng
+        name = rng.choice(("run", "run", "recovery", "warmup", "cooldown"))
+        roll = rng.random()
+        if roll < 0.4:
+            detail = f"{rng.randint(1, 30)}min"
+        elif roll < 0.6:
+            detail = f"{rng.randint(2, 12) * 10}sec"
+        elif roll < 0.9:
+            detail = f"{rng.randint(1, 40) * 100}m"
+        else:
+            return {name: "lap"}
+        return {name: detail + self._target()}
+
+    def _strengthLeaf(self) -> dict:
+        rng = self.rng
+        if rng.random() < 0.2:
+            return {"rest": rng.choice(("lap", f"{rng.randint(3, 12) * 10}sec"))}
+        exercise = rng.choice(self.config.vocabulary)
+        roll = rng.random()
+        if roll < 0.5:
+            detail = f"{rng.randint(5, 20)} reps"
+        elif roll < 0.7:
+            detail = f"{rng.randint(2, 9) * 10}sec"
+        elif roll < 0.85:
+            detail = f"lap | {rng.randint(5, 20)} reps"
+        else:
+            detail = f"{rng.randint(2, 10) * 10}m"
+        return {exercise: detail}
+
+    def _steps(self, sport: str, budget: int, depth: int) -> list:
+        rng = self.rng
+        config = self.config
+        steps = []
+        while budget > 0:
+            if depth < config.repeatDepth and budget >= 3 and rng.random() < config.repeatProbability:
+                inner = rng.randint(2, min(budget - 1, 8))
+                if sport == "hiit" and depth == 0:
+                    key = f"repeatUntilTime({rng.randint(10, 40)}min)"
+                else:
+                    key = f"repeat({rng.randint(2, 10)})"
+                steps.append({key: self._steps(sport, inner, depth + 1)})
+                budget -= inner + 1
+            else:
+                steps.append(self._runningLeaf() if sport == "running" else self._strengthLeaf())
+                budget -= 1
+        return steps
+
+    def workout(self, sport: str):
+        budget = self.config.stepsPerWorkout
+        steps = []
+        if sport == "strength" and budget >= 2 and self.rng.random() < 0.5:
+            steps.append({"warmup": [{"cardio": "lap"}]})
+            budget -= 2
+        steps += self._steps(sport, budget, 0)
+        if sport == "running":
+            return steps
+        return {"sport": sport, "steps": steps}
+
+    def plan(self) -> dict:
+        config = self.config
+        sports = list(config.sportWeights)
+        weights = [config.sportWeights[s] for s in sports]
+        plan = {
+            "settings": {"deleteSameNameWorkout": False},
+            "definitions": self.definitions(),
+            "workouts": {},
+        }
+        for i in range(config.workouts):
+            sport = self.rng.choices(sports, weights)[0]
+            plan["workouts"][f"{sport}_{i:05d}"] = self.workout(sport)
+
+        names = list(plan["workouts"])
+        days = config.scheduleDays or len(names)
+        if names and days:
+            schedule = [
+                "rest" if self.rng.random() < config.restProbability else names[day % len(names)]
+                for day in range(days)
+            ]
+            plan["schedulePlan"] = {"start_from": config.startDate.isoformat(), "workouts": schedule}
+        return plan
+
+def generatePlan(config: Optional[GeneratorConfig] = None) -> dict:
+    return _Generator(config or GeneratorConfig()).plan()
+
+def writePlan(path: str, config: Optional[GeneratorConfig] = None) -> dict:
+    plan = generatePlan(config)
+    with open(path, "w") as f:
+        yaml.safe_dump(plan, f, sort_keys=False, allow_unicode=True)
+    return plan
+
+def main(argv: Optional[list] = None):
+    defaults = GeneratorConfig()
+    argparser = argparse.ArgumentParser(description="Generate a synthetic Garmin Planner plan YAML")
+    argparser.add_argument('-o', '--output', type=str, required=True, help='Plan YAML to write')
+    argparser.add_argument('--workouts', type=int, default=defaults.workouts)
+    argparser.add_argument('--steps', type=int, default=defaults.stepsPerWorkout, help='Steps per workout')
+    argparser.add_argument('--depth', type=int, default=defaults.repeatDepth, help='Maximum repeat nesting')
+    argparser.add_argument('--repeat-probability', type=float, default=defaults.repeatProbability)
+    argparser.add_argument('--definitions', type=int, default=defaults.definitions)
+    argparser.add_argument('--definitions-density', type=float, default=defaults.definitionsDensity)
+    argparser.add_argument('--schedule-days', type=int, default=defaults.scheduleDays)
+    argparser.add_argument('--sports', type=str, default=None, help='Weights, e.g. running=0.5,strength=0.3,hiit=0.2')
+    argparser.add_argument('--seed', type=int, default=defaults.seed)
+    args = argparser.parse_args(argv)
+
+    config = GeneratorConfig(
+        workouts=args.workouts,
+        stepsPerWorkout=args.steps,
+        repeatDepth=args.depth,
+        repeatProbability=args.repeat_probability,
+        definitions=args.definitions,
+        definitionsDensity=args.definitions_density,
+        scheduleDays=args.schedule_days,
+        seed=args.seed,
+    )
+    if args.sports:
+        config.sportWeights = {k: float(v) for k, v in (pair.split("=") for pair in args.sports.split(","))}
+        unknown = set(config.sportWeights) - set(SPORTS)
+        if unknown:
+            sys.exit(f"Unknown sports: {', '.join(sorted(unknown))}")
+
+    plan = writePlan(args.output, config)
+    print(f"Wrote {len(plan['workouts'])} workouts to {args.output}")
+
+if __name__ == "__main__":
+    main()
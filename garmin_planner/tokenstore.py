@@ -0,0 +1,106 @@
+import contextlib
+import hashlib
+import os
+import tempfile
+from garth.exc import GarthException
+from garmin_planner.__init__ import logger
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+# Per-account Garmin tokens shared by every process on the machine.
+#
+# Each account has one token file (garth's dumps() format) and one lock file
+# under the store directory, both named by a hash of the email. Logins and
+# token refreshes take an exclusive flock on the account's lock file and
+# re-read the token file once they hold it, so when many workers start at
+# once only the first one talks to Garmin SSO and the rest pick up its token.
+# Token files are written to a temp file and renamed into place, so readers
+# never see a partial token and don't need the lock.
+
+class TokenStore(object):
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _key(self, email: str) -> str:
+        return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()[:32]
+
+    def tokenPath(self, email: str) -> str:
+        return os.path.join(self.directory, f"{self._key(email)}.token")
+
+    def _lockPath(self, email: str) -> str:
+        return os.path.join(self.directory, f"{self._key(email)}.lock")
+
+    @contextlib.contextmanager
+    def lock(self, email: str):
+        """Hold the account's cross-process lock (exclusive flock)."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        with open(self._lockPath(email), "a") as lockFile:
+            if fcntl is not None:
+                fcntl.flock(lockFile.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lockFile.fileno(), fcntl.LOCK_UN)
+
+    def read(self, email: str) -> Optional[str]:
+        try:
+            with open(self.tokenPath(email)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def write(self, email: str, token: str):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        # mkstemp creates the file 0600, tokens are credentials
+        fd, tmpPath = tempfile.mkstemp(dir=self.directory, prefix=".token-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(token)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmpPath, self.tokenPath(email))
+        except BaseException:
+            if os.path.exists(tmpPath):
+                os.unlink(tmpPath)
+            raise
+
+    def _resume(self, garthClient, token: str) -> bool:
+        try:
+            garthClient.loads(token)
+            garthClient.username  # round-trip to check the tokens are still accepted
+            return True
+        except (GarthException, ValueError, TypeError, KeyError) as e:
+            logger.debug(f"Stored Garmin session could not be resumed: {e}")
+            return False
+
+    def login(self, garthClient, email: str, password: str):
+        """Resume the account's stored session, or log in once for all waiting processes."""
+        tried = self.read(email)
+        if tried is not None and self._resume(garthClient, tried):
+            return
+
+        with self.lock(email):
+            # Another process may have logged in while we waited for the lock
+            stored = self.read(email)
+            if stored is not None and stored != tried and self._resume(garthClient, stored):
+                return
+            logger.info("Logging in to Garmin Connect")
+            garthClient.login(email, password)
+            self.write(email, garthClient.dumps())
+
+    def refresh(self, garthClient, email: str):
+        """Refresh the OAuth2 token once for all processes sharing the account."""
+        current = garthClient.dumps()
+        with self.lock(email):
+            stored = self.read(email)
+            if stored is not None and stored != current:
+                garthClient.loads(stored)
+                if not garthClient.oauth2_token.expired:
+                    return
+            garthClient.refresh_oauth2()
+            self.write(email, garthClient.dumps())
@@ -0,0 +1,172 @@
+import bisect
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+# Request tracing for Garmin calls.
+#
+# A hook is any object with before(method, path) and after(trace); Client
+# calls them around every HTTP attempt (retries are traced separately) once
+# at least one hook is registered, and skips all of it otherwise. Hooks
+# added with addDefaultHook are given to every Client created afterwards.
+# Two sinks ship here: JsonTraceSink (one JSON line per call) and
+# HistogramSink (in-memory latency histograms per endpoint).
+
+@dataclass
+class CallTrace:
+    method: str
+    path: str
+    status: Optional[int]
+    latency: float              # seconds
+    requestBytes: int
+    responseBytes: int
+    started: float              # wall clock, seconds since the epoch
+    error: Optional[str] = None
+
+class TraceHook(object):
+    """No-op base; override what you need."""
+
+    def before(self, method: str, path: str):
+        pass
+
+    def after(self, trace: CallTrace):
+        pass
+
+_defaultHooks = []
+
+def addDefaultHook(hook):
+    _defaultHooks.append(hook)
+
+def removeDefaultHook(hook):
+    if hook in _defaultHooks:
+        _defaultHooks.remove(hook)
+
+def defaultHooks() -> list:
+    return list(_defaultHooks)
+
+def _requestBytes(kwargs: dict, response) -> int:
+    body = getattr(getattr(response, "request", None), "body", None)
+    if body is None:
+        body = kwargs.get("data")
+        if body is None and kwargs.get("json") is not None:
+            body = json.dumps(kwargs["json"])
+    if body is None:
+        return 0
+    return len(body.encode("utf-8") if isinstance(body, str) else body)
+
+def tracedCall(hooks: list, send, method: str, path: str, kwargs: dict):
+    """Run send(**kwargs) with before/after hooks, capturing the HTTP response."""
+    responses = []
+    kwargs = dict(kwargs, hooks={"response": lambda resp, *args, **kw: responses.append(resp)})
+    for hook in hooks:
+        hook.before(method, path)
+
+    started, startedClock = time.time(), time.perf_counter()
+    error = None
+    try:
+        return send(**kwargs)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        latency = time.perf_counter() - startedClock
+        response = responses[-1] if responses else None
+        if response is None and error is not None:
+            response = getattr(getattr(error, "error", error), "response", None)
+        trace = CallTrace(
+            method=method,
+            path=path,
+            status=getattr(response, "status_code", None),
+            latency=latency,
+            requestBytes=_requestBytes(kwargs, response),
+            responseBytes=len(response.content or b"") if response is not None else 0,
+            started=started,
+            error=repr(error) if error is not None else None,
+        )
+        for hook in hooks:
+            hook.after(trace)
+
+class JsonTraceSink(TraceHook):
+    """Appends every trace as a JSON line to `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a")
+
+    def after(self, trace: CallTrace):
+        line = json.dumps(asdict(trace)) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def endpointOf(path: str) -> str:
+    """Group paths by endpoint: numeric ids become {id}, the query string is dropped."""
+    return _ID_SEGMENT.sub("/{id}", path.split("?", 1)[0])
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Histogram(object):
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.calls = 0
+        self.errors = 0
+        self.totalLatency = 0.0
+        self.requestBytes = 0
+        self.responseBytes = 0
+
+class HistogramSink(TraceHook):
+    """In-memory latency histograms and byte totals per (method, endpoint)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def after(self, trace: CallTrace):
+        key = (trace.method.upper(), endpointOf(trace.path))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.counts[bisect.bisect_left(self.buckets, trace.latency)] += 1
+            histogram.calls += 1
+            histogram.errors += trace.error is not None
+            histogram.totalLatency += trace.latency
+            histogram.requestBytes += trace.requestBytes
+            histogram.responseBytes += trace.responseBytes
+
+    def _quantile(self, histogram: _Histogram, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf past the last bucket)."""
+        rank = q * histogram.calls
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                f"{method} {endpoint}": {
+                    "calls": h.calls,
+                    "errors": h.errors,
+                    "meanLatency": h.totalLatency / h.calls,
+                    "p50": self._quantile(h, 0.5),
+                    "p95": self._quantile(h, 0.95),
+                    "requestBytes": h.requestBytes,
+                    "responseBytes": h.responseBytes,
+                    "buckets": dict(zip([str(b) for b in self.buckets] + ["inf"], h.counts)),
+                }
+                for (method, endpoint), h in self._histograms.items()
+            }
@@ -0,0 +1,141 @@
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from requests.adapters import HTTPAdapter, Retry
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# HTTP connection pooling for Garmin Connect calls.
+#
+# garth mounts a fresh HTTPAdapter on every (re)configure, so each Client and
+# each token reload used to get its own pool. A Transport owns one adapter
+# (one urllib3 pool per host) that every Client in the process mounts, with
+# configurable pool sizes, timeouts and TCP keep-alive, and counts how many
+# requests actually reused a pooled connection.
+
+@dataclass(frozen=True)
+class TransportConfig:
+    poolConnections: int = 10       # number of per-host pools to keep
+    poolMaxSize: int = 10           # connections kept alive per host
+    poolBlock: bool = False         # at poolMaxSize, wait for a free connection instead of opening a throwaway one
+    connectTimeout: float = 10.0
+    readTimeout: float = 10.0
+    keepAlive: bool = True          # TCP keep-alive on pooled sockets
+    keepAliveIdle: int = 60         # seconds idle before the first probe
+    keepAliveInterval: int = 15
+    keepAliveCount: int = 4
+    retries: int = 3                # retries of failed connects, as garth does
+    backoffFactor: float = 0.5
+
+class TransportStats(object):
+    """Thread-safe request/connection counters for one Transport."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connectionsOpened = 0
+
+    def _countRequest(self):
+        with self._lock:
+            self.requests += 1
+
+    def _countConnection(self):
+        with self._lock:
+            self.connectionsOpened += 1
+
+    @property
+    def connectionsReused(self) -> int:
+        return max(self.requests - self.connectionsOpened, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            requests, opened = self.requests, self.connectionsOpened
+        return {
+            "requests": requests,
+            "connectionsOpened": opened,
+            "connectionsReused": max(requests - opened, 0),
+            "reuseRatio": (requests - opened) / requests if requests else 0.0,
+        }
+
+def _socketOptions(config: TransportConfig) -> list:
+    options = list(HTTPConnection.default_socket_options)
+    if config.keepAlive:
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # Fine-grained probes are platform specific (Linux names shown)
+        for name, value in (("TCP_KEEPIDLE", config.keepAliveIdle),
+                            ("TCP_KEEPINTVL", config.keepAliveInterval),
+                            ("TCP_KEEPCNT", config.keepAliveCount)):
+            if hasattr(socket, name):
+                options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+def _countingPool(base, stats: TransportStats):
+    def _new_conn(self):
+        stats._countConnection()
+        return base._new_conn(self)
+    return type(f"Counting{base.__name__}", (base,), {"_new_conn": _new_conn})
+
+class _PooledAdapter(HTTPAdapter):
+    def __init__(self, config: TransportConfig, stats: TransportStats):
+        self._config = config
+        self._stats = stats
+        super().__init__(
+            pool_connections=config.poolConnections,
+            pool_maxsize=config.poolMaxSize,
+            pool_block=config.poolBlock,
+            # only failed connects are retried here: error statuses and read
+            # failures go to Resilience, which would otherwise multiply them
+            max_retries=Retry(
+                total=config.retries,
+                connect=config.retries,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=config.backoffFactor,
+                raise_on_status=False,
+            ),
+        )
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault("socket_options", _socketOptions(self._config))
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _countingPool(HTTPConnectionPool, self._stats),
+            "https": _countingPool(HTTPSConnectionPool, self._stats),
+        }
+
+    def send(self, request, **kwargs):
+        self._stats._countRequest()
+        return super().send(request, **kwargs)
+
+class Transport(object):
+    """One shared connection pool plus its configuration and statistics."""
+
+    def __init__(self, config: Optional[TransportConfig] = None):
+        self.config = config or TransportConfig()
+        self.stats = TransportStats()
+        self.adapter = _PooledAdapter(self.config, self.stats)
+
+    @property
+    def timeout(self) -> tuple:
+        return (self.config.connectTimeout, self.config.readTimeout)
+
+    def mount(self, garthClient):
+        garthClient.sess.mount("https://", self.adapter)
+        garthClient.timeout = self.timeout
+
+    def close(self):
+        self.adapter.close()
+
+_sharedTransports = {}
+_sharedTransportsLock = threading.Lock()
+
+def sharedTransport(config: Optional[TransportConfig] = None) -> Transport:
+    """The process-wide Transport for `config`, created on first use."""
+    config = config or TransportConfig()
+    with _sharedTransportsLock:
+        transport = _sharedTransports.get(config)
+        if transport is None:
+            transport = _sharedTransports[config] = Transport(config)
+        return transport
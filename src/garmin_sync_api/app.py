@@ -11,12 +11,16 @@ from fastapi import FastAPI, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List, Dict
+import functools
 import logging
 import os
 
-from garmin_planner.client import Client
 from garmin_planner.main import importWorkouts, scheduleWorkouts, createWorkoutJson
 from garmin_planner.model.workoutModel import SportType
+from garmin_planner.client import Client
+from garmin_planner.coalesce import Coalescer
+from garmin_planner.transport import sharedTransport
+from garmin_planner.sessions import SessionCache, TokenRefresher, DEFAULT_REFRESH_MARGIN, DEFAULT_REFRESH_INTERVAL
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,8 +36,32 @@ def ensure_unofficial_enabled():
             detail="Unofficial Garmin sync is disabled in production."
         )
 
+# Concurrent identical reads share one Garmin call, results kept briefly
+readCoalescer = Coalescer(ttl=float(os.getenv("GARMIN_READ_CACHE_TTL", "0")))
+
+# One logged-in Client per account, kept fresh in the background
+sessions = SessionCache(functools.partial(Client, coalescer=readCoalescer))
+tokenRefresher = TokenRefresher(
+    sessions,
+    margin=float(os.getenv("GARMIN_TOKEN_REFRESH_MARGIN", DEFAULT_REFRESH_MARGIN)),
+    interval=float(os.getenv("GARMIN_TOKEN_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL)),
+)
+
 app = FastAPI(title="Garmin Sync API", version="0.1.0")
 
+# Endpoints that log in, call Garmin or compile are plain `def`: FastAPI runs
+# them on its threadpool, so a slow request doesn't block the event loop.
+
+
+@app.on_event("startup")
+def start_token_refresher():
+    tokenRefresher.start()
+
+
+@app.on_event("shutdown")
+def stop_token_refresher():
+    tokenRefresher.stop(timeout=5)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -80,16 +108,19 @@ async def health():
         "status": "healthy",
         "service": "garmin-sync",
         "note": "UNOFFICIAL – TEST ONLY",
-        "enabled": USE_UNOFFICIAL
+        "enabled": USE_UNOFFICIAL,
+        "transport": sharedTransport().stats.snapshot(),
+        "tokens": tokenRefresher.snapshot(),
+        "reads": readCoalescer.snapshot()
     }
 
 
 @app.post("/workouts")
-async def get_workouts(request: LoginRequest):
+def get_workouts(request: LoginRequest):
     """Get all workouts for a user."""
     ensure_unofficial_enabled()
     try:
-        client = Client(request.email, request.password)
+        client = sessions.get(request.email, request.password)
         workouts = client.getAllWorkouts()
         return {"workouts": workouts}
     except Exception as e:
@@ -98,11 +129,11 @@ async def get_workouts(request: LoginRequest):
 
 
 @app.get("/workouts/{workout_id}")
-async def get_workout(workout_id: str, email: str, password: str):
+def get_workout(workout_id: str, email: str, password: str):
     """Get a specific workout by ID."""
     ensure_unofficial_enabled()
     try:
-        client = Client(email, password)
+        client = sessions.get(email, password)
         workout = client.getWorkout(workout_id)
         return {"workout": workout}
     except Exception as e:
@@ -111,11 +142,11 @@ async def get_workout(workout_id: str, email: str, password: str):
 
 
 @app.post("/workouts/import")
-async def import_workouts(request: ImportWorkoutsRequest):
+def import_workouts(request: ImportWorkoutsRequest):
     """Import workouts to Garmin Connect."""
     ensure_unofficial_enabled()
     try:
-        client = Client(request.email, request.password)
+        client = sessions.get(request.email, request.password)
         importWorkouts(request.workouts, request.delete_same_name, client)
         return {"status": "success", "message": "Workouts imported successfully"}
     except Exception as e:
@@ -124,11 +155,11 @@ async def import_workouts(request: ImportWorkoutsRequest):
 
 
 @app.post("/workouts/schedule")
-async def schedule_workouts(request: ScheduleRequest):
+def schedule_workouts(request: ScheduleRequest):
     """Schedule workouts on Garmin Connect."""
     ensure_unofficial_enabled()
     try:
-        client = Client(request.email, request.password)
+        client = sessions.get(request.email, request.password)
         scheduleWorkouts(request.start_from, request.workouts, client)
         return {"status": "success", "message": "Workouts scheduled successfully"}
     except Exception as e:
@@ -137,7 +168,7 @@ async def schedule_workouts(request: ScheduleRequest):
 
 
 @app.post("/workouts/create")
-async def create_workout(
+def create_workout(
     name: str = Body(...),
     steps: List = Body(...),
     sport: Optional[str] = Body(None)
@@ -5,3 +5,61 @@ import sys
 # Add the parent directory to the path so we can import garmin_planner
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+
+class FakeGarminAdapter:
+    """requests adapter answering Garmin Connect calls from a routes dict.
+
+    routes maps (method, path) to (status, body); body is JSON-encoded
+    unless it is bytes. Mount it on a logged-in-looking Client with
+    `fake_client`.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        import json
+        from urllib.parse import urlsplit
+        from requests.models import Response
+
+        self.requests.append(request)
+        path = urlsplit(request.url).path
+        status, body = self.routes.get((request.method, path), (404, {"message": "not found"}))
+        response = Response()
+        response.status_code = status
+        response._content = body if isinstance(body, bytes) else (json.dumps(body).encode("utf-8") if body is not None else b"")
+        response.headers["Content-Type"] = "application/json"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_client():
+    """Build a Client with fake tokens whose HTTP calls go to a FakeGarminAdapter."""
+    from unittest.mock import patch
+    from garth.auth_tokens import OAuth1Token, OAuth2Token
+    from garmin_planner.client import Client
+    from garmin_planner.coalesce import Coalescer
+    from garmin_planner.resilience import Resilience
+    from garmin_planner.transport import Transport
+
+    def make(routes, **clientKwargs):
+        clientKwargs.setdefault("transport", Transport())
+        clientKwargs.setdefault("resilience", Resilience(sleep=lambda s: None))
+        clientKwargs.setdefault("coalescer", Coalescer())
+        with patch.object(Client, "login", return_value=True):
+            client = Client("a@example.com", "pw", **clientKwargs)
+        client.garth.oauth1_token = OAuth1Token(oauth_token="t", oauth_token_secret="s")
+        client.garth.oauth2_token = OAuth2Token(
+            scope="", jti="", token_type="Bearer", access_token="a", refresh_token="r",
+            expires_in=3600, expires_at=2 ** 40, refresh_token_expires_in=3600, refresh_token_expires_at=2 ** 40)
+        adapter = FakeGarminAdapter(routes)
+        client.garth.sess.mount("https://connectapi.", adapter)
+        return client, adapter
+
+    return make
@@ -0,0 +1,47 @@
+import pytest
+import importlib.util
+import os
+
+BENCHMARK = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "compiler.py")
+
+
+@pytest.fixture
+def bench(monkeypatch):
+    spec = importlib.util.spec_from_file_location("compiler_benchmark", BENCHMARK)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "MIN_SECONDS", 0.001)
+    return module
+
+
+class TestCompilerBenchmark:
+    """Keep the benchmark suite runnable and its regression check honest"""
+
+    def test_workload_sizes(self, bench):
+        for shape in bench.SHAPES:
+            workload = bench.Workload(shape, 1000)
+            assert 1000 <= workload.steps < 1100
+            assert len(workload.keys) == workload.steps
+
+    def test_suite_runs_every_stage(self, bench):
+        results = bench.runSuite([10], shapes=["running", "nested"])
+
+        assert {r["stage"] for r in results} == {
+            "parse_bracket", "parse_stepdetail", "replace_variables",
+            "createWorkoutStep", "createWorkoutJson", "serialize", "templateJson"}
+        assert all(r["stepsPerSecond"] > 0 and r["peakBytes"] >= 0 for r in results)
+
+    def test_regression_threshold(self, bench):
+        results = [{"stage": "serialize", "shape": "running", "size": 10, "stepsPerSecond": 70.0},
+                   {"stage": "serialize", "shape": "hiit", "size": 10, "stepsPerSecond": 80.0}]
+        baselines = {"serialize/running/10": 100.0, "serialize/hiit/10": 100.0}
+
+        regressions = bench.compareToBaseline(results, baselines, threshold=0.25)
+
+        assert [bench.resultKey(r) for r, _ in regressions] == ["serialize/running/10"]
+
+    def test_save_baselines(self, bench, tmp_path):
+        path = str(tmp_path / "baselines.json")
+        bench.saveBaselines(path, [{"stage": "s", "shape": "x", "size": 10, "stepsPerSecond": 12.34}])
+
+        assert bench.loadBaselines(path) == {"s/x/10": 12.3}
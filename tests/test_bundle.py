@@ -0,0 +1,151 @@
+import pytest
+import datetime
+import json
+from unittest.mock import MagicMock
+from garmin_planner.bundle import PlanBundle, writeBundle
+from garmin_planner.main import compilePlan, compileWorkouts, pushBundle
+
+
+PLAN_YAML = """
+settings:
+  deleteSameNameWorkout: true
+
+definitions:
+  VO2MaxP: 3:30-4:00
+
+workouts:
+  interval_vo2max:
+    - warmup: 15min @H(z2)
+    - repeat(8):
+      - run: 30sec @P($VO2MaxP)
+      - recovery: 1200m
+    - cooldown: 15min @H(z2)
+  strength_day:
+    sport: strength
+    steps:
+      - Goblet Squat: 10 reps
+      - rest: lap
+
+schedulePlan:
+  start_from: 2024-10-08
+  workouts:
+    - interval_vo2max
+    - rest
+    - strength_day
+"""
+
+
+class TestPlanBundle:
+    """Test the binary plan bundle container"""
+
+    def test_roundtrip(self, tmp_path):
+        path = str(tmp_path / "plan.gpb")
+        workouts = [("easy_run", '{"workoutName": "easy_run"}'), ("séance", b'{"workoutName": "s\\u00e9ance"}')]
+        schedule = [(datetime.date(2024, 10, 8), "easy_run"), (datetime.date(2024, 10, 9), "séance")]
+
+        writeBundle(path, workouts, schedule, deleteSameName=True)
+
+        with PlanBundle(path) as bundle:
+            assert len(bundle) == 2
+            assert bundle.deleteSameName is True
+            assert list(bundle.names()) == ["easy_run", "séance"]
+            assert list(bundle.workouts())[0] == ("easy_run", b'{"workoutName": "easy_run"}')
+            assert bundle.workout("séance") == b'{"workoutName": "s\\u00e9ance"}'
+            assert list(bundle.schedule()) == schedule
+
+    def test_empty_bundle(self, tmp_path):
+        path = str(tmp_path / "empty.gpb")
+        writeBundle(path, [])
+
+        with PlanBundle(path) as bundle:
+            assert len(bundle) == 0
+            assert bundle.deleteSameName is False
+            assert list(bundle.workouts()) == []
+            assert list(bundle.schedule()) == []
+
+    def test_rejects_non_bundle(self, tmp_path):
+        path = tmp_path / "plan.yaml"
+        path.write_text(PLAN_YAML)
+
+        with pytest.raises(ValueError):
+            PlanBundle(str(path))
+
+    def test_rejects_truncated_bundle(self, tmp_path):
+        path = tmp_path / "plan.gpb"
+        writeBundle(str(path), [("a", "{}")], [(datetime.date(2024, 1, 1), "a")])
+        path.write_bytes(path.read_bytes()[:20])
+
+        with pytest.raises(ValueError):
+            PlanBundle(str(path))
+
+
+class TestCompileAndPush:
+    """Test the offline compile stage and the bundle push stage"""
+
+    def test_compile_plan_matches_direct_compilation(self, tmp_path):
+        plan = tmp_path / "plan.yaml"
+        plan.write_text(PLAN_YAML)
+        output = str(tmp_path / "plan.gpb")
+
+        compilePlan(str(plan), output)
+
+        with PlanBundle(output) as bundle:
+            assert bundle.deleteSameName is True
+            compiled = dict(bundle.workouts())
+            assert list(compiled) == ["interval_vo2max", "strength_day"]
+            assert json.loads(compiled["strength_day"])['sportType']['sportTypeKey'] == 'strength_training'
+            assert [(d.isoformat(), n) for d, n in bundle.schedule()] == [
+                ("2024-10-08", "interval_vo2max"),
+                ("2024-10-09", "rest"),
+                ("2024-10-10", "strength_day"),
+            ]
+
+        direct = dict(compileWorkouts({"interval_vo2max": [
+            {"warmup": "15min @H(z2)"},
+            {"repeat(8)": [{"run": "30sec @P(3:30-4:00)"}, {"recovery": "1200m"}]},
+            {"cooldown": "15min @H(z2)"},
+        ]}))
+        assert compiled["interval_vo2max"] == direct["interval_vo2max"].encode("utf-8")
+
+    def test_push_bundle(self, tmp_path):
+        path = str(tmp_path / "plan.gpb")
+        writeBundle(path, [("easy_run", "{}")], [(datetime.date(2024, 10, 8), "easy_run"), (datetime.date(2024, 10, 9), "missing")], deleteSameName=True)
+
+        conn = MagicMock()
+        conn.getAllWorkouts.return_value = [{"workoutName": "easy_run", "workoutId": 42}]
+        conn.scheduleWorkout.return_value = True
+
+        with PlanBundle(path) as bundle:
+            pushBundle(bundle, conn)
+
+        conn.deleteWorkout.assert_called_once_with({"workoutName": "easy_run", "workoutId": 42})
+        conn.importWorkout.assert_called_once_with(b"{}")
+        conn.scheduleWorkout.assert_called_once_with(42, {"date": "2024-10-08"})
+
+    def test_push_plan_resolves_project_relative_path(self, tmp_path, monkeypatch):
+        import os
+        from unittest.mock import patch
+        import garmin_planner.sync as sync
+
+        path = tmp_path / "plan.gpb"
+        writeBundle(str(path), [("easy_run", "{}")])
+        elsewhere = tmp_path / "elsewhere"
+        elsewhere.mkdir()
+        monkeypatch.chdir(elsewhere)
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(sync.__file__)))
+
+        conn = MagicMock()
+        conn.importWorkout.return_value = {"workoutId": 1}
+        with patch.object(sync, "_connect", return_value=conn):
+            sync.pushPlan(os.path.relpath(path, project_root))
+
+        conn.importWorkout.assert_called_once_with(b"{}")
+
+    def test_push_does_not_import_the_compiler(self):
+        import subprocess
+        import sys
+
+        code = "import sys, garmin_planner.sync; print('garmin_planner.main' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        assert result.stdout.strip() == "False"
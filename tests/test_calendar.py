@@ -0,0 +1,106 @@
+import pytest
+import datetime
+from unittest.mock import patch
+from garmin_planner.bundle import writeBundle, PlanBundle
+from garmin_planner.main import scheduleEntries
+
+
+def item(scheduleId, date, workoutId, itemType="workout"):
+    return {"id": scheduleId, "date": date, "workoutId": workoutId, "itemType": itemType}
+
+
+class CalendarConn:
+    """Fake account with a calendar"""
+
+    def __init__(self, workouts, calendar):
+        self.workouts = workouts
+        self.calendar = calendar
+        self.scheduled = []
+        self.unscheduled = []
+
+    def getAllWorkouts(self):
+        return [{"workoutName": n, "workoutId": i} for n, i in self.workouts.items()]
+
+    def getCalendar(self, start, end):
+        return [c for c in self.calendar if start.isoformat() <= c['date'] <= end.isoformat()]
+
+    def scheduleWorkout(self, workoutId, dateJson):
+        self.scheduled.append((workoutId, dateJson['date']))
+        return True
+
+    def unscheduleWorkout(self, scheduleId):
+        self.unscheduled.append(scheduleId)
+        return True
+
+
+DAY = datetime.date(2024, 10, 8)
+ENTRIES = [(DAY, "easy"), (DAY + datetime.timedelta(days=1), "tempo"), (DAY + datetime.timedelta(days=2), "easy")]
+
+
+class TestCalendarDiff:
+    """Test scheduling only what is missing from the calendar"""
+
+    def test_rerun_makes_no_writes(self):
+        conn = CalendarConn({"easy": 1, "tempo": 2}, [
+            item(10, "2024-10-08", 1), item(11, "2024-10-09", 2), item(12, "2024-10-10", 1)])
+
+        scheduleEntries(ENTRIES, conn)
+
+        assert conn.scheduled == [] and conn.unscheduled == []
+
+    def test_only_missing_entries_are_created(self):
+        conn = CalendarConn({"easy": 1, "tempo": 2}, [item(10, "2024-10-08", 1)])
+
+        scheduleEntries(iter(ENTRIES), conn)
+
+        assert conn.scheduled == [(2, "2024-10-09"), (1, "2024-10-10")]
+
+    def test_remove_stale(self):
+        conn = CalendarConn({"easy": 1, "tempo": 2, "other": 3}, [
+            item(10, "2024-10-08", 1),
+            item(13, "2024-10-09", 1),    # easy moved away from this day
+            item(14, "2024-10-09", 3),    # not a plan workout, kept
+            item(15, "2024-11-01", 1),    # outside the plan's range, kept
+        ])
+
+        scheduleEntries(ENTRIES, conn, removeStale=True)
+
+        assert conn.unscheduled == [13]
+        assert conn.scheduled == [(2, "2024-10-09"), (1, "2024-10-10")]
+
+    def test_calendar_failure_falls_back_to_scheduling(self):
+        conn = CalendarConn({"easy": 1, "tempo": 2}, [])
+        conn.getCalendar = lambda start, end: 1 / 0
+
+        scheduleEntries(ENTRIES, conn)
+
+        assert len(conn.scheduled) == 3
+
+    def test_bundle_carries_remove_stale_flag(self, tmp_path):
+        path = str(tmp_path / "plan.gpb")
+        writeBundle(path, [], ENTRIES, removeStaleSchedule=True)
+
+        with PlanBundle(path) as bundle:
+            assert bundle.removeStaleSchedule and not bundle.deleteSameName
+
+
+class TestClientCalendar:
+    """Test fetching the calendar in monthly calls"""
+
+    def test_get_calendar(self):
+        from garmin_planner.client import Client
+        from garmin_planner.coalesce import Coalescer
+        from garmin_planner.transport import Transport
+
+        with patch.object(Client, "login", return_value=True):
+            client = Client("a@example.com", "pw", transport=Transport(), coalescer=Coalescer())
+
+        months = {
+            "/calendar-service/year/2024/month/9": [item(1, "2024-09-30", 5), item(2, "2024-10-08", 5), item(3, "2024-10-08", None, "activity")],
+            "/calendar-service/year/2024/month/10": [item(2, "2024-10-08", 5), item(4, "2024-11-20", 6), item(5, "2024-12-01", 6)],
+        }
+        with patch.object(client.garth, "connectapi", side_effect=lambda path, **kw: {"calendarItems": months[path]}) as connectapi:
+            items = client.getCalendar(datetime.date(2024, 10, 1), datetime.date(2024, 11, 30))
+
+        assert connectapi.call_count == 2
+        assert sorted(i['id'] for i in items) == [2, 4]
@@ -0,0 +1,93 @@
+import pytest
+import datetime
+import json
+from garth.exc import GarthHTTPError
+from garmin_planner.bundle import writeBundle, PlanBundle
+from garmin_planner.cassette import Cassette, CassetteMiss, RECORD, REPLAY
+from garmin_planner.client import Client
+from garmin_planner.coalesce import Coalescer
+from garmin_planner.main import pushBundle
+from garmin_planner.resilience import Resilience
+
+
+ROUTES = {
+    ("GET", "/workout-service/workouts"): (200, [{"workoutName": "easy", "workoutId": 1}]),
+    ("GET", "/calendar-service/year/2024/month/9"): (200, {"calendarItems": []}),
+    ("DELETE", "/workout-service/workout/1"): (204, None),
+    ("POST", "/workout-service/workout"): (200, {"workoutName": "easy", "workoutId": 2}),
+    ("POST", "/workout-service/schedule/1"): (200, {"workoutScheduleId": 9}),
+}
+
+
+def replay_client(cassette):
+    return Client("replay@cassette", "", cassette=cassette, coalescer=Coalescer(),
+                  resilience=Resilience(sleep=lambda s: None))
+
+
+class TestCassette:
+    """Test recording Client calls and replaying them offline"""
+
+    def test_record_then_replay_a_push(self, tmp_path, fake_client):
+        bundle_path = str(tmp_path / "plan.gpb")
+        writeBundle(bundle_path, [("easy", '{"workoutName": "easy"}')], [(datetime.date(2024, 10, 8), "easy")], deleteSameName=True)
+        path = str(tmp_path / "sync.cassette")
+
+        with Cassette(path, RECORD) as cassette:
+            client, adapter = fake_client(ROUTES, cassette=cassette)
+            with PlanBundle(bundle_path) as bundle:
+                pushBundle(bundle, client)
+        recorded = [json.loads(line) for line in open(path)]
+        assert [(r["method"], r["path"]) for r in recorded] == [(req.method, req.path_url.split("?")[0]) for req in adapter.requests]
+        assert all("latency" in r for r in recorded)
+        assert "Authorization" not in open(path).read()
+
+        with Cassette(path, REPLAY) as cassette:
+            client = replay_client(cassette)
+            with PlanBundle(bundle_path) as bundle:
+                pushBundle(bundle, client)
+            assert cassette.remaining() == 0
+
+    def test_replays_errors(self, tmp_path, fake_client):
+        path = str(tmp_path / "errors.cassette")
+        with Cassette(path, RECORD) as cassette:
+            client, _ = fake_client({}, cassette=cassette)
+            with pytest.raises(GarthHTTPError):
+                client.getWorkout("5")
+
+        with Cassette(path, REPLAY) as cassette:
+            with pytest.raises(GarthHTTPError) as e:
+                replay_client(cassette).getWorkout("5")
+        assert e.value.error.response.status_code == 404
+
+    def test_match_prefers_exact_request(self, tmp_path):
+        path = tmp_path / "c.cassette"
+        path.write_text("\n".join(json.dumps(i) for i in [
+            {"method": "POST", "path": "/w", "params": None, "body": "a", "status": None, "response": {"id": "a"}, "latency": 0.5},
+            {"method": "POST", "path": "/w", "params": None, "body": "b", "status": None, "response": {"id": "b"}, "latency": 0.25},
+        ]) + "\n")
+        sleeps = []
+        cassette = Cassette(str(path), REPLAY, realtime=True, sleep=sleeps.append)
+
+        assert cassette.call("POST", "/w", {"data": "b"}, None) == {"id": "b"}
+        # changed bodies fall back to the next unused call to the same endpoint
+        assert cassette.call("POST", "/w", {"data": "changed"}, None) == {"id": "a"}
+        assert sleeps == [0.25, 0.5]
+        with pytest.raises(CassetteMiss):
+            cassette.call("POST", "/w", {"data": "a"}, None)
+
+    def test_replays_long_cassette_in_recorded_order(self, tmp_path):
+        path = tmp_path / "c.cassette"
+        interactions = [{"method": "GET", "path": f"/w/{i % 3}", "params": None, "body": None,
+                         "status": None, "response": i, "latency": 0.0} for i in range(30000)]
+        path.write_text("\n".join(json.dumps(i) for i in interactions) + "\n")
+        cassette = Cassette(str(path), REPLAY)
+
+        replayed = [cassette.call("GET", f"/w/{i % 3}", {}, None) for i in reversed(range(30000))]
+
+        assert sorted(replayed) == list(range(30000))
+        assert replayed[:3] == [2, 1, 0]
+        assert cassette.remaining() == 0
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            Cassette(str(tmp_path / "c"), "rewind")
@@ -0,0 +1,172 @@
+import pytest
+import threading
+import time
+from unittest.mock import patch
+from garmin_planner.coalesce import Coalescer
+
+
+class SlowRead:
+    """A read that blocks until released, counting executions"""
+
+    def __init__(self, result=None, error=None):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = 0
+        self.result = result if result is not None else {"workouts": [1, 2]}
+        self.error = error
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(2)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_concurrently(coalescer, key, read, n):
+    results, errors = [None] * n, [None] * n
+
+    def worker(i):
+        try:
+            results[i] = coalescer.do(key, read)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    threads[0].start()
+    read.started.wait(2)
+    for t in threads[1:]:
+        t.start()
+    # followers register before the leader finishes
+    while coalescer.snapshot()["requests"] < n:
+        time.sleep(0.001)
+    read.release.set()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+class TestCoalescer:
+    """Test single-flight reads"""
+
+    def test_concurrent_reads_share_one_call(self):
+        coalescer = Coalescer()
+        read = SlowRead()
+
+        results, errors = run_concurrently(coalescer, ("a", "getAllWorkouts"), read, 8)
+
+        assert read.calls == 1
+        assert results == [{"workouts": [1, 2]}] * 8
+        assert errors == [None] * 8
+        # every caller gets its own copy
+        assert len({id(r) for r in results} | {id(read.result)}) == 9
+        stats = coalescer.snapshot()
+        assert stats["executed"] == 1 and stats["coalesced"] == 7
+        assert stats["coalescingRatio"] == pytest.approx(7 / 8)
+
+    def test_errors_reach_every_waiter(self):
+        coalescer = Coalescer()
+        read = SlowRead(error=RuntimeError("503"))
+
+        _, errors = run_concurrently(coalescer, ("a", "getWorkout", "1"), read, 4)
+
+        assert read.calls == 1
+        assert all(isinstance(e, RuntimeError) for e in errors)
+        # failures are not cached
+        assert coalescer.do(("a", "getWorkout", "1"), lambda: {"ok": True}) == {"ok": True}
+
+    def test_only_shared_results_are_copied(self):
+        result = {"workouts": [1, 2]}
+
+        # a lone, uncached leader gets the result itself
+        assert Coalescer().do(("a", "x"), lambda: result) is result
+
+        cached = Coalescer(ttl=60)
+        first = cached.do(("a", "x"), lambda: result)
+        assert first is not result
+        first["workouts"].append(3)
+        assert cached.do(("a", "x"), lambda: None) == {"workouts": [1, 2]}
+
+    def test_sequential_reads_without_ttl_are_not_cached(self):
+        coalescer = Coalescer()
+        calls = []
+
+        coalescer.do(("a", "x"), lambda: calls.append(1))
+        coalescer.do(("a", "x"), lambda: calls.append(1))
+
+        assert len(calls) == 2
+
+    def test_ttl_cache_and_invalidate(self):
+        now = [0.0]
+        coalescer = Coalescer(ttl=5, clock=lambda: now[0])
+        calls = []
+
+        def read():
+            calls.append(1)
+            return len(calls)
+
+        assert coalescer.do(("a", "x"), read) == 1
+        assert coalescer.do(("a", "x"), read) == 1
+        now[0] = 6
+        assert coalescer.do(("a", "x"), read) == 2
+        coalescer.invalidate("a")
+        assert coalescer.do(("a", "x"), read) == 3
+        assert coalescer.snapshot()["cacheHits"] == 1
+
+    def test_read_in_flight_during_write_is_not_reused(self):
+        coalescer = Coalescer(ttl=60)
+        stale = SlowRead(result={"workouts": ["old"]})
+        leader = threading.Thread(target=coalescer.do, args=(("a", "x"), stale))
+        leader.start()
+        stale.started.wait(2)
+
+        coalescer.invalidate("a")
+        # a caller arriving after the write starts its own read
+        assert coalescer.do(("a", "x"), lambda: {"workouts": ["new"]}) == {"workouts": ["new"]}
+        stale.release.set()
+        leader.join()
+
+        # and the stale result finishing late is not cached
+        assert coalescer.do(("a", "x"), lambda: {"workouts": ["newer"]}) == {"workouts": ["new"]}
+        assert coalescer.snapshot()["cacheHits"] == 1
+
+    def test_invalidate_leaves_other_accounts_flights(self):
+        coalescer = Coalescer()
+        read = SlowRead()
+        leader = threading.Thread(target=coalescer.do, args=(("b", "x"), read))
+        leader.start()
+        read.started.wait(2)
+
+        coalescer.invalidate("a")
+        follower = threading.Thread(target=coalescer.do, args=(("b", "x"), read))
+        follower.start()
+        while coalescer.snapshot()["requests"] < 2:
+            time.sleep(0.001)
+        read.release.set()
+        leader.join()
+        follower.join()
+
+        assert read.calls == 1
+
+
+class TestClientCoalescing:
+    """Test that Client reads coalesce and writes invalidate"""
+
+    def make_client(self, coalescer):
+        from garmin_planner.client import Client
+        from garmin_planner.transport import Transport
+
+        with patch.object(Client, "login", return_value=True):
+            return Client("a@example.com", "pw", transport=Transport(), coalescer=coalescer)
+
+    def test_reads_cached_until_write(self):
+        client = self.make_client(Coalescer(ttl=60))
+
+        with patch.object(client.garth, "connectapi", return_value={"workoutId": 1, "workoutName": "x"}) as connectapi:
+            client.getWorkout(1)
+            client.getWorkout("1")
+            assert connectapi.call_count == 1
+            client.deleteWorkout({"workoutId": 1, "workoutName": "x"})
+            client.getWorkout("1")
+            assert connectapi.call_count == 3
@@ -0,0 +1,138 @@
+import pytest
+import datetime
+import json
+from garmin_planner.main import createWorkoutModel, createWorkoutList, compileEstimatedWorkouts
+from garmin_planner.estimator import estimatePlan, estimateWorkouts, weeklyTotals
+from garmin_planner.constant import SportType, PACE_CONST
+
+
+INTERVALS = [
+    {"warmup": "15min @H(z2)"},
+    {"repeat(8)": [
+        {"run": "30sec @P(3:30-4:00)"},
+        {"recovery": "1200m"}
+    ]},
+    {"cooldown": "15min @H(z2)"}
+]
+
+
+def steps_of(steps, sport_type=None):
+    return createWorkoutList(steps, [0], sport_type=sport_type)
+
+
+class TestEstimateWorkouts:
+    """Test the batched duration/distance estimator"""
+
+    def test_time_distance_and_repeats(self):
+        durations, distances = estimateWorkouts([steps_of(INTERVALS)])
+
+        speed = (PACE_CONST / 3.5 + PACE_CONST / 4.0) / 2
+        # recovery has no pace target, so it adds distance but no known duration
+        assert durations[0] == pytest.approx(900 + 8 * 30 + 900)
+        assert distances[0] == pytest.approx(8 * (30 * speed + 1200))
+
+    def test_default_speed_fills_untargeted_steps(self):
+        durations, distances = estimateWorkouts([steps_of(INTERVALS)], defaultSpeed=2.5)
+
+        speed = (PACE_CONST / 3.5 + PACE_CONST / 4.0) / 2
+        assert durations[0] == pytest.approx(1800 + 8 * (30 + 1200 / 2.5))
+        assert distances[0] == pytest.approx(1800 * 2.5 + 8 * (30 * speed + 1200))
+
+    def test_reps_and_lap_steps(self):
+        steps = steps_of([{"Goblet Squat": "10 reps"}, {"rest": "lap"}])
+
+        assert estimateWorkouts([steps])[0][0] == 0
+        durations, distances = estimateWorkouts([steps], secondsPerRep=3, lapButtonSeconds=60)
+        assert durations[0] == pytest.approx(90)
+        assert distances[0] == 0
+
+    def test_repeat_until_time_is_capped(self):
+        steps = steps_of([{"repeatUntilTime(600)": [{"run": "200m @P(5:00-5:00)"}]}])
+
+        durations, distances = estimateWorkouts([steps])
+
+        # 200m at 5:00/km takes 60s, so 10 rounds fit in the 600s cap
+        assert durations[0] == pytest.approx(600)
+        assert distances[0] == pytest.approx(2000, rel=1e-4)
+
+    def test_nested_caps_and_iterations(self):
+        steps = steps_of([
+            {"repeat(2)": [
+                {"repeatUntilTime(300)": [{"run": "200m @P(5:00-5:00)"}]}
+            ]},
+            {"repeatUntilTime(1200)": [
+                {"repeatUntilTime(300)": [{"run": "100m @P(5:00-5:00)"}]},
+                {"recovery": "60sec"}
+            ]}
+        ])
+
+        durations, distances = estimateWorkouts([steps])
+
+        # second block: a round is 300s (1000m) + 60s, so 1200 / 360 rounds
+        assert durations[0] == pytest.approx(600 + 1200)
+        assert distances[0] == pytest.approx(2000 + 1000 * 1200 / 360, rel=1e-4)
+
+    def test_many_workouts_in_one_batch(self):
+        single = estimateWorkouts([steps_of(INTERVALS)])
+        durations, distances = estimateWorkouts([steps_of(INTERVALS)] * 500 + [[]])
+
+        assert len(durations) == 501
+        assert durations[:500] == pytest.approx([single[0][0]] * 500)
+        assert distances[:500] == pytest.approx([single[1][0]] * 500)
+        assert durations[500] == 0
+
+
+class TestPlanEstimate:
+    """Test filling the model fields and weekly totals"""
+
+    def test_fills_model_fields(self):
+        models = {"intervals": createWorkoutModel("intervals", INTERVALS), "strength": createWorkoutModel("strength", [{"Goblet Squat": "10 reps"}])}
+
+        estimatePlan(models)
+
+        assert models["intervals"].estimatedDurationInSecs == 2040
+        assert models["intervals"].estimatedDistanceInMeters > 9600
+        assert models["intervals"].avgTrainingSpeed == pytest.approx(
+            models["intervals"].estimatedDistanceInMeters / 2040)
+        assert models["strength"].estimatedDurationInSecs is None
+        assert models["strength"].estimatedDistanceInMeters is None
+
+    def test_weekly_totals(self):
+        names = ["a", "b"]
+        schedule = [
+            (datetime.date(2024, 10, 6), "a"),   # Sunday
+            (datetime.date(2024, 10, 7), "a"),   # Monday, next week
+            (datetime.date(2024, 10, 8), "rest"),
+            (datetime.date(2024, 10, 9), "b"),
+            (datetime.date(2024, 10, 28), "b"),
+        ]
+        import numpy as np
+
+        weekly = weeklyTotals(names, np.array([100.0, 50.0]), np.array([1000.0, 0.0]), schedule)
+
+        assert weekly == {
+            datetime.date(2024, 9, 30): (100.0, 1000.0),
+            datetime.date(2024, 10, 7): (150.0, 1000.0),
+            datetime.date(2024, 10, 28): (50.0, 0.0),
+        }
+
+    def test_compile_estimated_workouts(self):
+        schedule = [(datetime.date(2024, 10, 8), "intervals")]
+
+        compiled, estimate = compileEstimatedWorkouts({"intervals": INTERVALS}, schedule)
+
+        workout = json.loads(compiled[0][1])
+        assert workout['estimatedDurationInSecs'] == 2040
+        assert estimate.weekly[datetime.date(2024, 10, 7)][0] == pytest.approx(2040)
+
+    def test_compact_steps_compile_and_estimate_like_dataclasses(self):
+        from garmin_planner.estimator import estimatePlan
+        from garmin_planner.main import compileWorkoutModels, serialize
+
+        workouts = {"intervals": INTERVALS, "strength": [{"Goblet Squat": "10 reps"}, {"rest": "60s"}]}
+        compiled, estimate = compileEstimatedWorkouts(workouts)
+
+        models = dict(compileWorkoutModels(workouts))
+        expected = estimatePlan(models)
+        assert compiled == [(name, json.dumps(model, default=serialize)) for name, model in models.items()]
+        assert estimate.weekly == expected.weekly
@@ -0,0 +1,119 @@
+import pytest
+import json
+import time
+from garmin_planner.exercises import ExerciseCatalog, ExerciseMatch, defaultCatalog, normalize, trigrams
+from garmin_planner.main import _parseStepName
+
+
+SMALL = {
+    "SQUAT": ["GOBLET_SQUAT", "JUMP_SQUAT", "BACK_SQUATS"],
+    "PLYO": ["TUCK_JUMP", "BOX_JUMP"],
+    "LUNGE": ["LUNGE", "WALKING_LUNGE"],
+    "BANDED_EXERCISES": ["LUNGE"],
+}
+
+
+@pytest.fixture
+def catalog():
+    return ExerciseCatalog(SMALL)
+
+
+class TestNormalize:
+    """Test name normalization and trigrams"""
+
+    def test_normalize(self):
+        assert normalize("30-degree Lat Pull-down") == "30 degree lat pull down"
+        assert normalize("_30_DEGREE_LAT_PULLDOWN") == "30 degree lat pulldown"
+
+    def test_trigrams(self):
+        assert trigrams("ab") == {"  a", " ab", "ab "}
+
+
+class TestExerciseCatalog:
+    """Test catalog lookups and fuzzy resolution"""
+
+    def test_contains(self, catalog):
+        assert len(catalog) == 8
+        assert catalog.contains("SQUAT", "GOBLET_SQUAT")
+        assert not catalog.contains("PLYO", "GOBLET_SQUAT")
+        assert catalog.categories() == ["BANDED_EXERCISES", "LUNGE", "PLYO", "SQUAT"]
+
+    def test_resolve_global(self, catalog):
+        match = catalog.resolve("Tuck Jumps")
+        assert (match.category, match.exerciseName) == ("PLYO", "TUCK_JUMP")
+        assert 0.5 < match.score < 1
+
+    def test_resolve_within_category(self, catalog):
+        assert catalog.resolve("Jump", "SQUAT").exerciseName == "JUMP_SQUAT"
+        assert catalog.resolve("Goblet Squat", "SQUAT").score == 1.0
+
+    def test_equipment_category_needs_equipment_word(self, catalog):
+        assert catalog.resolve("Lunges").category == "LUNGE"
+        assert catalog.resolve("Lunge", "BANDED_EXERCISES").category == "BANDED_EXERCISES"
+
+    def test_threshold(self, catalog):
+        assert catalog.resolve("Tuck Jumps", threshold=0.99) is None
+        assert catalog.resolve("zzz") is None
+        assert catalog.resolve("") is None
+        assert catalog.resolve("Lunge", "UNKNOWN") is None
+
+    def test_memoized(self, catalog):
+        first = catalog.resolve("Box Jumps")
+        assert catalog.resolve("box-jumps") is first
+        assert catalog._memo[("box jumps", None)] is first
+
+    def test_memo_is_bounded(self, catalog, monkeypatch):
+        monkeypatch.setattr("garmin_planner.exercises._MEMO_SIZE", 3)
+        for i in range(10):
+            catalog.resolve(f"jump {i}")
+        assert len(catalog._memo) <= 3
+
+    def test_ties_go_to_shorter_then_earlier_entries(self):
+        catalog = ExerciseCatalog({"A": ["ROW_X", "ROW_Y", "ROW"], "B": ["ROW"]})
+        assert catalog.resolve("row") == ExerciseMatch("A", "ROW", 1.0)
+        assert ExerciseCatalog({"A": ["ROW_Y", "ROW_X"]}).resolve("row z").exerciseName == "ROW_Y"
+
+    def test_load(self, tmp_path):
+        path = tmp_path / "catalog.json"
+        path.write_text(json.dumps(SMALL))
+        assert ExerciseCatalog.load(str(path)).resolve("Box Jump") == ExerciseMatch("PLYO", "BOX_JUMP", 1.0)
+
+
+class TestDefaultCatalog:
+    """Test the bundled Garmin exercise catalog"""
+
+    def test_known_names(self):
+        catalog = defaultCatalog()
+        assert catalog is defaultCatalog()
+        assert len(catalog) > 1000
+        assert catalog.contains("SQUAT", "GOBLET_SQUAT")
+        assert catalog.contains("PULL_UP", "_30_DEGREE_LAT_PULLDOWN")
+
+    def test_many_distinct_names_quickly(self):
+        catalog = ExerciseCatalog.load()
+        names = [f"{word} {i}" for i in range(2000) for word in ("curl", "squat")]
+        start = time.perf_counter()
+        for name in names:
+            catalog.resolve(name)
+        assert time.perf_counter() - start < 1
+
+
+class TestParseStepName:
+    """Test catalog fallback in step classification"""
+
+    @pytest.mark.parametrize("name, category, exerciseName", [
+        ("Tuck Jump", "PLYO", "TUCK_JUMP"),
+        ("Russian Twist", "CORE", "RUSSIAN_TWIST"),
+        ("Walking Lunges", "LUNGE", "WALKING_LUNGE"),
+        ("Chin ups", "PULL_UP", "CHIN_UP"),
+    ])
+    def test_unknown_names_resolve(self, name, category, exerciseName):
+        assert _parseStepName(name)[2:] == (category, exerciseName)
+
+    def test_valid_guess_kept(self):
+        # valid guesses stay None here, _finalizeStep builds them from the name
+        assert _parseStepName("goblet squat")[2:] == ("SQUAT", None)
+
+    def test_invalid_guess_replaced(self):
+        assert _parseStepName("jump squats")[2:] == ("SQUAT", "JUMP_SQUAT")
+        assert _parseStepName("Good Mornings")[3] == "GOOD_MORNING"
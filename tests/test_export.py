@@ -0,0 +1,127 @@
+import pytest
+import gzip
+import json
+import os
+import threading
+from unittest.mock import patch
+from garmin_planner.export import exportWorkouts, readSnapshot
+
+
+class LibraryConn:
+    """Fake account library; counts full-definition fetches"""
+
+    def __init__(self, library, fail=()):
+        self.library = library
+        self.fail = set(fail)
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def iterWorkouts(self):
+        for i, w in list(self.library.items()):
+            yield {"workoutId": i, "workoutName": w["workoutName"], "updatedDate": w["updatedDate"]}
+
+    def getWorkout(self, workoutId):
+        with self.lock:
+            self.fetched.append(workoutId)
+        if workoutId in self.fail:
+            raise RuntimeError("503")
+        return dict(self.library[workoutId], workoutId=workoutId)
+
+
+def library(n):
+    return {i: {"workoutName": f"w{i}", "updatedDate": "2024-01-01T00:00:00.0", "workoutSegments": []} for i in range(n)}
+
+
+class TestExport:
+    """Test the compressed, incremental library snapshot"""
+
+    def test_full_export(self, tmp_path):
+        path = str(tmp_path / "lib.jsonl.gz")
+        conn = LibraryConn(library(20))
+
+        result = exportWorkouts(conn, path, concurrency=5)
+
+        assert (result.total, result.fetched, result.reused) == (20, 20, 0)
+        records = list(readSnapshot(path))
+        assert sorted(r["workoutId"] for r in records) == list(range(20))
+        assert records[0]["workout"]["workoutName"] == f"w{records[0]['workoutId']}"
+        with open(path, "rb") as f:
+            assert f.read(2) == b"\x1f\x8b"
+
+    def test_incremental_export_refetches_changed_only(self, tmp_path):
+        path = str(tmp_path / "lib.jsonl.gz")
+        lib = library(10)
+        exportWorkouts(LibraryConn(lib), path)
+
+        lib[3]["updatedDate"] = "2024-02-01T00:00:00.0"
+        lib[10] = {"workoutName": "new", "updatedDate": "2024-02-01T00:00:00.0"}
+        del lib[0]
+        conn = LibraryConn(lib)
+        result = exportWorkouts(conn, path)
+
+        assert sorted(conn.fetched) == [3, 10]
+        assert (result.fetched, result.reused) == (2, 8)
+        records = {r["workoutId"]: r for r in readSnapshot(path)}
+        assert sorted(records) == list(range(1, 11))
+        assert records[3]["updatedDate"] == "2024-02-01T00:00:00.0"
+
+    def test_failed_fetch_keeps_previous_copy(self, tmp_path):
+        path = str(tmp_path / "lib.jsonl.gz")
+        lib = library(3)
+        exportWorkouts(LibraryConn(lib), path)
+
+        lib[1]["updatedDate"] = "2024-02-01T00:00:00.0"
+        result = exportWorkouts(LibraryConn(lib, fail={1}), path)
+
+        assert result.failed == 1
+        records = {r["workoutId"]: r for r in readSnapshot(path)}
+        assert records[1]["updatedDate"] == "2024-01-01T00:00:00.0"
+
+    def test_unreadable_previous_snapshot_is_ignored(self, tmp_path):
+        path = tmp_path / "lib.jsonl.gz"
+        path.write_bytes(b"not gzip")
+
+        result = exportWorkouts(LibraryConn(library(2)), str(path))
+
+        assert result.fetched == 2
+
+    def test_export_pages_past_the_first_page(self, tmp_path):
+        from garmin_planner.client import Client, WORKOUTS_PAGE_SIZE
+        from garmin_planner.coalesce import Coalescer
+        from garmin_planner.transport import Transport
+
+        remote = [{"workoutId": i, "workoutName": f"w{i}", "updatedDate": "2024-01-01T00:00:00.0"}
+                  for i in range(WORKOUTS_PAGE_SIZE + 5)]
+
+        def connectapi(path, method="GET", params=None, **kwargs):
+            if params is None:
+                return {"workoutId": int(path.rsplit("/", 1)[1])}
+            return remote[params["start"] - 1:params["start"] - 1 + params["limit"]]
+
+        with patch.object(Client, "login", return_value=True):
+            client = Client("a@example.com", "pw", transport=Transport(), coalescer=Coalescer())
+        path = str(tmp_path / "lib.jsonl.gz")
+        # an earlier snapshot holds all but the last few, so only those are fetched
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for summary in remote[:-3]:
+                f.write(json.dumps({"workoutId": summary["workoutId"], "updatedDate": summary["updatedDate"], "workout": {}}) + "\n")
+        with patch.object(client.garth, "connectapi", side_effect=connectapi):
+            result = exportWorkouts(client, path)
+
+        assert (result.total, result.reused, result.fetched) == (len(remote), len(remote) - 3, 3)
+        assert len(list(readSnapshot(path))) == len(remote)
+
+    def test_snapshot_keeps_the_replaced_file_mode(self, tmp_path):
+        path = tmp_path / "lib.jsonl.gz"
+        exportWorkouts(LibraryConn(library(2)), str(path))
+        os.chmod(path, 0o640)
+
+        exportWorkouts(LibraryConn(library(3)), str(path))
+
+        assert os.stat(path).st_mode & 0o777 == 0o640
+
+    def test_new_snapshot_mode(self, tmp_path):
+        path = tmp_path / "lib.jsonl.gz"
+        exportWorkouts(LibraryConn(library(1)), str(path))
+
+        assert os.stat(path).st_mode & 0o777 == 0o644
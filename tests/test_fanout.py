@@ -0,0 +1,167 @@
+import pytest
+import json
+import os
+import threading
+import time
+from garmin_planner.fanout import (Account, AccountsError, fanOut, parseAccounts, loadAccounts, rateLimit,
+                                   accountFileLabel)
+from garmin_planner.journal import Journal
+from garmin_planner.main import fanoutPlan, accountJournalPath
+from garmin_planner.resilience import ResilienceConfig
+from tests.test_sync_journal import FlakyConn
+
+
+ACCOUNTS = [Account("a@x.com", "pw", "alice"), Account("b@x.com", "pw", "bob"), Account("c@x.com", "pw", "carol")]
+
+
+def journals(tmp_path):
+    return lambda account: Journal(str(tmp_path / f"{account.label}.journal"))
+
+
+class TestAccounts:
+    """Test reading the accounts file"""
+
+    def test_formats(self, tmp_path):
+        path = tmp_path / "accounts.yaml"
+        path.write_text("accounts:\n  - {email: a@x.com, password: p, name: alice, rate: 2}\n  - {email: b@x.com, password: q}\n")
+        accounts = loadAccounts(str(path))
+        assert accounts == [Account("a@x.com", "p", "alice", 2.0), Account("b@x.com", "q", "b@x.com")]
+        assert parseAccounts([{"email": "a@x.com", "password": "p"}])[0].label == "a@x.com"
+        assert "p" not in repr(accounts[0])
+
+    @pytest.mark.parametrize("data", [
+        None, [], {"accounts": {}}, [{"email": "a@x.com"}], [{"email": "a@x.com", "password": "p", "rate": 0}],
+        [{"email": "a@x.com", "password": "p"}, {"email": "b@x.com", "password": "p", "name": "a@x.com"}],
+    ])
+    def test_invalid(self, data):
+        with pytest.raises(AccountsError):
+            parseAccounts(data)
+
+    def test_file_label(self):
+        assert accountFileLabel(Account("a@x.com", "p", "Team A/alice")) == "Team_A_alice"
+
+    def test_rate_limit(self):
+        assert rateLimit(None) is None
+        config = rateLimit(2.0)
+        assert (config.rate, config.burst, config.maxRate) == (2.0, 2.0, 2.0)
+        assert rateLimit(0.5).burst == 1.0
+        assert rateLimit(50.0) == ResilienceConfig(maxRate=50.0)
+
+
+class TestFanOut:
+    """Test syncing accounts concurrently and in isolation"""
+
+    def test_parallel(self, tmp_path):
+        accounts = [Account(f"{i}@x.com", "pw", f"athlete{i}") for i in range(8)]
+
+        def sync(conn, journal):
+            time.sleep(0.2)
+            journal.record("import", "w", account=conn.account)
+
+        report = fanOut(accounts, sync, journals(tmp_path), clientFor=lambda account: FakeClient(account.label))
+
+        assert report.seconds < 0.2 * len(accounts) / 2
+        assert [result.label for result in report.results] == [account.label for account in accounts]
+        assert all(result.ok and result.operations == {"import": 1} for result in report.results)
+        assert os.listdir(tmp_path) == []
+
+    def test_concurrency_limit(self, tmp_path):
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def sync(conn, journal):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        fanOut(ACCOUNTS, sync, journals(tmp_path), clientFor=lambda account: None, concurrency=2)
+        assert peak[0] == 2
+
+    def test_failures_are_isolated(self, tmp_path):
+        def clientFor(account):
+            if account.label == "alice":
+                raise Exception("Login failed")
+            return FakeClient(account.label)
+
+        def sync(conn, journal):
+            journal.record("import", "w")
+            if conn.account == "bob":
+                raise ConnectionError("network down")
+
+        report = fanOut(ACCOUNTS, sync, journals(tmp_path), clientFor=clientFor)
+
+        assert [(r.label, r.ok) for r in report.results] == [("alice", False), ("bob", False), ("carol", True)]
+        assert report.results[0].error == "Exception: Login failed"
+        assert report.results[1].operations == {"import": 1}
+        # alice never got to record anything, so there is no journal file to keep
+        assert os.listdir(tmp_path) == ["bob.journal"]
+        table = report.summaryTable()
+        assert "FAILED" in table and "1/3 accounts synced" in table
+
+
+class FakeClient:
+    def __init__(self, account):
+        self.account = account
+
+
+class PlanConn(FlakyConn):
+    """Fake account naming imported workouts after their JSON"""
+
+    def importWorkout(self, jsonData):
+        workout = super().importWorkout(jsonData)
+        self.remote[-1]["workoutName"] = json.loads(jsonData)["workoutName"]
+        return workout
+
+
+PLAN = """
+workouts:
+  easy: [{run: 5km}]
+  tempo: [{run: 8km}]
+schedulePlan:
+  start_from: 2025-01-06
+  rules:
+    - weekly: {mon: easy, thu: tempo}
+      repeat: 2
+"""
+
+
+class TestFanoutPlan:
+    """Test compiling once and pushing to every account"""
+
+    def test_same_json_everywhere(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "plan.yaml").write_text(PLAN)
+        (tmp_path / "accounts.yaml").write_text("- {email: a@x.com, password: p}\n- {email: b@x.com, password: p, name: bob}\n")
+        conns = {}
+        lock = threading.Lock()
+
+        def clientFor(account):
+            with lock:
+                return conns.setdefault(account.label, PlanConn())
+
+        report = fanoutPlan(str(tmp_path / "plan.yaml"), "accounts.yaml", clientFor=clientFor)
+
+        assert not report.failed
+        assert conns["a@x.com"].imported == conns["bob"].imported
+        assert conns["a@x.com"].imported[0] is conns["bob"].imported[0]
+        assert len(conns["bob"].scheduled) == 4
+        assert report.results[1].operations == {"import": 2, "schedule": 4}
+
+    def test_failed_account_resumes(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "plan.yaml").write_text(PLAN)
+        (tmp_path / "accounts.yaml").write_text("- {email: a@x.com, password: p, name: alice}\n")
+        conn = PlanConn(failAfter=1)
+
+        report = fanoutPlan(str(tmp_path / "plan.yaml"), "accounts.yaml", clientFor=lambda account: conn)
+        assert report.failed
+        assert os.path.exists(accountJournalPath("plan.yaml", ACCOUNTS[0]))
+
+        conn.failAfter = None
+        report = fanoutPlan(str(tmp_path / "plan.yaml"), "accounts.yaml", resume=True, clientFor=lambda account: conn)
+        assert not report.failed
+        assert len(conn.imported) == 2
+        assert report.results[0].operations == {"import": 1, "schedule": 4}
+        assert not os.path.exists(accountJournalPath("plan.yaml", ACCOUNTS[0]))
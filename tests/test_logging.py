@@ -0,0 +1,121 @@
+import pytest
+import io
+import logging
+from garmin_planner import DebugSampler, logLevel, queueLogging, _sampleEvery
+
+
+def record(level=logging.DEBUG, lineno=10, msg="event %s", args=(1,)):
+    return logging.LogRecord("garmin_planner", level, "main.py", lineno, msg, args, None)
+
+
+class TestLogLevel:
+    """Test reading the level from GARMIN_LOG_LEVEL"""
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, logging.INFO),
+        ("", logging.INFO),
+        ("debug", logging.DEBUG),
+        (" WARNING ", logging.WARNING),
+        ("5", 5),
+        ("chatty", logging.INFO),
+    ])
+    def test_levels(self, value, expected):
+        assert logLevel(value) == expected
+
+    def test_sample_every(self):
+        assert _sampleEvery(None) == 1
+        assert _sampleEvery("0") == 1
+        assert _sampleEvery("x") == 1
+        assert _sampleEvery("10") == 10
+
+
+class TestDebugSampler:
+    """Test sampling of high-volume debug events"""
+
+    def test_one_in_n_per_site(self):
+        sampler = DebugSampler(3)
+        first = [sampler.filter(record(lineno=10)) for _ in range(7)]
+        other = [sampler.filter(record(lineno=20)) for _ in range(2)]
+
+        assert first == [True, False, False, True, False, False, True]
+        assert other == [True, False]
+
+    def test_other_levels_always_pass(self):
+        sampler = DebugSampler(100)
+        assert all(sampler.filter(record(level=logging.INFO)) for _ in range(5))
+
+    def test_no_sampling_by_default(self):
+        sampler = DebugSampler()
+        assert all(sampler.filter(record()) for _ in range(5))
+
+    def test_tracked_sites_are_bounded(self):
+        sampler = DebugSampler(2, maxSites=3)
+        for lineno in range(100):
+            assert sampler.filter(record(lineno=lineno))
+
+        assert len(sampler._seen) == 3
+        # recent sites keep their count
+        assert not sampler.filter(record(lineno=99))
+
+    def test_threads_share_one_count_per_site(self):
+        import threading
+
+        sampler = DebugSampler(10)
+        passed = []
+
+        def worker():
+            passed.append(sum(sampler.filter(record()) for _ in range(1000)))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sum(passed) == 800
+
+
+class TestQueueLogging:
+    """Records are formatted and written by the listener thread"""
+
+    def test_writes_through_listener(self):
+        stream = io.StringIO()
+        handler, listener = queueLogging(stream, sampleEvery=2)
+        log = logging.getLogger("garmin_planner.test_queue")
+        log.propagate = False
+        log.setLevel(logging.DEBUG)
+        log.addHandler(handler)
+        try:
+            log.info("Imported workout %s", "easy_run")
+            for i in range(4):
+                log.debug("step %d", i)
+        finally:
+            log.removeHandler(handler)
+            listener.stop()
+
+        lines = stream.getvalue().splitlines()
+        assert lines[0].endswith("INFO - Imported workout easy_run")
+        assert [line.split(" - ")[-1] for line in lines[1:]] == ["step 0", "step 2"]
+
+    def test_disabled_debug_is_not_formatted(self):
+        class Expensive:
+            formatted = 0
+
+            def __str__(self):
+                Expensive.formatted += 1
+                return "expensive"
+
+        stream = io.StringIO()
+        handler, listener = queueLogging(stream)
+        log = logging.getLogger("garmin_planner.test_gated")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        log.addHandler(handler)
+        try:
+            log.debug("value %s", Expensive())
+        finally:
+            log.removeHandler(handler)
+            listener.stop()
+
+        assert Expensive.formatted == 0
+        assert stream.getvalue() == ""
@@ -487,3 +487,354 @@ class TestWorkoutTypeDetection:
         assert first_exercise['category'] == 'PULL_UP'
         assert first_exercise['description'] == 'Straight Arm Pull down x 10'
 
+
+
+class TestSportTypeEvidence:
+    """Test sport type detection collected while building the step tree"""
+
+    def test_detects_strength_inside_nested_repeat(self):
+        steps = [
+            {"warmup": "15min"},
+            {"repeat(2)": [
+                {"repeat(3)": [
+                    {"Goblet Squat": "10 reps"}
+                ]}
+            ]}
+        ]
+
+        workout_dict = json.loads(createWorkoutJson("nested", steps))
+
+        assert workout_dict['sportType']['sportTypeKey'] == 'strength_training'
+
+    def test_ignores_steps_inside_time_based_repeat(self):
+        steps = [
+            {"warmup": "15min"},
+            {"repeatUntilTime(35min)": [
+                {"Burpee": "20 reps"}
+            ]}
+        ]
+
+        workout_dict = json.loads(createWorkoutJson("amrap", steps))
+
+        assert workout_dict['sportType']['sportTypeKey'] == 'running'
+
+    def test_ignores_warmup_children(self):
+        steps = [
+            {"warmup": [
+                {"cardio": "lap"}
+            ]},
+            {"run": "5k"}
+        ]
+
+        workout_dict = json.loads(createWorkoutJson("run_with_cardio_warmup", steps))
+
+        assert workout_dict['sportType']['sportTypeKey'] == 'running'
+        assert workout_dict['workoutSegments'][0]['workoutSteps'][0]['category'] == 'CARDIO'
+
+    def test_same_steps_finalized_per_sport_type(self):
+        steps = [
+            {"warmup": [
+                {"run": "lap"}
+            ]},
+            {"repeat(2)": [
+                {"run": "lap"},
+                {"cardio": "lap"}
+            ]}
+        ]
+
+        running = json.loads(createWorkoutJson("w", steps, SportType.RUNNING))
+        hiit = json.loads(createWorkoutJson("w", steps, SportType.HIIT))
+
+        running_repeat = running['workoutSegments'][0]['workoutSteps'][1]['workoutSteps']
+        hiit_repeat = hiit['workoutSegments'][0]['workoutSteps'][1]['workoutSteps']
+        assert running_repeat[0]['stepType']['stepTypeKey'] == 'warmup'
+        assert running_repeat[0]['category'] is None
+        assert running_repeat[1]['category'] == 'CARDIO'
+        assert hiit_repeat[0]['stepType']['stepTypeKey'] == 'interval'
+        assert hiit_repeat[0]['category'] == 'RUN_INDOOR'
+        assert hiit_repeat[1]['category'] == 'RUN_INDOOR'
+        assert [s['stepId'] for s in hiit_repeat] == [3, 4]
+
+
+class TestWorkoutTemplates:
+    """Test parametric templates compiled once and instantiated per week"""
+
+    TEMPLATE = [
+        {"warmup": "15min @H(z2)"},
+        {"repeat($reps)": [
+            {"run": "$distance @P($pace)"},
+            {"recovery": "400m"}
+        ]},
+        {"repeat(2)": [
+            {"$exercise": "$count reps"},
+            {"rest": "lap"}
+        ]},
+        {"cooldown": "15min @H(z2)"}
+    ]
+
+    def _substituted(self, values, data=None):
+        # Reference substitution, keys included
+        data = self.TEMPLATE if data is None else data
+        if isinstance(data, str):
+            for k, v in values.items():
+                data = data.replace(f"${k}", str(v))
+            return data
+        if isinstance(data, dict):
+            return {self._substituted(values, k): self._substituted(values, v) for k, v in data.items()}
+        return [self._substituted(values, item) for item in data]
+
+    def test_instances_match_direct_compilation(self):
+        from garmin_planner.main import WorkoutTemplate, serialize
+
+        template = WorkoutTemplate("intervals", self.TEMPLATE)
+        for values in [
+            {"reps": 6, "distance": "400m", "pace": "4:00-4:10", "exercise": "Goblet Squat", "count": 10},
+            {"reps": 8, "distance": "800m", "pace": "3:50-4:00", "exercise": "Plank", "count": 12},
+        ]:
+            instance = json.dumps(template.instantiate("intervals_week", values), default=serialize)
+            assert instance == createWorkoutJson("intervals_week", self._substituted(values))
+
+    def test_parameters_can_change_sport_detection(self):
+        from garmin_planner.main import WorkoutTemplate, serialize
+
+        template = WorkoutTemplate("t", [{"warmup": "10min"}, {"$name": "$detail"}])
+
+        strength = json.loads(json.dumps(template.instantiate("a", {"name": "Goblet Squat", "detail": "10 reps"}), default=serialize))
+        running = json.loads(json.dumps(template.instantiate("b", {"name": "run", "detail": "5k"}), default=serialize))
+
+        assert strength['sportType']['sportTypeKey'] == 'strength_training'
+        assert running['sportType']['sportTypeKey'] == 'running'
+
+    @pytest.mark.parametrize("steps, values", [
+        ([{"warmup": [{"$ex": "10 reps"}]}], {"ex": "run"}),
+        ([{"cooldown": [{"$ex": "lap"}, {"run": "$d"}]}], {"ex": "cardio", "d": "5min"}),
+        ([{"warmup": [{"repeatUntilTime($rt)": [{"$ex": "lap"}]}]}], {"rt": "600", "ex": "run"}),
+        ([{"repeat(2)": [{"warmup": [{"$ex": "lap"}]}, {"run": "$d"}]}], {"ex": "cardio", "d": "400m"}),
+    ])
+    def test_step_names_nested_in_warmup_cooldown(self, steps, values):
+        from garmin_planner.main import WorkoutTemplate
+
+        template = WorkoutTemplate("t", steps)
+        instance = json.dumps(template.instantiate("t", values), default=serialize)
+
+        assert instance == createWorkoutJson("t", self._substituted(values, steps))
+        assert template.instantiateJson("t", values) == instance
+
+    def test_parameter_free_steps_are_shared(self):
+        from garmin_planner.main import WorkoutTemplate
+
+        template = WorkoutTemplate("intervals", self.TEMPLATE)
+        values = {"reps": 6, "distance": "400m", "pace": "4:00-4:10", "exercise": "Plank", "count": 10}
+
+        first = template._instantiateList(template.skeleton, {k: str(v) for k, v in values.items()}, [False])
+        second = template._instantiateList(template.skeleton, {k: str(v) for k, v in values.items()}, [False])
+
+        assert first[0] is second[0]            # warmup
+        assert first[3] is second[3]            # cooldown
+        assert first[1] is not second[1]        # repeat($reps)
+        assert first[1][0].children[1] is second[1][0].children[1]  # recovery inside it
+
+    def test_plan_instances(self):
+        from garmin_planner.main import compileWorkouts
+
+        workouts = {
+            "easy": [{"run": "5k"}],
+            "interval_week$n": {
+                "template": "intervals",
+                "instances": [
+                    {"n": 1, "reps": 6, "distance": "400m", "pace": "4:00-4:10", "exercise": "Plank", "count": 10},
+                    {"n": 2, "reps": 8, "distance": "400m", "pace": "3:55-4:05", "exercise": "Plank", "count": 12},
+                ]
+            },
+            "missing": {"template": "nope", "instances": [{}]}
+        }
+
+        compiled = dict(compileWorkouts(workouts, {"intervals": {"sport": "running", "steps": self.TEMPLATE}}))
+
+        assert list(compiled) == ["easy", "interval_week1", "interval_week2"]
+        week2 = json.loads(compiled["interval_week2"])
+        assert week2['workoutName'] == 'interval_week2'
+        assert week2['sportType']['sportTypeKey'] == 'running'
+        assert week2['workoutSegments'][0]['workoutSteps'][1]['numberOfIterations'] == 8
+
+    @pytest.mark.parametrize("stepName", ["repeatUntilTime($t)", "RepeatUntilTime ($t)", "repeat($t)"])
+    def test_parameterized_top_level_repeat(self, stepName):
+        from garmin_planner.main import compileWorkouts
+
+        workouts = {"amrap_$w": {"template": "amrap", "instances": [{"w": 1, "t": 600}, {"w": 2, "t": 3}]}}
+        templates = {"amrap": {"steps": [{stepName: [{"Burpee": "10 reps"}]}]}}
+
+        compiled = dict(compileWorkouts(workouts, templates))
+
+        for values in workouts["amrap_$w"]["instances"]:
+            steps = [{stepName.replace("$t", str(values["t"])): [{"Burpee": "10 reps"}]}]
+            assert compiled[f"amrap_{values['w']}"] == createWorkoutJson(f"amrap_{values['w']}", steps)
+
+
+class TestTemplateJson:
+    """Test workout JSON spliced from a template's rendered JSON"""
+
+    TEMPLATE = TestWorkoutTemplates.TEMPLATE
+    VALUES = [
+        {"reps": 6, "distance": "400m", "pace": "4:00-4:10", "exercise": "Goblet Squat", "count": 10},
+        {"reps": 8, "distance": "800m", "pace": "3:50-4:00", "exercise": "Plank", "count": 12},
+        {"reps": 6, "distance": "2min", "pace": "4:00-4:10", "exercise": "run", "count": 10},
+    ]
+
+    def slow(self, template, name, values):
+        return json.dumps(template.instantiate(name, values), default=serialize)
+
+    def test_matches_instantiate(self):
+        from garmin_planner.main import WorkoutTemplate
+
+        for sport in (None, SportType.RUNNING, SportType.HIIT):
+            template = WorkoutTemplate("intervals", self.TEMPLATE, sport)
+            for i, values in enumerate(self.VALUES * 2):
+                name = f"week \"{i}\" é"
+                assert template.instantiateJson(name, values) == self.slow(template, name, values)
+
+    def test_rendered_once_per_sport_type(self):
+        from garmin_planner.main import WorkoutTemplate
+
+        template = WorkoutTemplate("t", [{"warmup": "10min"}, {"$name": "$detail"}])
+        strength = {"name": "Goblet Squat", "detail": "10 reps"}
+        running = {"name": "run", "detail": "5k"}
+
+        assert template.instantiateJson("a", strength) == self.slow(template, "a", strength)
+        assert template.instantiateJson("b", running) == self.slow(template, "b", running)
+        assert set(template._rendered) == {SportType.STRENGTH, SportType.RUNNING}
+
+    def test_same_values_only_splice_the_name(self):
+        from garmin_planner.main import WorkoutTemplate
+
+        template = WorkoutTemplate("intervals", self.TEMPLATE)
+        first = template.instantiateJson("week1", self.VALUES[0])
+        rendered = template._rendered[SportType.STRENGTH]
+        texts = dict(rendered.texts)
+
+        second = template.instantiateJson("week2", dict(self.VALUES[0]))
+
+        assert second == first.replace('"week1"', '"week2"')
+        assert rendered.texts == texts
+        assert len(template._spliced) == 1
+
+    def test_slot_steps_are_memoized(self):
+        from garmin_planner.main import WorkoutTemplate
+
+        template = WorkoutTemplate("intervals", self.TEMPLATE, SportType.RUNNING)
+        template.instantiateJson("a", self.VALUES[0])
+        template.instantiateJson("b", dict(self.VALUES[0], count=11))
+
+        # only the exercise slot changed, the repeat($reps) step was serialized once
+        assert sorted(index for index, _ in template._rendered[SportType.RUNNING].texts) == [0, 1, 1]
+
+    def test_invalid_values_fail_like_instantiate(self):
+        from garmin_planner.main import WorkoutTemplate
+
+        template = WorkoutTemplate("intervals", self.TEMPLATE)
+        with pytest.raises(ValueError):
+            template.instantiate("a", {})
+        with pytest.raises(ValueError):
+            template.instantiateJson("a", {})
+        assert template.instantiateJson("b", self.VALUES[1]) == self.slow(template, "b", self.VALUES[1])
+
+    def test_compile_workouts_splices(self):
+        from garmin_planner.main import compileWorkouts, compileWorkoutModels
+
+        workouts = {"week$n": {"template": "intervals", "instances": [dict(values, n=n) for n, values in enumerate(self.VALUES)]}}
+        templates = {"intervals": {"steps": self.TEMPLATE}}
+
+        compiled = list(compileWorkouts(workouts, templates))
+
+        assert compiled == [(name, json.dumps(model, default=serialize)) for name, model in compileWorkoutModels(workouts, templates)]
+
+
+class TestSharedBlocks:
+    """Test hash-consed compilation of blocks repeated across workouts"""
+
+    BLOCK = {"repeat(3)": [
+        {"run": "400m @P(3:40-3:50)"},
+        {"recovery": "200m"},
+        {"repeat(2)": [{"run": "100m"}, {"recovery": "60s"}]}
+    ]}
+
+    @pytest.fixture(autouse=True)
+    def fresh_blocks(self):
+        from garmin_planner.main import _sharedBlock
+        _sharedBlock.cache_clear()
+        yield
+        _sharedBlock.cache_clear()
+
+    def _compileFresh(self, steps, sport_type=None):
+        from garmin_planner.main import _sharedBlock
+        _sharedBlock.cache_clear()
+        return createWorkoutJson("w", steps, sport_type)
+
+    def test_built_once_from_second_occurrence(self):
+        from garmin_planner.main import _buildStepList
+
+        nodes = [_buildStepList([json.loads(json.dumps(self.BLOCK))], [False])[0] for _ in range(3)]
+
+        assert nodes[0] is not nodes[1]
+        assert nodes[1] is nodes[2]
+        assert nodes[1][0].children[2] is nodes[2][0].children[2]
+
+    def test_renumbered_per_position(self):
+        workouts = [
+            [{"warmup": "15min"}, self.BLOCK, {"cooldown": "10min"}],
+            [{"warmup": "15min"}, {"run": "1k"}, {"run": "1k"}, self.BLOCK],
+            [self.BLOCK, self.BLOCK],
+        ]
+        for steps in workouts:
+            expected = self._compileFresh(steps)
+            createWorkoutJson("w", steps)
+            assert createWorkoutJson("w", steps) == expected
+
+        last = json.loads(createWorkoutJson("w", workouts[2]))['workoutSegments'][0]['workoutSteps']
+        assert [last[0]['stepId'], last[1]['stepId']] == [1, 7]
+        inner = last[1]['workoutSteps'][2]
+        assert [inner['stepId']] + [s['stepId'] for s in inner['workoutSteps']] == [10, 11, 12]
+        assert inner['workoutSteps'][1]['childStepId'] == 1
+
+    def test_finalized_per_sport_type(self):
+        steps = [self.BLOCK]
+        expected = {sport: self._compileFresh(steps, sport) for sport in (SportType.RUNNING, SportType.HIIT)}
+
+        for _ in range(2):
+            for sport in (SportType.RUNNING, SportType.HIIT):
+                assert createWorkoutJson("w", steps, sport) == expected[sport]
+
+    def test_occurrences_are_independent_objects(self):
+        from garmin_planner.main import createWorkoutModel
+
+        second, third = [createWorkoutModel("w", [self.BLOCK]).workoutSegments[0].workoutSteps[0] for _ in range(3)][1:]
+
+        assert third is not second
+        assert third.workoutSteps[2].workoutSteps[0] is not second.workoutSteps[2].workoutSteps[0]
+        third.workoutSteps[0].description = "changed"
+        third.numberOfIterations = 9
+        again = createWorkoutModel("w", [self.BLOCK]).workoutSegments[0].workoutSteps[0]
+        assert again.numberOfIterations == 3
+        assert again.workoutSteps[0].description == "400m"
+
+    def test_strength_evidence_of_shared_block(self):
+        block = {"repeat(2)": [{"Goblet Squat": "10 reps"}, {"rest": "60s"}]}
+        for _ in range(3):
+            workout = json.loads(createWorkoutJson("w", [{"warmup": "10min"}, block]))
+            assert workout['sportType']['sportTypeKey'] == 'strength_training'
+            amrap = json.loads(createWorkoutJson("w", [{"warmup": "10min"}, {"repeatUntilTime(20min)": [block]}]))
+            assert amrap['sportType']['sportTypeKey'] == 'running'
+
+    def test_concurrent_compiles_share_blocks_safely(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        workouts = [[{"warmup": f"{i}min"}, self.BLOCK, {"repeat(2)": [self.BLOCK, {"run": "1k"}]}] for i in range(1, 9)]
+        expected = [self._compileFresh(steps, sport) for steps in workouts for sport in (None, SportType.HIIT)]
+
+        for _ in range(5):
+            from garmin_planner.main import _sharedBlock
+            _sharedBlock.cache_clear()
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda job: createWorkoutJson("w", *job),
+                                        [(steps, sport) for steps in workouts for sport in (None, SportType.HIIT)] * 4))
+            assert results == expected * 4
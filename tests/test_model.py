@@ -219,3 +219,73 @@ class TestWorkoutModel:
         assert workout.sportType == SportType.STRENGTH
         assert workout.workoutSegments[0].workoutSteps[0].exerciseName == "GOBLET_SQUAT"
 
+
+
+class TestCompactSteps:
+    """Test the slotted, immutable step records and their dataclass view"""
+
+    def _steps(self):
+        return [
+            WorkoutStep(
+                stepId=1,
+                stepOrder=1,
+                stepType=StepType.WARMUP,
+                endCondition=ConditionType.TIME,
+                endConditionValue=900,
+                targetType=TargetType.HEART_RATE_ZONE,
+                zoneNumber=2
+            ),
+            RepeatStep(
+                stepId=2,
+                stepOrder=2,
+                numberOfIterations=3,
+                workoutSteps=[WorkoutStep(
+                    stepId=3,
+                    stepOrder=3,
+                    stepType=StepType.INTERVAL,
+                    endCondition=ConditionType.REPS,
+                    endConditionValue=10,
+                    exerciseName="GOBLET_SQUAT",
+                    category="SQUAT",
+                    childStepId=1
+                )]
+            ),
+        ]
+
+    def test_roundtrip_to_dataclasses(self):
+        from garmin_planner.model.compactModel import compactSteps, expandSteps
+
+        steps = self._steps()
+        assert expandSteps(compactSteps(steps)) == steps
+
+    def test_records_are_slotted_and_frozen(self):
+        import dataclasses
+        from garmin_planner.model.compactModel import compactSteps
+
+        compact = compactSteps(self._steps())
+
+        assert not hasattr(compact[0], '__dict__')
+        assert isinstance(compact[1].workoutSteps, tuple)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            compact[0].stepId = 5
+
+    def test_strings_are_interned(self):
+        from garmin_planner.model.compactModel import compactStep
+
+        a = compactStep(WorkoutStep(stepId=1, stepOrder=1, stepType=StepType.INTERVAL, endCondition=ConditionType.REPS,
+                                    endConditionValue=10, category="".join(["SQ", "UAT"])))
+        b = compactStep(WorkoutStep(stepId=2, stepOrder=2, stepType=StepType.INTERVAL, endCondition=ConditionType.REPS,
+                                    endConditionValue=10, category="".join(["SQU", "AT"])))
+
+        assert a.category is b.category
+
+    def test_serializes_like_dataclasses(self):
+        import json
+        from garmin_planner.main import serialize
+        from garmin_planner.model.compactModel import compactSteps
+
+        steps = self._steps()
+        segment = WorkoutSegment(segmentOrder=1, sportType=SportType.STRENGTH, workoutSteps=steps)
+        compact_segment = WorkoutSegment(segmentOrder=1, sportType=SportType.STRENGTH, workoutSteps=compactSteps(steps))
+
+        assert json.dumps(compact_segment, default=serialize) == json.dumps(segment, default=serialize)
@@ -0,0 +1,175 @@
+import pytest
+import json
+import threading
+from garmin_planner import profiling
+from garmin_planner.profiling import Profiler, phase, profiledIter, activeProfiler
+from garmin_planner.tracing import defaultHooks, CallTrace
+from garmin_planner.main import main
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+ROUTES = {
+    ("GET", "/workout-service/workout/42"): (200, {"workoutId": 42, "workoutName": "easy"}),
+    ("POST", "/workout-service/workout"): (200, {"workoutId": 43, "workoutName": "new"}),
+}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestDisabled:
+    """Without a running Profiler the phase markers are free"""
+
+    def test_phase_is_shared_noop(self):
+        assert activeProfiler() is None
+        assert phase("compile") is phase("import")
+        with phase("compile"):
+            pass
+
+    def test_iterator_untouched(self):
+        items = iter([1, 2])
+        assert profiledIter("compile", items) is items
+
+
+class TestProfiler:
+    """Test exclusive phase timing and per-phase Garmin call counts"""
+
+    def test_exclusive_nested_time(self, clock):
+        profiler = Profiler(clock=clock).start()
+        try:
+            clock.now += 1
+            with phase("import"):
+                clock.now += 2
+                with phase("compile"):
+                    clock.now += 5
+                clock.now += 3
+            with phase("compile"):
+                clock.now += 1
+        finally:
+            profiler.stop()
+
+        phases = profiler.snapshot()["phases"]
+        assert phases["import"]["seconds"] == 5
+        assert (phases["compile"]["seconds"], phases["compile"]["entries"]) == (6, 2)
+        assert phases["other"]["seconds"] == 1
+        assert list(phases) == ["import", "compile", "other"]
+        assert profiler.total == 12
+
+    def test_profiled_iter(self, clock):
+        def produce():
+            for i in range(3):
+                clock.now += 2
+                yield i
+
+        profiler = Profiler(clock=clock).start()
+        try:
+            with phase("import"):
+                for _ in profiledIter("compile", produce()):
+                    clock.now += 1
+        finally:
+            profiler.stop()
+
+        phases = profiler.snapshot()["phases"]
+        assert phases["compile"]["seconds"] == 6
+        assert phases["import"]["seconds"] == 3
+
+    def test_phase_stack_per_thread(self, clock):
+        steps = [threading.Event() for _ in range(4)]
+
+        def importer():
+            with phase("import"):
+                steps[0].set()
+                steps[1].wait()
+            steps[2].set()
+
+        def compiler():
+            steps[0].wait()
+            with phase("compile"):
+                clock.now += 4
+                steps[1].set()
+                steps[2].wait()
+                clock.now += 5
+                profiler.after(CallTrace("GET", "/", 200, 0.0, 1, 2, 0.0))
+
+        profiler = Profiler(clock=clock).start()
+        try:
+            clock.now += 1
+            threads = [threading.Thread(target=importer), threading.Thread(target=compiler)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            profiler.stop()
+
+        # import closes before compile, which a single shared stack would pop instead
+        phases = profiler.snapshot()["phases"]
+        assert phases["import"]["seconds"] == 4
+        assert (phases["compile"]["seconds"], phases["compile"]["calls"]) == (9, 1)
+        assert phases["other"]["seconds"] == 10
+        assert profiler.total == 10
+
+    def test_calls_and_bytes_per_phase(self, fake_client):
+        profiler = Profiler().start()
+        try:
+            assert profiler in defaultHooks()
+            client, _ = fake_client(ROUTES, hooks=None)
+            with phase("delete"):
+                client.getWorkout("42")
+            with phase("import"):
+                client.importWorkout('{"workoutName": "new"}')
+                client.importWorkout('{"workoutName": "new"}')
+        finally:
+            profiler.stop()
+
+        assert profiler not in defaultHooks()
+        assert activeProfiler() is None
+        phases = profiler.snapshot()["phases"]
+        assert phases["delete"]["calls"] == 1
+        assert phases["delete"]["responseBytes"] == len(json.dumps(ROUTES[("GET", "/workout-service/workout/42")][1]))
+        assert phases["import"]["calls"] == 2
+        assert phases["import"]["requestBytes"] == 2 * len('{"workoutName": "new"}')
+
+    def test_cpu_and_memory(self, tmp_path):
+        profiler = Profiler(cpu=True, memory=True).start()
+        try:
+            with phase("compile"):
+                data = [str(i) * 10 for i in range(20000)]
+        finally:
+            profiler.stop()
+
+        compiled = profiler.snapshot()["phases"]["compile"]
+        assert compiled["peakBytes"] > 100000
+        assert compiled["topFunctions"]
+        paths = profiler.dumpProfiles(str(tmp_path / "run"))
+        assert str(tmp_path / "run.compile.prof") in paths
+        del data
+
+
+class TestProfileOption:
+    """Test `--profile` on the CLI"""
+
+    def test_compile_profile(self, tmp_path, capsys):
+        plan = tmp_path / "plan.yaml"
+        plan.write_text(
+            "definitions:\n  easy: '6:00-6:30'\n"
+            "workouts:\n  easy_run:\n    - run: 5000m @P($easy)\n"
+            "schedulePlan:\n  start_from: 2025-01-06\n  workouts: [easy_run]\n")
+        output = tmp_path / "profile.json"
+
+        main(["compile", str(plan), "-o", str(tmp_path / "plan.gpb"), "--profile", "--profile-output", str(output)])
+
+        profile = json.loads(output.read_text())
+        assert {"load", "definitions", "compile"} <= set(profile["phases"])
+        assert profile["phases"]["compile"]["entries"] == 1
+        assert "compile" in capsys.readouterr().out
+        assert profiling.activeProfiler() is None
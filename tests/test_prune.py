@@ -0,0 +1,189 @@
+import pytest
+import datetime
+import threading
+from unittest.mock import patch
+from garmin_planner.journal import Journal
+from garmin_planner.prune import selectWorkouts, deleteWorkouts, workoutDate
+from garmin_planner.main import planWorkoutNames, prunePlan
+
+
+REMOTE = [
+    {"workoutId": 1, "workoutName": "gen_week1_easy", "updatedDate": "2024-01-10T08:00:00.0"},
+    {"workoutId": 2, "workoutName": "gen_week2_easy", "updatedDate": "2024-06-01T08:00:00.0"},
+    {"workoutId": 3, "workoutName": "long_run", "createdDate": "2023-12-01T08:00:00.0"},
+    {"workoutId": 4, "workoutName": "tempo"},
+]
+
+
+class FakeConn:
+    """Records deletes; ids in `fail` raise, ids in `gone` are not found"""
+
+    def __init__(self, workouts=REMOTE, fail=(), gone=()):
+        self.workouts = workouts
+        self.fail = set(fail)
+        self.gone = set(gone)
+        self.deleted = []
+        self.lock = threading.Lock()
+
+    def getAllWorkouts(self):
+        return list(self.workouts)
+
+    def deleteWorkout(self, workout):
+        if workout['workoutId'] in self.fail:
+            raise RuntimeError("503")
+        with self.lock:
+            self.deleted.append(workout['workoutId'])
+        return workout['workoutId'] not in self.gone
+
+
+def ids(workouts):
+    return [w['workoutId'] for w in workouts]
+
+
+class TestSelectWorkouts:
+    """Test picking remote workouts to delete"""
+
+    def test_by_pattern(self):
+        assert ids(selectWorkouts(REMOTE, pattern=r"^gen_")) == [1, 2]
+
+    def test_by_age(self):
+        # workouts without any date are never selected by age
+        assert ids(selectWorkouts(REMOTE, olderThan=datetime.date(2024, 2, 1))) == [1, 3]
+
+    def test_not_in_plan(self):
+        assert ids(selectWorkouts(REMOTE, keep={"long_run", "tempo"})) == [1, 2]
+
+    def test_criteria_combine(self):
+        assert ids(selectWorkouts(REMOTE, pattern="easy", olderThan=datetime.date(2024, 2, 1))) == [1]
+
+    def test_workout_date(self):
+        assert workoutDate(REMOTE[0]) == datetime.date(2024, 1, 10)
+        assert workoutDate(REMOTE[3]) is None
+
+
+class TestDeleteWorkouts:
+    """Test concurrent, journaled deletes"""
+
+    def test_deletes_concurrently(self):
+        conn = FakeConn(gone={2})
+
+        result = deleteWorkouts(conn, REMOTE, concurrency=3)
+
+        assert sorted(conn.deleted) == [1, 2, 3, 4]
+        assert (result.deleted, result.missing, result.failed) == (3, 1, [])
+
+    def test_outcome_follows_http_status(self, tmp_path):
+        import requests
+        from garth.exc import GarthHTTPError
+
+        class StatusConn:
+            """garth-like deletes: None for a 204, HTTPError for anything else"""
+
+            def deleteWorkout(self, workout):
+                status = {1: 204, 2: 404, 3: 500}.get(workout['workoutId'], 204)
+                if status == 204:
+                    return None
+                response = requests.Response()
+                response.status_code = status
+                raise GarthHTTPError(msg="Error in request", error=requests.HTTPError(str(status), response=response))
+
+        with Journal(str(tmp_path / "prune.journal")) as journal:
+            result = deleteWorkouts(StatusConn(), REMOTE, journal)
+
+            assert (result.deleted, result.missing, ids(result.failed)) == (2, 1, [3])
+            assert journal.get("delete", 1)["found"] is True
+            assert journal.get("delete", 2)["found"] is False
+
+    def test_client_delete_statuses(self, fake_client):
+        client, _ = fake_client({("DELETE", "/workout-service/workout/1"): (204, None)})
+
+        assert client.deleteWorkout({"workoutId": 1, "workoutName": "a"}) is True
+        assert client.deleteWorkout({"workoutId": 2, "workoutName": "b"}) is False
+
+    def test_resume_skips_journaled_deletes(self, tmp_path):
+        path = str(tmp_path / "prune.journal")
+        with Journal(path) as journal:
+            first = deleteWorkouts(FakeConn(fail={3}), REMOTE, journal)
+        assert ids(first.failed) == [3]
+
+        conn = FakeConn()
+        with Journal(path) as journal:
+            second = deleteWorkouts(conn, REMOTE, journal)
+
+        assert conn.deleted == [3]
+        assert (second.deleted, second.skipped) == (1, 3)
+
+
+class TestJournal:
+    """Test the append-only operation journal"""
+
+    def test_round_trip_and_torn_line(self, tmp_path):
+        path = str(tmp_path / "run.journal")
+        with Journal(path) as journal:
+            journal.record("import", "easy", workoutId=11)
+            journal.record("delete", 5)
+        with open(path, "a") as f:
+            f.write('{"op": "import", "ke')
+
+        journal = Journal(path)
+
+        assert len(journal) == 2
+        assert journal.get("import", "easy")["workoutId"] == 11
+        assert journal.done("delete", "5")
+        assert not journal.done("import", "tempo")
+        journal.discard()
+        assert not (tmp_path / "run.journal").exists()
+
+
+class TestPrunePlan:
+    """Test the prune entry point"""
+
+    def test_plan_workout_names(self):
+        workouts = {
+            "easy": [{"run": "30min"}],
+            "interval_week$n": {"template": "intervals", "instances": [{"n": 1}, {"n": 2}]},
+        }
+
+        assert list(planWorkoutNames(workouts)) == ["easy", "interval_week1", "interval_week2"]
+
+    def test_dry_run_deletes_nothing(self):
+        conn = FakeConn()
+        with patch("garmin_planner.main._connect", return_value=conn):
+            result = prunePlan(match="^gen_", dryRun=True)
+
+        assert result.selected == 2
+        assert conn.deleted == []
+
+    def test_prune_cleans_up_journal(self, tmp_path):
+        conn = FakeConn()
+        journal = tmp_path / "prune.journal"
+        with patch("garmin_planner.main._connect", return_value=conn):
+            result = prunePlan(olderThan="2024-02-01", journalPath=str(journal))
+
+        assert sorted(conn.deleted) == [1, 3]
+        assert result.deleted == 2
+        assert not journal.exists()
+
+    def test_requires_criteria(self):
+        with pytest.raises(SystemExit):
+            prunePlan()
+
+    def test_selects_past_the_first_page(self):
+        from garmin_planner.client import Client, WORKOUTS_PAGE_SIZE
+        from garmin_planner.coalesce import Coalescer
+        from garmin_planner.transport import Transport
+
+        remote = [{"workoutId": i, "workoutName": f"gen_{i}"} for i in range(1, 2 * WORKOUTS_PAGE_SIZE + 3)]
+
+        def connectapi(path, method="GET", params=None, **kwargs):
+            start = params["start"]
+            return remote[start - 1:start - 1 + params["limit"]]
+
+        with patch.object(Client, "login", return_value=True):
+            client = Client("a@example.com", "pw", transport=Transport(), coalescer=Coalescer())
+        with patch.object(client.garth, "connectapi", side_effect=connectapi) as api, \
+                patch("garmin_planner.main._connect", return_value=client):
+            result = prunePlan(match="^gen_", dryRun=True)
+
+        assert result.selected == len(remote)
+        assert [call.kwargs["params"]["start"] for call in api.call_args_list] == [1, 1000, 1999]
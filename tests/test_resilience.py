@@ -0,0 +1,195 @@
+import pytest
+import requests
+from garth.exc import GarthHTTPError
+from unittest.mock import patch
+from garmin_planner.resilience import (
+    Resilience, ResilienceConfig, CircuitOpenError, CircuitBreaker, classifyError, THROTTLED, UNAVAILABLE)
+
+
+class FakeClock:
+    """Time only moves when someone sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return GarthHTTPError(msg="Error in request", error=requests.HTTPError(response=response))
+
+
+class FakeEndpoint:
+    """Replays a script of responses; exceptions are raised"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        result = self.script.pop(0) if self.script else {"ok": True}
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def make(clock, **config):
+    return Resilience(ResilienceConfig(**config), clock=clock, sleep=clock.sleep, rand=lambda: 1.0)
+
+
+class TestClassifyError:
+    """Test mapping Garmin failures to throttled/unavailable"""
+
+    def test_classify(self):
+        assert classifyError(http_error(429)) == THROTTLED
+        assert classifyError(http_error(503)) == UNAVAILABLE
+        assert classifyError(requests.ConnectionError()) == UNAVAILABLE
+        assert classifyError(requests.exceptions.RetryError()) == UNAVAILABLE
+        assert classifyError(http_error(404)) is None
+        assert classifyError(ValueError()) is None
+
+
+class TestTokenBucket:
+    """Test the adaptive rate limit"""
+
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        resilience = make(clock, rate=2.0, burst=2.0, rateIncrease=0.0)
+
+        for _ in range(4):
+            resilience.call(FakeEndpoint())
+
+        assert clock.sleeps == [pytest.approx(0.5), pytest.approx(0.5)]
+
+    def test_429_halves_rate_and_honours_retry_after(self):
+        clock = FakeClock()
+        resilience = make(clock, rate=4.0, burst=1.0)
+        endpoint = FakeEndpoint(http_error(429, {"Retry-After": "7"}))
+
+        assert resilience.call(endpoint, idempotent=False) == {"ok": True}
+
+        assert endpoint.calls == 2
+        assert clock.now >= 7
+        stats = resilience.snapshot()
+        assert stats["throttled"] == 1 and stats["retries"] == 1
+        assert stats["rate"] == pytest.approx(2.0 + 0.1)
+
+    def test_rate_recovers_additively(self):
+        clock = FakeClock()
+        resilience = make(clock, rate=1.0, maxRate=1.3, rateIncrease=0.1)
+
+        for _ in range(5):
+            resilience.call(FakeEndpoint())
+
+        assert resilience.bucket.rate == pytest.approx(1.3)
+
+
+class TestRetries:
+    """Test jittered backoff retries"""
+
+    def test_idempotent_calls_are_retried(self):
+        clock = FakeClock()
+        resilience = make(clock, burst=10, backoffBase=1.0)
+        endpoint = FakeEndpoint(http_error(502), requests.ConnectionError(), {"id": 1})
+
+        assert resilience.call(endpoint) == {"id": 1}
+
+        # full jitter with rand() == 1.0 gives the cap of each attempt
+        assert clock.sleeps == [1.0, 2.0]
+
+    def test_writes_are_not_retried_on_5xx(self):
+        resilience = make(FakeClock())
+        endpoint = FakeEndpoint(http_error(500))
+
+        with pytest.raises(GarthHTTPError):
+            resilience.call(endpoint, idempotent=False)
+        assert endpoint.calls == 1
+
+    def test_client_errors_are_not_retried(self):
+        resilience = make(FakeClock())
+        endpoint = FakeEndpoint(http_error(404))
+
+        with pytest.raises(GarthHTTPError):
+            resilience.call(endpoint)
+        assert endpoint.calls == 1
+        assert resilience.snapshot()["failed"] == 1
+
+    def test_gives_up_after_max_retries(self):
+        resilience = make(FakeClock(), maxRetries=2, failureThreshold=100)
+        endpoint = FakeEndpoint(*[http_error(503)] * 5)
+
+        with pytest.raises(GarthHTTPError):
+            resilience.call(endpoint)
+        assert endpoint.calls == 3
+
+
+class TestCircuitBreaker:
+    """Test failing fast while Garmin is down"""
+
+    def test_opens_then_probes(self):
+        clock = FakeClock()
+        resilience = make(clock, maxRetries=0, failureThreshold=2, resetTimeout=30)
+        down = FakeEndpoint(*[http_error(503)] * 2)
+
+        for _ in range(2):
+            with pytest.raises(GarthHTTPError):
+                resilience.call(down)
+        with pytest.raises(CircuitOpenError):
+            resilience.call(down)
+        assert down.calls == 2
+
+        clock.now += 30
+        assert resilience.call(down) == {"ok": True}
+        stats = resilience.snapshot()
+        assert stats["circuit"] == CircuitBreaker.CLOSED
+        assert stats["circuitOpened"] == 1 and stats["rejected"] == 1
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(ResilienceConfig(failureThreshold=1, resetTimeout=10), clock)
+
+        breaker.onFailure()
+        clock.now = 10
+        breaker.allow()
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()  # only one probe at a time
+        assert breaker.onFailure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+
+class TestClientResilience:
+    """Test that Client calls go through the account's Resilience"""
+
+    def test_client_retries_reads(self):
+        from garmin_planner.client import Client
+        from garmin_planner.transport import Transport
+
+        resilience = make(FakeClock())
+        with patch.object(Client, "login", return_value=True):
+            client = Client("a@example.com", "pw", transport=Transport(), resilience=resilience)
+
+        with patch.object(client.garth, "connectapi", side_effect=[http_error(503), {"workoutId": 1}]) as connectapi:
+            assert client.getWorkout("1") == {"workoutId": 1}
+        assert connectapi.call_count == 2
+        assert client.resilienceStats()["retries"] == 1
+
+    def test_resilience_is_shared_per_account(self):
+        from garmin_planner.client import Client
+
+        with patch.object(Client, "login", return_value=True):
+            a1 = Client("a@example.com", "pw")
+            a2 = Client("A@example.com", "pw")
+            b = Client("b@example.com", "pw")
+
+        assert a1.resilience is a2.resilience
+        assert a1.resilience is not b.resilience
@@ -0,0 +1,138 @@
+import pytest
+import datetime
+import itertools
+from garmin_planner.schedule import compileSchedule, ScheduleError, DateSet, ScheduleRule
+from garmin_planner.main import expandSchedule, scheduleEntries, _planSchedule
+from tests.test_calendar import CalendarConn, item
+
+
+def d(text):
+    return datetime.date.fromisoformat(text)
+
+
+def expand(schedulePlan, start=None):
+    return [(date.isoformat(), name) for date, name in compileSchedule(schedulePlan).entries(start)]
+
+
+class TestScheduleRules:
+    """Test expanding schedule rules into (date, workoutName) pairs"""
+
+    def test_legacy_workouts(self):
+        plan = {"start_from": "2025-01-01", "workouts": ["a", "rest", "b"]}
+        assert list(compileSchedule(plan).entries()) == list(expandSchedule(d("2025-01-01"), ["a", "rest", "b"]))
+
+    def test_weekly(self):
+        plan = {"start_from": "2025-01-08", "rules": [
+            {"weekly": {"Monday": "easy", "wed": "intervals", "sat": ["long", "core"]}, "until": "2025-01-18"}]}
+        assert expand(plan) == [
+            ("2025-01-08", "intervals"), ("2025-01-11", "long"), ("2025-01-11", "core"),
+            ("2025-01-13", "easy"), ("2025-01-15", "intervals"), ("2025-01-18", "long"), ("2025-01-18", "core")]
+
+    def test_multi_week_cycle(self):
+        plan = {"start_from": "2025-02-03", "rules": [
+            {"weekly": [{"tue": "a"}, {"tue": "b"}, {"sun": "deload"}], "repeat": 2}]}
+        assert expand(plan) == [
+            ("2025-02-04", "a"), ("2025-02-11", "b"), ("2025-02-23", "deload"),
+            ("2025-02-25", "a"), ("2025-03-04", "b"), ("2025-03-16", "deload")]
+
+    def test_days_with_rest(self):
+        plan = {"start_from": "2025-07-01", "rules": [{"days": ["easy", "rest", None, "tempo"], "repeat": 2}]}
+        assert expand(plan) == [
+            ("2025-07-01", "easy"), ("2025-07-04", "tempo"), ("2025-07-05", "easy"), ("2025-07-08", "tempo")]
+
+    def test_days_until(self):
+        plan = {"rules": [{"days": ["a", "b"], "from": "2025-07-01", "until": "2025-07-05"}]}
+        assert [name for _, name in expand(plan)] == ["a", "b", "a", "b", "a"]
+
+    def test_exclusions_drop_days(self):
+        plan = {"start_from": "2025-07-01", "except": ["2025-07-02"], "rules": [
+            {"days": ["a", "b", "c"], "repeat": 2, "except": [{"from": "2025-07-04", "until": "2025-07-05"}]}]}
+        assert expand(plan) == [("2025-07-01", "a"), ("2025-07-03", "c"), ("2025-07-06", "c")]
+
+    def test_rules_merge_in_date_order(self):
+        plan = {"start_from": "2025-01-06", "rules": [
+            {"weekly": {"mon": "run"}, "repeat": 2},
+            {"days": ["gym"], "from": "2025-01-06"},
+            {"days": ["swim"], "from": "2025-01-10"}]}
+        assert expand(plan) == [
+            ("2025-01-06", "run"), ("2025-01-06", "gym"), ("2025-01-10", "swim"), ("2025-01-13", "run")]
+
+    def test_start_per_athlete(self):
+        plan = {"start_from": "2025-01-06", "rules": [{"weekly": {"mon": "run"}, "repeat": 2}]}
+        assert expand(plan) == [("2025-01-06", "run"), ("2025-01-13", "run")]
+        # weeks count from the week holding the start, partial or not
+        assert expand(plan, d("2025-03-05")) == [("2025-03-10", "run")]
+
+    def test_lazy(self):
+        plan = {"start_from": "2025-01-06", "rules": [
+            {"weekly": {"mon": "run", "thu": "gym"}, "until": "2075-01-01"},
+            {"days": ["easy"], "from": "2025-01-07", "until": "2075-01-01"}]}
+        first = list(itertools.islice(compileSchedule(plan).entries(), 3))
+        assert [name for _, name in first] == ["run", "easy", "easy"]
+
+    def test_workout_names(self):
+        plan = {"start_from": "2025-01-06", "workouts": ["a"], "rules": [
+            {"weekly": {"mon": ["b", "rest"]}, "repeat": 1}, {"days": ["c", None]}]}
+        assert compileSchedule(plan).workoutNames() == {"a", "b", "c"}
+
+    @pytest.mark.parametrize("plan", [
+        {"rules": [{"days": ["a"]}]},
+        {"start_from": "2025-13-01", "rules": [{"days": ["a"]}]},
+        {"start_from": "2025-01-01", "rules": [{"weekly": {"mon": "a"}}]},
+        {"start_from": "2025-01-01", "rules": [{"weekly": {"funday": "a"}, "repeat": 1}]},
+        {"start_from": "2025-01-01", "rules": [{"days": ["a"], "weekly": {"mon": "a"}}]},
+        {"start_from": "2025-01-01", "rules": [{"days": ["a"], "repeat": 0}]},
+        {"start_from": "2025-01-01", "rules": [{"days": ["a"], "except": [{"from": "2025-02-01", "until": "2025-01-01"}]}]},
+    ])
+    def test_invalid(self, plan):
+        with pytest.raises(ScheduleError):
+            compileSchedule(plan)
+
+    def test_plan_schedule_logs_invalid(self):
+        assert _planSchedule({"schedulePlan": {"rules": [{"days": ["a"]}]}}) is None
+        entries = _planSchedule({"schedulePlan": {"start_from": "2025-01-01", "rules": [{"days": ["a"]}]}})
+        assert list(entries) == [(d("2025-01-01"), "a")]
+
+    def test_incomplete_rule_fails_at_construction(self):
+        class NamesOnly(ScheduleRule):
+            def workoutNames(self):
+                return set()
+
+        with pytest.raises(TypeError):
+            NamesOnly(None, None, None, None)
+
+
+class TestDateSet:
+    """Test excluded dates and overlapping ranges"""
+
+    def test_overlapping_ranges(self):
+        excluded = DateSet([{"from": "2025-01-01", "until": "2025-01-31"}, {"from": "2025-01-05", "until": "2025-01-06"}, "2025-03-01"])
+        assert d("2025-01-20") in excluded
+        assert d("2025-03-01") in excluded
+        assert d("2025-02-01") not in excluded
+
+
+class TestStreamedScheduling:
+    """Test scheduling lazily expanded entries a month at a time"""
+
+    def test_calendar_read_per_month(self):
+        conn = CalendarConn({"run": 1}, [])
+        reads = []
+        getCalendar = conn.getCalendar
+        conn.getCalendar = lambda start, end: reads.append((start.isoformat(), end.isoformat())) or getCalendar(start, end)
+        plan = {"start_from": "2025-01-20", "rules": [{"weekly": {"mon": "run"}, "until": "2025-04-08"}]}
+
+        scheduleEntries(compileSchedule(plan).entries(), conn)
+
+        assert reads == [("2025-01-20", "2025-01-31"), ("2025-02-01", "2025-02-28"), ("2025-03-01", "2025-03-31"), ("2025-04-01", "2025-04-07")]
+        assert len(conn.scheduled) == 12
+
+    def test_remove_stale_across_months(self):
+        conn = CalendarConn({"run": 1, "other": 2}, [
+            item(10, "2025-01-20", 1), item(11, "2025-01-22", 1), item(12, "2025-02-05", 1), item(13, "2025-02-05", 2)])
+        plan = {"start_from": "2025-01-20", "rules": [{"days": ["run"]}, {"days": ["run"], "from": "2025-03-03"}]}
+
+        scheduleEntries(compileSchedule(plan).entries(), conn, removeStale=True)
+
+        assert conn.scheduled == [(1, "2025-03-03")]
+        assert sorted(conn.unscheduled) == [11, 12]
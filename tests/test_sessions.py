@@ -0,0 +1,105 @@
+import pytest
+import threading
+from types import SimpleNamespace
+from garmin_planner.sessions import SessionCache, TokenRefresher
+
+
+class FakeClient:
+    """A logged-in Client whose token expires at a fixed time"""
+
+    created = 0
+
+    def __init__(self, email, password, expiresAt=1000.0, fail=False):
+        FakeClient.created += 1
+        self.garth = SimpleNamespace(oauth2_token=SimpleNamespace(expires_at=expiresAt))
+        self.fail = fail
+        self.refreshes = 0
+
+    def refreshToken(self):
+        if self.fail:
+            raise RuntimeError("sso unavailable")
+        self.refreshes += 1
+        self.garth.oauth2_token = SimpleNamespace(expires_at=self.garth.oauth2_token.expires_at + 3600)
+
+
+@pytest.fixture(autouse=True)
+def reset_created():
+    FakeClient.created = 0
+
+
+class TestSessionCache:
+    """Test per-account Client caching"""
+
+    def test_reuses_client_per_account(self):
+        sessions = SessionCache(FakeClient)
+
+        first = sessions.get("a@example.com", "pw")
+
+        assert sessions.get("A@example.com", "pw") is first
+        assert sessions.get("b@example.com", "pw") is not first
+        assert sessions.get("a@example.com", "other") is not first
+        assert FakeClient.created == 3
+        assert len(sessions) == 3
+
+    def test_evict(self):
+        sessions = SessionCache(FakeClient)
+        first = sessions.get("a@example.com", "pw")
+
+        sessions.evict("a@example.com", "pw")
+
+        assert sessions.get("a@example.com", "pw") is not first
+
+
+class TestTokenRefresher:
+    """Test refreshing tokens ahead of expiry"""
+
+    def test_refreshes_only_sessions_inside_margin(self):
+        now = [0.0]
+        sessions = SessionCache(lambda e, p: FakeClient(e, p, expiresAt=1000.0 if e == "soon" else 5000.0))
+        soon, later = sessions.get("soon", "pw"), sessions.get("later", "pw")
+        refresher = TokenRefresher(sessions, margin=300, clock=lambda: now[0])
+
+        assert refresher.runOnce() == 0
+        now[0] = 750.0
+        assert refresher.runOnce() == 1
+
+        assert soon.refreshes == 1 and later.refreshes == 0
+        stats = refresher.snapshot()
+        assert stats["refreshes"] == 1
+        assert stats["failures"] == 0
+        assert stats["lastLatency"] is not None
+        assert stats["nextExpiry"] == 4600.0
+
+    def test_failures_are_recorded_and_retried(self):
+        sessions = SessionCache(lambda e, p: FakeClient(e, p, fail=True))
+        client = sessions.get("a@example.com", "pw")
+        refresher = TokenRefresher(sessions, margin=300, clock=lambda: 900.0)
+
+        refresher.runOnce()
+        client.fail = False
+        refresher.runOnce()
+
+        stats = refresher.snapshot()
+        assert stats["failures"] == 1
+        assert stats["lastError"] == "sso unavailable"
+        assert stats["refreshes"] == 1
+
+    def test_background_thread(self):
+        sessions = SessionCache(FakeClient)
+        client = sessions.get("a@example.com", "pw")
+        refreshed = threading.Event()
+        original = client.refreshToken
+
+        def refreshToken():
+            original()
+            refreshed.set()
+        client.refreshToken = refreshToken
+
+        refresher = TokenRefresher(sessions, margin=300, interval=0.01, clock=lambda: 900.0)
+        refresher.start()
+        try:
+            assert refreshed.wait(2)
+            assert refresher.snapshot()["running"]
+        finally:
+            refresher.stop(timeout=2)
+        assert not refresher.snapshot()["running"]
@@ -0,0 +1,119 @@
+import pytest
+import datetime
+import os
+from garmin_planner.journal import Journal
+from garmin_planner.main import uploadWorkouts, scheduleEntries, openSyncJournal, syncJournalPath
+
+
+class FlakyConn:
+    """Fake Garmin account that dies after `failAfter` imports"""
+
+    def __init__(self, remote=(), failAfter=None):
+        self.remote = [dict(w) for w in remote]
+        self.failAfter = failAfter
+        self.imported = []
+        self.deleted = []
+        self.scheduled = []
+        self.nextId = 100
+
+    def getAllWorkouts(self):
+        return list(self.remote)
+
+    def getCalendar(self, start, end):
+        return []
+
+    def deleteWorkout(self, workout):
+        self.deleted.append(workout['workoutId'])
+        self.remote = [w for w in self.remote if w['workoutId'] != workout['workoutId']]
+        return True
+
+    def importWorkout(self, jsonData):
+        if self.failAfter is not None and len(self.imported) >= self.failAfter:
+            raise ConnectionError("network down")
+        self.nextId += 1
+        self.imported.append(jsonData)
+        self.remote.append({"workoutName": jsonData, "workoutId": self.nextId})
+        return {"workoutName": jsonData, "workoutId": self.nextId}
+
+    def scheduleWorkout(self, workoutId, dateJson):
+        self.scheduled.append((workoutId, dateJson['date']))
+        return True
+
+
+COMPILED = [("a", "a"), ("b", "b"), ("c", "c")]
+
+
+class TestResumableUpload:
+    """Test that an interrupted upload resumes without duplicates"""
+
+    def test_resume_after_crash(self, tmp_path):
+        path = str(tmp_path / "plan.sync.journal")
+        conn = FlakyConn(remote=[{"workoutName": "b", "workoutId": 7}], failAfter=1)
+
+        with Journal(path) as journal:
+            with pytest.raises(ConnectionError):
+                uploadWorkouts(COMPILED, True, conn, journal)
+        assert conn.imported == ["a"]
+
+        conn.failAfter = None
+        with Journal(path) as journal:
+            uploadWorkouts(COMPILED, True, conn, journal)
+
+        assert conn.imported == ["a", "b", "c"]
+        assert conn.deleted == [7]
+        journal = Journal(path)
+        assert journal.get("import", "c")["workoutId"] == 103
+
+    def test_schedule_resume_keeps_repeated_entries(self, tmp_path):
+        day = datetime.date(2024, 10, 8)
+        entries = [(day, "a"), (day, "a"), (day + datetime.timedelta(days=1), "a")]
+        conn = FlakyConn(remote=[{"workoutName": "a", "workoutId": 1}])
+
+        with Journal(str(tmp_path / "j")) as journal:
+            journal.record("schedule", "2024-10-08/a/1", workoutId=1)
+            scheduleEntries(entries, conn, journal)
+
+        assert conn.scheduled == [(1, "2024-10-08"), (1, "2024-10-09")]
+
+    def test_schedule_resume_keeps_journaled_entries_with_remove_stale(self, tmp_path):
+        from tests.test_calendar import CalendarConn, item
+        day = datetime.date(2025, 1, 6)
+        entries = [(day, "a"), (day + datetime.timedelta(days=2), "a")]
+        # the interrupted run scheduled the first entry and journaled it; 11 is stale
+        conn = CalendarConn({"a": 1}, [item(10, "2025-01-06", 1), item(11, "2025-01-07", 1)])
+
+        with Journal(str(tmp_path / "j")) as journal:
+            journal.record("schedule", "2025-01-06/a/1", workoutId=1)
+            scheduleEntries(entries, conn, journal, removeStale=True)
+
+        assert conn.scheduled == [(1, "2025-01-08")]
+        assert conn.unscheduled == [11]
+
+
+class TestSyncJournalFile:
+    """Test opening the per-plan sync journal"""
+
+    def test_fresh_start_discards_old_journal(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        plan = str(tmp_path / "plan.yaml")
+        openSyncJournal(plan).record("import", "a", workoutId=1)
+
+        journal = openSyncJournal(plan)
+
+        assert syncJournalPath(plan) == "plan.sync.journal"
+        assert not journal.done("import", "a")
+
+    def test_resume_keeps_journal(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        plan = str(tmp_path / "plan.yaml")
+        openSyncJournal(plan).record("import", "a", workoutId=1)
+
+        assert openSyncJournal(plan, resume=True).done("import", "a")
+
+    def test_resume_rejects_other_plan(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        os.makedirs(tmp_path / "other")
+        openSyncJournal(str(tmp_path / "plan.yaml"))
+
+        with pytest.raises(SystemExit):
+            openSyncJournal(str(tmp_path / "other" / "plan.yaml"), resume=True)
@@ -0,0 +1,125 @@
+import pytest
+import json
+import yaml
+from garmin_planner.synthetic import EXERCISES, GeneratorConfig, generatePlan, writePlan, main
+from garmin_planner.main import loadPlan, compileWorkouts, _planWorkouts, _planSchedule, _parseStepName
+
+
+def countSteps(steps) -> int:
+    total = 0
+    for step in steps:
+        total += 1
+        value = next(iter(step.values()))
+        if isinstance(value, list):
+            total += countSteps(value)
+    return total
+
+
+def depth(steps) -> int:
+    deepest = 0
+    for step in steps:
+        value = next(iter(step.values()))
+        if isinstance(value, list):
+            deepest = max(deepest, 1 + depth(value))
+    return deepest
+
+
+def workoutSteps(workout):
+    return workout["steps"] if isinstance(workout, dict) else workout
+
+
+class TestGeneratePlan:
+    """Test the synthetic plan generator's knobs and reproducibility"""
+
+    def test_same_seed_same_plan(self):
+        config = GeneratorConfig(workouts=20, seed=7)
+        assert generatePlan(config) == generatePlan(GeneratorConfig(workouts=20, seed=7))
+        assert generatePlan(config) != generatePlan(GeneratorConfig(workouts=20, seed=8))
+
+    def test_workout_count_and_steps(self):
+        plan = generatePlan(GeneratorConfig(workouts=50, stepsPerWorkout=12, repeatDepth=3, seed=1))
+
+        assert len(plan["workouts"]) == 50
+        for workout in plan["workouts"].values():
+            steps = workoutSteps(workout)
+            assert countSteps(steps) == 12
+            assert depth(steps) <= 3
+
+    def test_nesting_depth_reached(self):
+        plan = generatePlan(GeneratorConfig(workouts=20, stepsPerWorkout=30, repeatDepth=4, repeatProbability=0.9, seed=2))
+        assert max(depth(workoutSteps(w)) for w in plan["workouts"].values()) == 4
+
+    def test_no_repeats_at_depth_zero(self):
+        plan = generatePlan(GeneratorConfig(workouts=20, repeatDepth=0, seed=3))
+        assert all(depth(workoutSteps(w)) == 0 for w in plan["workouts"].values())
+
+    def test_schedule_length(self):
+        plan = generatePlan(GeneratorConfig(workouts=5, scheduleDays=30, seed=4))
+        schedule = plan["schedulePlan"]["workouts"]
+
+        assert len(schedule) == 30
+        assert set(schedule) <= set(plan["workouts"]) | {"rest"}
+
+    def test_definitions_density(self):
+        plan = generatePlan(GeneratorConfig(workouts=40, sportWeights={"running": 1}, definitionsDensity=1.0, seed=5))
+        text = json.dumps(plan["workouts"])
+        assert "$Pace" in text
+
+        plan = generatePlan(GeneratorConfig(workouts=40, sportWeights={"running": 1}, definitionsDensity=0.0, seed=5))
+        assert "$Pace" not in json.dumps(plan["workouts"])
+
+    def test_vocabulary_reaches_every_classification_branch(self):
+        outcomes = set()
+        for exercise in EXERCISES:
+            _, _, category, exerciseName = _parseStepName(exercise)
+            outcomes.add((category, exerciseName))
+        # several branches share an outcome (squat rules, unsupported names, ...)
+        assert len(outcomes) >= 20
+        assert (None, None) in outcomes
+        assert ("SLED", "PUSH") in outcomes
+        assert ("SIT_UP", "X_ABS") in outcomes
+
+        plan = generatePlan(GeneratorConfig(workouts=200, sportWeights={"strength": 1}, seed=6))
+        used = set()
+        for workout in plan["workouts"].values():
+            stack = list(workout["steps"])
+            while stack:
+                key, value = next(iter(stack.pop().items()))
+                if isinstance(value, list):
+                    stack.extend(value)
+                else:
+                    used.add(key)
+        assert set(EXERCISES) <= used
+
+
+class TestGeneratedPlanCompiles:
+    """Generated YAML goes through the real load and compile path"""
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_compiles(self, tmp_path, seed):
+        path = tmp_path / "plan.yaml"
+        writePlan(str(path), GeneratorConfig(workouts=30, stepsPerWorkout=15, repeatDepth=3, seed=seed))
+
+        data, settings = loadPlan(str(path))
+        compiled = dict(compileWorkouts(_planWorkouts(data)))
+
+        assert len(compiled) == 30
+        for workoutJson in compiled.values():
+            assert json.loads(workoutJson)["workoutSegments"]
+        schedule = list(_planSchedule(data))
+        assert len(schedule) == 30
+        assert {name for _, name in schedule} <= set(compiled) | {"rest"}
+
+    def test_cli(self, tmp_path, capsys):
+        path = tmp_path / "cli.yaml"
+        main(["-o", str(path), "--workouts", "4", "--steps", "6", "--sports", "hiit=1", "--seed", "3"])
+
+        with open(path) as f:
+            plan = yaml.safe_load(f)
+        assert len(plan["workouts"]) == 4
+        assert all(w["sport"] == "hiit" for w in plan["workouts"].values())
+        assert "Wrote 4 workouts" in capsys.readouterr().out
+
+    def test_cli_rejects_unknown_sport(self, tmp_path):
+        with pytest.raises(SystemExit):
+            main(["-o", str(tmp_path / "x.yaml"), "--sports", "swimming=1"])
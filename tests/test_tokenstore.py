@@ -0,0 +1,149 @@
+import pytest
+import os
+import stat
+import time
+import threading
+import multiprocessing
+from garth.exc import GarthException
+from garmin_planner.tokenstore import TokenStore
+
+
+class FakeGarth:
+    """Stands in for garth.Client: login is slow and counted"""
+
+    def __init__(self, logins, valid=None):
+        self.logins = logins
+        self.valid = valid if valid is not None else set()
+        self.token = None
+        self.refreshes = 0
+
+    def login(self, email, password):
+        time.sleep(0.1)
+        with self.logins.get_lock():
+            self.logins.value += 1
+        self.token = f"token-{email}-{self.logins.value}"
+        self.valid.add(self.token)
+
+    def dumps(self):
+        return self.token
+
+    def loads(self, s):
+        self.token = s
+
+    @property
+    def username(self):
+        if self.token not in self.valid:
+            raise GarthException(msg="401 Unauthorized")
+        return "runner"
+
+
+def _counter():
+    return multiprocessing.Value("i", 0)
+
+
+def _worker(directory, logins):
+    # module level so it can run in a child process
+    TokenStore(directory).login(FakeGarth(logins, valid={"token-a@example.com-1"}), "a@example.com", "pw")
+
+
+class TestTokenStore:
+    """Test the cross-process token store"""
+
+    def test_login_once_then_resume(self, tmp_path):
+        logins = _counter()
+        store = TokenStore(str(tmp_path))
+
+        first = FakeGarth(logins)
+        store.login(first, "a@example.com", "pw")
+        second = FakeGarth(logins, valid=first.valid)
+        store.login(second, "a@example.com", "pw")
+
+        assert logins.value == 1
+        assert second.token == first.token
+        assert store.read("a@example.com") == first.token
+
+    def test_accounts_are_kept_apart(self, tmp_path):
+        logins = _counter()
+        store = TokenStore(str(tmp_path))
+
+        store.login(FakeGarth(logins), "a@example.com", "pw")
+        store.login(FakeGarth(logins), "b@example.com", "pw")
+
+        assert logins.value == 2
+        assert store.tokenPath("a@example.com") != store.tokenPath("b@example.com")
+        assert store.tokenPath("A@Example.com ") == store.tokenPath("a@example.com")
+
+    def test_rejected_token_logs_in_again(self, tmp_path):
+        logins = _counter()
+        store = TokenStore(str(tmp_path))
+        store.write("a@example.com", "revoked")
+
+        client = FakeGarth(logins)
+        store.login(client, "a@example.com", "pw")
+
+        assert logins.value == 1
+        assert store.read("a@example.com") == client.token
+
+    def test_token_file_is_private(self, tmp_path):
+        store = TokenStore(str(tmp_path / "tokens"))
+        store.write("a@example.com", "secret")
+
+        mode = stat.S_IMODE(os.stat(store.tokenPath("a@example.com")).st_mode)
+        assert mode == 0o600
+        assert [p for p in os.listdir(store.directory) if p.startswith(".token-")] == []
+
+    def test_concurrent_threads_login_once(self, tmp_path):
+        logins = _counter()
+        valid = set()
+        clients = [FakeGarth(logins, valid) for _ in range(8)]
+
+        threads = [threading.Thread(target=TokenStore(str(tmp_path)).login, args=(c, "a@example.com", "pw"))
+                   for c in clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert logins.value == 1
+        assert len({c.token for c in clients}) == 1
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+    def test_concurrent_processes_login_once(self, tmp_path):
+        ctx = multiprocessing.get_context("fork")
+        logins = ctx.Value("i", 0)
+
+        workers = [ctx.Process(target=_worker, args=(str(tmp_path), logins)) for _ in range(6)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join(10)
+
+        assert [p.exitcode for p in workers] == [0] * 6
+        assert logins.value == 1
+
+    def test_refresh_adopts_token_refreshed_elsewhere(self, tmp_path):
+        store = TokenStore(str(tmp_path))
+
+        class Expiry:
+            def __init__(self, expired):
+                self.expired = expired
+
+        class RefreshingGarth(FakeGarth):
+            @property
+            def oauth2_token(self):
+                return Expiry(self.token.endswith("old"))
+
+            def refresh_oauth2(self):
+                self.refreshes += 1
+                self.token = "token-new"
+
+        first, second = RefreshingGarth(_counter()), RefreshingGarth(_counter())
+        first.token = second.token = "token-old"
+        store.write("a@example.com", "token-old")
+
+        store.refresh(first, "a@example.com")
+        store.refresh(second, "a@example.com")
+
+        assert first.refreshes == 1 and second.refreshes == 0
+        assert second.token == "token-new"
+        assert store.read("a@example.com") == "token-new"
@@ -0,0 +1,110 @@
+import pytest
+import json
+from garth.exc import GarthHTTPError
+from garmin_planner.tracing import (
+    TraceHook, CallTrace, JsonTraceSink, HistogramSink, endpointOf, addDefaultHook, removeDefaultHook)
+
+
+class Recorder(TraceHook):
+    def __init__(self):
+        self.before_calls = []
+        self.traces = []
+
+    def before(self, method, path):
+        self.before_calls.append((method, path))
+
+    def after(self, trace):
+        self.traces.append(trace)
+
+
+ROUTES = {
+    ("GET", "/workout-service/workout/42"): (200, {"workoutId": 42, "workoutName": "easy"}),
+    ("POST", "/workout-service/workout"): (200, {"workoutId": 43, "workoutName": "new"}),
+    ("DELETE", "/workout-service/workout/42"): (204, None),
+}
+
+
+class TestClientHooks:
+    """Test hooks around real Client calls"""
+
+    def test_trace_fields(self, fake_client):
+        recorder = Recorder()
+        client, _ = fake_client(ROUTES, hooks=[recorder])
+
+        client.getWorkout("42")
+        client.importWorkout('{"workoutName": "new"}')
+        client.deleteWorkout({"workoutId": 42, "workoutName": "easy"})
+
+        assert recorder.before_calls[0] == ("GET", "/workout-service/workout/42")
+        get, post, delete = recorder.traces
+        assert (get.status, get.requestBytes) == (200, 0)
+        assert get.responseBytes == len(json.dumps(ROUTES[("GET", "/workout-service/workout/42")][1]))
+        assert (post.method, post.status, post.requestBytes) == ("POST", 200, len('{"workoutName": "new"}'))
+        assert (delete.status, delete.responseBytes) == (204, 0)
+        assert get.latency >= 0 and get.error is None
+
+    def test_errors_are_traced(self, fake_client):
+        recorder = Recorder()
+        client, _ = fake_client({}, hooks=[recorder])
+
+        with pytest.raises(GarthHTTPError):
+            client.getWorkout("7")
+
+        assert recorder.traces[0].status == 404
+        assert "404" in recorder.traces[0].error
+
+    def test_no_hooks_no_tracing(self, fake_client):
+        client, adapter = fake_client(ROUTES, hooks=[])
+
+        assert client.getWorkout("42")["workoutId"] == 42
+        assert client.hooks == []
+        assert adapter.requests[0].hooks["response"] == []
+
+    def test_default_hooks(self, fake_client):
+        recorder = Recorder()
+        addDefaultHook(recorder)
+        try:
+            client, _ = fake_client(ROUTES)
+        finally:
+            removeDefaultHook(recorder)
+        client.getWorkout("42")
+
+        assert len(recorder.traces) == 1
+
+
+def trace(path, latency, method="GET", error=None):
+    return CallTrace(method=method, path=path, status=200, latency=latency, requestBytes=10,
+                     responseBytes=100, started=0.0, error=error)
+
+
+class TestSinks:
+    """Test the JSON file and histogram sinks"""
+
+    def test_endpoint_grouping(self):
+        assert endpointOf("/workout-service/workout/123") == "/workout-service/workout/{id}"
+        assert endpointOf("/calendar-service/year/2024/month/9?x=1") == "/calendar-service/year/{id}/month/{id}"
+        assert endpointOf("/workout-service/workouts") == "/workout-service/workouts"
+
+    def test_histogram(self):
+        sink = HistogramSink(buckets=(0.1, 1.0))
+        for latency in (0.05, 0.05, 0.5, 3.0):
+            sink.after(trace("/workout-service/workout/1", latency))
+        sink.after(trace("/workout-service/workout/2", 0.5, error="boom"))
+
+        stats = sink.snapshot()["GET /workout-service/workout/{id}"]
+        assert stats["calls"] == 5 and stats["errors"] == 1
+        assert stats["buckets"] == {"0.1": 2, "1.0": 2, "inf": 1}
+        assert stats["p50"] == 1.0
+        assert stats["p95"] == float("inf")
+        assert stats["responseBytes"] == 500
+
+    def test_json_trace_file(self, tmp_path):
+        path = str(tmp_path / "trace.jsonl")
+        sink = JsonTraceSink(path)
+        sink.after(trace("/a", 0.2))
+        sink.after(trace("/b", 0.3, method="POST"))
+        sink.close()
+
+        lines = [json.loads(l) for l in open(path)]
+        assert [l["path"] for l in lines] == ["/a", "/b"]
+        assert lines[1]["method"] == "POST"
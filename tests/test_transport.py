@@ -0,0 +1,124 @@
+import pytest
+import threading
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from garmin_planner.transport import Transport, TransportConfig, sharedTransport
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.hits += 1
+        body = b'{"ok": true}'
+        self.send_response(503 if self.path.startswith("/unavailable") else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def httpd():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    httpd.hits = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def server(httpd):
+    return f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+class TestTransport:
+    """Test the shared, instrumented connection pool"""
+
+    def test_connections_are_reused(self, server):
+        transport = Transport(TransportConfig(poolMaxSize=2))
+        session = requests.Session()
+        session.mount("http://", transport.adapter)
+
+        for _ in range(5):
+            assert session.get(server + "/workout-service/workouts", timeout=transport.timeout).json() == {"ok": True}
+
+        stats = transport.stats.snapshot()
+        assert stats["requests"] == 5
+        assert stats["connectionsOpened"] == 1
+        assert stats["connectionsReused"] == 4
+        assert stats["reuseRatio"] == pytest.approx(0.8)
+
+    def test_pool_is_shared_between_sessions(self, server):
+        transport = Transport()
+        first, second = requests.Session(), requests.Session()
+        first.mount("http://", transport.adapter)
+        second.mount("http://", transport.adapter)
+
+        first.get(server, timeout=transport.timeout)
+        second.get(server, timeout=transport.timeout)
+
+        assert transport.stats.connectionsOpened == 1
+        assert transport.stats.connectionsReused == 1
+
+    def test_error_statuses_are_not_retried(self, server, httpd):
+        # Resilience retries them; retrying here too would multiply attempts
+        transport = Transport()
+        session = requests.Session()
+        session.mount("http://", transport.adapter)
+
+        assert session.get(server + "/unavailable", timeout=transport.timeout).status_code == 503
+        assert httpd.hits == 1
+
+    def test_shared_transport_per_config(self):
+        assert sharedTransport() is sharedTransport(TransportConfig())
+        assert sharedTransport(TransportConfig(poolMaxSize=32)) is not sharedTransport()
+
+    def test_keep_alive_socket_options(self):
+        import socket
+
+        transport = Transport(TransportConfig(keepAlive=True))
+        options = transport.adapter.poolmanager.connection_pool_kw["socket_options"]
+
+        assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+
+
+class TestClientTransport:
+    """Test that Client keeps the shared pool mounted"""
+
+    def test_client_mounts_shared_transport(self):
+        from garmin_planner.client import Client
+
+        transport = Transport(TransportConfig(connectTimeout=3, readTimeout=20))
+        with patch.object(Client, "login", return_value=True):
+            a = Client("a@example.com", "pw", transport=transport)
+            b = Client("b@example.com", "pw", transport=transport)
+
+        assert a.garth is not b.garth
+        assert a.garth.sess.get_adapter("https://connectapi.garmin.com") is transport.adapter
+        assert b.garth.sess.get_adapter("https://connectapi.garmin.com") is transport.adapter
+        assert a.garth.timeout == (3, 20)
+
+        # garth reconfigures (and remounts a default adapter) when tokens are loaded
+        a.garth.configure(domain="garmin.com")
+        assert a.garth.sess.get_adapter("https://connectapi.garmin.com") is transport.adapter
+
+    def test_connectapi_passes_fresh_headers(self):
+        from garmin_planner.client import Client
+
+        with patch.object(Client, "login", return_value=True):
+            client = Client("a@example.com", "pw", transport=Transport())
+
+        with patch.object(client.garth, "connectapi", return_value={}) as connectapi:
+            client.getWorkout("1")
+            client.getWorkout("2")
+
+        first, second = (call.kwargs["headers"] for call in connectapi.call_args_list)
+        assert first == {} and second == {}
+        assert first is not second